@@ -0,0 +1,9 @@
+from django.contrib import admin
+
+from .models import RollupState
+
+
+@admin.register(RollupState)
+class RollupStateAdmin(admin.ModelAdmin):
+    list_display = ("name", "refreshed_at")
+    readonly_fields = ("name", "refreshed_at")
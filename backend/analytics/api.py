@@ -0,0 +1,333 @@
+from claims.filters import ClaimFilter
+from claims.models import Claim
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.utils import (
+    extend_schema,
+    extend_schema_view,
+    OpenApiParameter,
+    OpenApiTypes,
+)
+from maintenance.filters import MaintenanceFilter
+from maintenance.models import Maintenance
+from rest_framework import permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from users.models import UserProfile
+
+from .models import ClaimRollup, OwnerClaimRollup
+from .rollups import CLAIM_ROLLUP, get_refreshed_at
+from .serializers import TimeSeriesQuerySerializer
+
+DATE_PARAMETERS = [
+    OpenApiParameter(
+        name="failure_date__gte",
+        type=OpenApiTypes.DATE,
+        location=OpenApiParameter.QUERY,
+        required=False,
+        description="Дата отказа — не ранее указанной.",
+    ),
+    OpenApiParameter(
+        name="failure_date__lte",
+        type=OpenApiTypes.DATE,
+        location=OpenApiParameter.QUERY,
+        required=False,
+        description="Дата отказа — не позднее указанной.",
+    ),
+    OpenApiParameter(
+        name="machine_model",
+        type=OpenApiTypes.INT,
+        location=OpenApiParameter.QUERY,
+        required=False,
+        description="Фильтр по модели техники (ID справочника).",
+    ),
+]
+
+
+@extend_schema_view(
+    failure_nodes=extend_schema(
+        summary="Отказы по узлам",
+        description="Количество рекламаций по каждому узлу отказа.",
+        tags=["Analytics"],
+        parameters=DATE_PARAMETERS,
+        responses=OpenApiTypes.OBJECT,
+    ),
+    repair_methods=extend_schema(
+        summary="Средний простой по способам восстановления",
+        description=(
+                "Средний простой (дни) по каждому способу восстановления. "
+                "Учитываются только рекламации с известной датой восстановления."
+        ),
+        tags=["Analytics"],
+        parameters=DATE_PARAMETERS,
+        responses=OpenApiTypes.OBJECT,
+    ),
+    mtbf=extend_schema(
+        summary="Наработка на отказ по моделям техники",
+        description=(
+                "MTBF (м/час) по моделям техники: суммарная наработка между "
+                "последовательными отказами машины, делённая на число таких интервалов."
+        ),
+        tags=["Analytics"],
+        parameters=DATE_PARAMETERS,
+        responses=OpenApiTypes.OBJECT,
+    ),
+    claim_rate=extend_schema(
+        summary="Частота рекламаций на 1000 м/час",
+        description=(
+                "Количество рекламаций на 1000 моточасов наработки: по парку в целом "
+                "и в разбивке по моделям техники."
+        ),
+        tags=["Analytics"],
+        parameters=DATE_PARAMETERS,
+        responses=OpenApiTypes.OBJECT,
+    ),
+)
+class ReliabilityAnalyticsViewSet(viewsets.GenericViewSet):
+    """
+    /api/analytics/failure-nodes/   — отказы по узлам
+    /api/analytics/repair-methods/  — средний простой по способам восстановления
+    /api/analytics/mtbf/            — наработка на отказ по моделям техники
+    /api/analytics/claim-rate/      — рекламации на 1000 м/час
+
+    Данные берутся из предрассчитанных срезов (команда refresh_analytics):
+    у менеджера — ClaimRollup по всему парку, у клиента и сервиса — свой
+    OwnerClaimRollup, доступ — как у рекламаций.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+
+    filterset_fields = {
+        "failure_date": ["gte", "lte"],
+        "machine_model": ["exact"],
+    }
+
+    def get_queryset(self):
+        user = self.request.user
+        if not user.is_authenticated:
+            return ClaimRollup.objects.none()
+
+        profile = getattr(user, "profile", None)
+        role = getattr(profile, "role", None)
+
+        if role == UserProfile.Role.MANAGER:
+            return ClaimRollup.objects.order_by()
+
+        # свой срез владельца; при передаче машины он пересобирается сразу
+        # (analytics.signals), без ожидания refresh_analytics
+        if role in (UserProfile.Role.CLIENT, UserProfile.Role.SERVICE):
+            return OwnerClaimRollup.objects.filter(user=user, role=role).order_by()
+
+        return ClaimRollup.objects.none()
+
+    def _respond(self, results):
+        return Response(
+            {
+                "refreshed_at": get_refreshed_at(CLAIM_ROLLUP),
+                "results": list(results),
+            }
+        )
+
+    @action(detail=False, methods=["get"], url_path="failure-nodes")
+    def failure_nodes(self, request):
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .values("failure_node", name=F("failure_node__name"))
+            .annotate(failures=Sum("claims_count"))
+            .order_by("-failures", "name")
+        )
+        return self._respond(rows)
+
+    @action(detail=False, methods=["get"], url_path="repair-methods")
+    def repair_methods(self, request):
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .values("repair_method", name=F("repair_method__name"))
+            .annotate(
+                failures=Sum("claims_count"),
+                downtime_total=Sum("downtime_total"),
+                downtime_claims=Sum("downtime_claims"),
+            )
+            .order_by("name")
+        )
+        return self._respond(
+            {
+                "repair_method": row["repair_method"],
+                "name": row["name"],
+                "failures": row["failures"],
+                "mean_downtime": _ratio(row["downtime_total"], row["downtime_claims"]),
+            }
+            for row in rows
+        )
+
+    @action(detail=False, methods=["get"])
+    def mtbf(self, request):
+        rows = self._by_machine_model()
+        return self._respond(
+            {
+                "machine_model": row["machine_model"],
+                "name": row["name"],
+                "failures": row["failures"],
+                "operating_hours": row["operating_hours"],
+                "mtbf_hours": _ratio(row["operating_hours"], row["operating_intervals"]),
+            }
+            for row in rows
+        )
+
+    @action(detail=False, methods=["get"], url_path="claim-rate")
+    def claim_rate(self, request):
+        rows = list(self._by_machine_model())
+        failures = sum(row["failures"] for row in rows)
+        hours = sum(row["operating_hours"] for row in rows)
+        intervals = sum(row["operating_intervals"] for row in rows)
+
+        return Response(
+            {
+                "refreshed_at": get_refreshed_at(CLAIM_ROLLUP),
+                "total": {
+                    "failures": failures,
+                    "operating_hours": hours,
+                    "claims_per_1000_hours": _ratio(intervals * 1000, hours),
+                },
+                "results": [
+                    {
+                        "machine_model": row["machine_model"],
+                        "name": row["name"],
+                        "failures": row["failures"],
+                        "operating_hours": row["operating_hours"],
+                        "claims_per_1000_hours": _ratio(
+                            row["operating_intervals"] * 1000, row["operating_hours"]
+                        ),
+                    }
+                    for row in rows
+                ],
+            }
+        )
+
+    def _by_machine_model(self):
+        return (
+            self.filter_queryset(self.get_queryset())
+            .values("machine_model", name=F("machine_model__name"))
+            .annotate(
+                failures=Sum("claims_count"),
+                operating_hours=Sum("operating_hours"),
+                operating_intervals=Sum("operating_intervals"),
+            )
+            .order_by("name")
+        )
+
+
+TIME_SERIES_BUCKETS = {
+    "day": TruncDay,
+    "week": TruncWeek,
+    "month": TruncMonth,
+}
+
+# источник -> (модель, фильтр как у вьюсета, поле даты, поле простоя)
+TIME_SERIES_SOURCES = {
+    "claims": (Claim, ClaimFilter, "failure_date", "downtime"),
+    "maintenance": (Maintenance, MaintenanceFilter, "maintenance_date", None),
+}
+
+TIME_SERIES_GROUPS = {
+    "machine_model": "machine__machine_model",
+    "service_company": "service_company",
+}
+
+
+@extend_schema(
+    summary="Динамика рекламаций и ТО",
+    description=(
+            "Количество рекламаций или ТО (и суммарный простой для рекламаций), "
+            "сгруппированное по дню, неделе или месяцу — одним запросом "
+            "по покрывающему индексу даты.\n\n"
+            "Поддерживаются те же фильтры, что и у списков /api/claims/ и "
+            "/api/maintenance/, доступ — по роли пользователя."
+    ),
+    tags=["Analytics"],
+    parameters=[
+        OpenApiParameter(
+            name="source",
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            required=True,
+            enum=["claims", "maintenance"],
+            description="Источник: рекламации (по дате отказа) или ТО (по дате проведения).",
+        ),
+        OpenApiParameter(
+            name="bucket",
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            required=False,
+            enum=["day", "week", "month"],
+            description="Размер интервала (по умолчанию month).",
+        ),
+        OpenApiParameter(
+            name="group_by",
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            required=False,
+            enum=["machine_model", "service_company"],
+            description="Дополнительная разбивка рядов.",
+        ),
+    ],
+    responses=OpenApiTypes.OBJECT,
+)
+class VolumeTimeSeriesView(APIView):
+    """
+    /api/analytics/timeseries/?source=claims&bucket=week — ряды для графиков.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        params = TimeSeriesQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        source = params.validated_data["source"]
+        bucket = params.validated_data["bucket"]
+        group_by = params.validated_data.get("group_by")
+
+        model, filterset_class, date_field, downtime_field = TIME_SERIES_SOURCES[source]
+
+        filterset = filterset_class(
+            request.query_params,
+            queryset=model.objects.visible_to(request.user),
+            request=request,
+        )
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+
+        group_fields = {"period": TIME_SERIES_BUCKETS[bucket](date_field)}
+        if group_by:
+            group_fields["group"] = F(TIME_SERIES_GROUPS[group_by])
+
+        # COUNT(*) позволяет обойтись индексом без чтения строк таблицы
+        aggregates = {"count": Count("*")}
+        if downtime_field:
+            aggregates["downtime"] = Sum(downtime_field)
+
+        rows = (
+            filterset.qs.order_by()
+            .values(**group_fields)
+            .annotate(**aggregates)
+            .order_by(*group_fields)
+        )
+
+        return Response(
+            {
+                "source": source,
+                "bucket": bucket,
+                "group_by": group_by,
+                "results": list(rows),
+            }
+        )
+
+
+def _ratio(numerator, denominator):
+    if not denominator:
+        return None
+    return round(numerator / denominator, 2)
@@ -0,0 +1,18 @@
+from analytics.rollups import refresh_claim_rollup
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчёт агрегатов аналитики по рекламациям. "
+        "Рассчитан на периодический запуск (cron / планировщик)."
+    )
+
+    def handle(self, *args, **options):
+        rows, owner_rows = refresh_claim_rollup()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Агрегаты аналитики пересчитаны. Строк среза: {rows}, "
+                f"срезов владельцев: {owner_rows}"
+            )
+        )
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('references', '0002_alter_referenceitem_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Агрегат')),
+                ('refreshed_at', models.DateTimeField(verbose_name='Пересчитан')),
+            ],
+            options={
+                'verbose_name': 'Состояние агрегата',
+                'verbose_name_plural': 'Состояния агрегатов',
+            },
+        ),
+        migrations.CreateModel(
+            name='ClaimRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('failure_date', models.DateField(verbose_name='Дата отказа')),
+                ('claims_count', models.PositiveIntegerField(default=0, verbose_name='Количество рекламаций')),
+                ('downtime_total', models.PositiveIntegerField(default=0, verbose_name='Суммарный простой, дни')),
+                ('downtime_claims', models.PositiveIntegerField(default=0, verbose_name='Рекламаций с известным простоем')),
+                ('operating_hours', models.PositiveBigIntegerField(default=0, verbose_name='Наработка между отказами, м/час')),
+                ('operating_intervals', models.PositiveIntegerField(default=0, verbose_name='Интервалов наработки')),
+                ('client', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Клиент')),
+                ('failure_node', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='references.referenceitem', verbose_name='Узел отказа')),
+                ('machine_model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='references.referenceitem', verbose_name='Модель техники')),
+                ('machine_service_company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Сервисная компания (машины)')),
+                ('repair_method', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='references.referenceitem', verbose_name='Способ восстановления')),
+                ('service_company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Сервисная компания (рекламации)')),
+            ],
+            options={
+                'verbose_name': 'Срез рекламаций',
+                'verbose_name_plural': 'Срезы рекламаций',
+                'ordering': ['-failure_date'],
+                'indexes': [models.Index(fields=['failure_date'], name='analytics_rollup_date_idx')],
+            },
+        ),
+    ]
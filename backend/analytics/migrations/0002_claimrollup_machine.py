@@ -0,0 +1,41 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def clear_claim_rollup(apps, schema_editor):
+    # срез без машины не перестроить на месте: он очищается, а API до
+    # следующего refresh_analytics отдаёт пустые результаты и refreshed_at=null
+    apps.get_model("analytics", "ClaimRollup").objects.all().delete()
+    apps.get_model("analytics", "RollupState").objects.filter(name="claims").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0001_initial"),
+        ("machines", "0006_machine_ship_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_claim_rollup, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="claimrollup",
+            name="client",
+        ),
+        migrations.RemoveField(
+            model_name="claimrollup",
+            name="machine_service_company",
+        ),
+        migrations.AddField(
+            model_name="claimrollup",
+            name="machine",
+            field=models.ForeignKey(
+                default=0,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="machines.machine",
+                verbose_name="Машина",
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def clear_claim_rollup(apps, schema_editor):
+    # срез меняет зерно, а срезов владельцев ещё нет: до следующего
+    # refresh_analytics API отдаёт пустые результаты и refreshed_at=null
+    apps.get_model("analytics", "ClaimRollup").objects.all().delete()
+    apps.get_model("analytics", "RollupState").objects.filter(name="claims").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_claimrollup_machine'),
+        ('references', '0002_alter_referenceitem_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_claim_rollup, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='claimrollup',
+            name='machine',
+        ),
+        migrations.RemoveField(
+            model_name='claimrollup',
+            name='service_company',
+        ),
+        migrations.CreateModel(
+            name='OwnerClaimRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('failure_date', models.DateField(verbose_name='Дата отказа')),
+                ('claims_count', models.PositiveIntegerField(default=0, verbose_name='Количество рекламаций')),
+                ('downtime_total', models.PositiveIntegerField(default=0, verbose_name='Суммарный простой, дни')),
+                ('downtime_claims', models.PositiveIntegerField(default=0, verbose_name='Рекламаций с известным простоем')),
+                ('operating_hours', models.PositiveBigIntegerField(default=0, verbose_name='Наработка между отказами, м/час')),
+                ('operating_intervals', models.PositiveIntegerField(default=0, verbose_name='Интервалов наработки')),
+                ('role', models.CharField(choices=[('client', 'Клиент'), ('service', 'Сервисная организация'), ('manager', 'Менеджер')], max_length=20, verbose_name='Роль')),
+                ('failure_node', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='references.referenceitem', verbose_name='Узел отказа')),
+                ('machine_model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='references.referenceitem', verbose_name='Модель техники')),
+                ('repair_method', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='references.referenceitem', verbose_name='Способ восстановления')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Срез рекламаций владельца',
+                'verbose_name_plural': 'Срезы рекламаций владельцев',
+                'ordering': ['-failure_date'],
+                'indexes': [models.Index(fields=['user', 'role', 'failure_date'], name='analytics_owner_rollup_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.db import models
+
+from references.models import ReferenceItem
+from users.models import UserProfile
+
+
+class ClaimAggregate(models.Model):
+    """Измерения и показатели дневного среза рекламаций."""
+
+    failure_date = models.DateField("Дата отказа")
+
+    machine_model = models.ForeignKey(
+        ReferenceItem,
+        verbose_name="Модель техники",
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    failure_node = models.ForeignKey(
+        ReferenceItem,
+        verbose_name="Узел отказа",
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    repair_method = models.ForeignKey(
+        ReferenceItem,
+        verbose_name="Способ восстановления",
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+
+    claims_count = models.PositiveIntegerField("Количество рекламаций", default=0)
+    downtime_total = models.PositiveIntegerField("Суммарный простой, дни", default=0)
+    downtime_claims = models.PositiveIntegerField(
+        "Рекламаций с известным простоем",
+        default=0,
+    )
+    operating_hours = models.PositiveBigIntegerField(
+        "Наработка между отказами, м/час",
+        default=0,
+    )
+    operating_intervals = models.PositiveIntegerField(
+        "Интервалов наработки",
+        default=0,
+    )
+
+    class Meta:
+        abstract = True
+
+
+class ClaimRollup(ClaimAggregate):
+    """
+    Дневной срез рекламаций по всему парку: дата, модель, узел, способ
+    восстановления. Заполняется целиком командой refresh_analytics
+    (см. analytics.rollups), API аналитики менеджера читает только эту
+    таблицу, а не claims_claim.
+    """
+
+    class Meta:
+        verbose_name = "Срез рекламаций"
+        verbose_name_plural = "Срезы рекламаций"
+        ordering = ["-failure_date"]
+        indexes = [
+            models.Index(fields=["failure_date"], name="analytics_rollup_date_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"Срез рекламаций за {self.failure_date}"
+
+
+class OwnerClaimRollup(ClaimAggregate):
+    """
+    Тот же срез отдельно для каждого клиента и сервисной компании — только
+    рекламации, которые им видны: по машинам из MachineAccess, а сервису
+    ещё и те, где он указан в рекламации. Пересчитывается вместе с ClaimRollup
+    и сразу для прежних и новых владельцев, когда машина меняет владельца.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name="Пользователь",
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_index=False,  # покрыт analytics_owner_rollup_idx
+    )
+    role = models.CharField(
+        "Роль",
+        max_length=20,
+        choices=UserProfile.Role.choices,
+    )
+
+    class Meta:
+        verbose_name = "Срез рекламаций владельца"
+        verbose_name_plural = "Срезы рекламаций владельцев"
+        ordering = ["-failure_date"]
+        indexes = [
+            models.Index(
+                fields=["user", "role", "failure_date"],
+                name="analytics_owner_rollup_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"Срез рекламаций {self.user_id} ({self.role}) за {self.failure_date}"
+
+
+class RollupState(models.Model):
+    """Время последнего пересчёта каждого агрегата."""
+
+    name = models.CharField("Агрегат", max_length=100, unique=True)
+    refreshed_at = models.DateTimeField("Пересчитан")
+
+    class Meta:
+        verbose_name = "Состояние агрегата"
+        verbose_name_plural = "Состояния агрегатов"
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.refreshed_at}"
@@ -0,0 +1,196 @@
+from claims.models import Claim
+from django.db import connection, transaction
+from django.utils import timezone
+from machines.models import Machine, MachineAccess
+from users.models import UserProfile
+
+from .models import ClaimRollup, OwnerClaimRollup, RollupState
+
+CLAIM_ROLLUP = "claims"
+
+# Наработка между отказами считается окном по машине: разница наработки
+# с предыдущей рекламацией (для первой — с нуля). Если у предыдущей
+# рекламации наработка не указана, интервал неизвестен (NULL).
+# {machine_filter} ограничивает машины; окно по машине при этом не режется.
+CLAIM_INTERVALS_SQL = """
+SELECT
+    cl.*,
+    CASE
+        WHEN cl.operating_time - LAG(cl.operating_time, 1, 0) OVER (
+            PARTITION BY cl.machine_id ORDER BY cl.failure_date, cl.id
+        ) >= 0
+        THEN cl.operating_time - LAG(cl.operating_time, 1, 0) OVER (
+            PARTITION BY cl.machine_id ORDER BY cl.failure_date, cl.id
+        )
+    END AS op_interval
+FROM {claims} cl
+{machine_filter}
+"""
+
+CLAIM_METRICS_SQL = """
+    COUNT(*), COALESCE(SUM(c.downtime), 0), COUNT(c.downtime),
+    COALESCE(SUM(c.op_interval), 0), COUNT(c.op_interval)
+"""
+
+CLAIM_ROLLUP_SQL = """
+INSERT INTO {rollup} (
+    failure_date, machine_model_id, failure_node_id, repair_method_id,
+    claims_count, downtime_total, downtime_claims,
+    operating_hours, operating_intervals
+)
+SELECT
+    c.failure_date, m.machine_model_id, c.failure_node_id, c.repair_method_id,
+    {metrics}
+FROM ({intervals}) c
+JOIN {machines} m ON m.id = c.machine_id
+GROUP BY c.failure_date, m.machine_model_id, c.failure_node_id, c.repair_method_id
+"""
+
+# Владельцы рекламации — те, кому она видна сейчас: клиент и сервис машины
+# (MachineAccess) и сервисная компания из самой рекламации. UNION убирает
+# повтор, когда сервис машины указан и в рекламации.
+OWNER_ROLLUP_SQL = """
+INSERT INTO {rollup} (
+    user_id, role,
+    failure_date, machine_model_id, failure_node_id, repair_method_id,
+    claims_count, downtime_total, downtime_claims,
+    operating_hours, operating_intervals
+)
+SELECT
+    o.user_id, o.role,
+    c.failure_date, m.machine_model_id, c.failure_node_id, c.repair_method_id,
+    {metrics}
+FROM ({intervals}) c
+JOIN {machines} m ON m.id = c.machine_id
+JOIN (
+    SELECT cl.id AS claim_id, a.user_id, a.role
+    FROM {claims} cl
+    JOIN {access} a ON a.machine_id = cl.machine_id
+    {access_filter}
+    UNION
+    SELECT cl.id, cl.service_company_id, %s
+    FROM {claims} cl
+    WHERE cl.service_company_id IS NOT NULL {service_filter}
+) o ON o.claim_id = c.id
+{group_filter}
+GROUP BY
+    o.user_id, o.role,
+    c.failure_date, m.machine_model_id, c.failure_node_id, c.repair_method_id
+"""
+
+# Группы среза (дата, модель, узел, способ), в которые входят рекламации машин
+GROUPS_OF_MACHINES_SQL = """
+SELECT gc.failure_date, gm.machine_model_id, gc.failure_node_id, gc.repair_method_id
+FROM {claims} gc
+JOIN {machines} gm ON gm.id = gc.machine_id
+WHERE gc.machine_id IN ({machine_ids})
+"""
+
+GROUP_COLUMNS = "(failure_date, machine_model_id, failure_node_id, repair_method_id)"
+
+
+def _tables():
+    qn = connection.ops.quote_name
+    return {
+        "claims": qn(Claim._meta.db_table),
+        "machines": qn(Machine._meta.db_table),
+        "access": qn(MachineAccess._meta.db_table),
+        "owner_rollup": qn(OwnerClaimRollup._meta.db_table),
+    }
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def refresh_claim_rollup():
+    """
+    Полностью пересобирает ClaimRollup и OwnerClaimRollup (по одному
+    INSERT ... SELECT) и отмечает время пересчёта. Возвращает количество
+    строк обоих срезов.
+    """
+    tables = _tables()
+    intervals = CLAIM_INTERVALS_SQL.format(machine_filter="", **tables)
+    rollup_sql = CLAIM_ROLLUP_SQL.format(
+        rollup=connection.ops.quote_name(ClaimRollup._meta.db_table),
+        metrics=CLAIM_METRICS_SQL,
+        intervals=intervals,
+        **tables,
+    )
+    owner_sql = OWNER_ROLLUP_SQL.format(
+        rollup=tables["owner_rollup"],
+        metrics=CLAIM_METRICS_SQL,
+        intervals=intervals,
+        access_filter="",
+        service_filter="",
+        group_filter="",
+        **tables,
+    )
+
+    with transaction.atomic():
+        ClaimRollup.objects.all().delete()
+        OwnerClaimRollup.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(rollup_sql)
+            cursor.execute(owner_sql, [UserProfile.Role.SERVICE])
+        RollupState.objects.update_or_create(
+            name=CLAIM_ROLLUP,
+            defaults={"refreshed_at": timezone.now()},
+        )
+
+    return ClaimRollup.objects.count(), OwnerClaimRollup.objects.count()
+
+
+def refresh_owner_rollup(user_ids, machine_ids):
+    """
+    После передачи машин machine_ids пересчитывает у владельцев user_ids
+    только группы среза, в которые входят рекламации этих машин: окно
+    наработки — по машинам с рекламациями в тех же группах, а не по всему
+    парку владельца. До первого refresh_analytics срезов нет, и пересчитывать
+    нечего.
+    """
+    user_ids = sorted(set(user_ids))
+    machine_ids = sorted(set(machine_ids))
+    if not user_ids or not machine_ids or get_refreshed_at(CLAIM_ROLLUP) is None:
+        return
+
+    tables = _tables()
+    users = _placeholders(user_ids)
+    groups = GROUPS_OF_MACHINES_SQL.format(machine_ids=_placeholders(machine_ids), **tables)
+    machine_filter = (
+        f"WHERE cl.machine_id IN (SELECT kc.machine_id FROM {tables['claims']} kc "
+        f"JOIN {tables['machines']} km ON km.id = kc.machine_id "
+        f"WHERE (kc.failure_date, km.machine_model_id, kc.failure_node_id, "
+        f"kc.repair_method_id) IN ({groups}))"
+    )
+    insert_sql = OWNER_ROLLUP_SQL.format(
+        rollup=tables["owner_rollup"],
+        metrics=CLAIM_METRICS_SQL,
+        intervals=CLAIM_INTERVALS_SQL.format(machine_filter=machine_filter, **tables),
+        access_filter=f"WHERE a.user_id IN ({users})",
+        service_filter=f"AND cl.service_company_id IN ({users})",
+        group_filter=(
+            f"WHERE (c.failure_date, m.machine_model_id, c.failure_node_id, "
+            f"c.repair_method_id) IN ({groups})"
+        ),
+        **tables,
+    )
+    delete_sql = (
+        f"DELETE FROM {tables['owner_rollup']} "
+        f"WHERE user_id IN ({users}) AND {GROUP_COLUMNS} IN ({groups})"
+    )
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(delete_sql, [*user_ids, *machine_ids])
+        cursor.execute(
+            insert_sql,
+            [*machine_ids, *user_ids, UserProfile.Role.SERVICE, *user_ids, *machine_ids],
+        )
+
+
+def get_refreshed_at(name):
+    return (
+        RollupState.objects.filter(name=name)
+        .values_list("refreshed_at", flat=True)
+        .first()
+    )
@@ -0,0 +1,13 @@
+from rest_framework import serializers
+
+
+class TimeSeriesQuerySerializer(serializers.Serializer):
+    source = serializers.ChoiceField(choices=["claims", "maintenance"])
+    bucket = serializers.ChoiceField(
+        choices=["day", "week", "month"],
+        default="month",
+    )
+    group_by = serializers.ChoiceField(
+        choices=["machine_model", "service_company"],
+        required=False,
+    )
@@ -0,0 +1,21 @@
+from claims.models import Claim
+from django.dispatch import receiver
+from machines.access import access_changed
+from machines.models import MachineAccess
+
+from .rollups import refresh_owner_rollup
+
+
+@receiver(access_changed, sender=MachineAccess)
+def refresh_rollup_on_transfer(sender, owners, **kwargs):
+    # срезы владельцев меняются, только если у машины есть рекламации
+    with_claims = list(
+        Claim.objects.filter(machine_id__in=owners)
+        .order_by()
+        .values_list("machine_id", flat=True)
+        .distinct()
+    )
+    refresh_owner_rollup(
+        {user_id for machine_id in with_claims for user_id in owners[machine_id]},
+        with_claims,
+    )
@@ -0,0 +1,216 @@
+from datetime import date
+
+from analytics.models import ClaimRollup
+from analytics.rollups import refresh_claim_rollup
+from claims.models import Claim
+from core.testing import create_machine, create_references
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from references.models import ReferenceItem
+from rest_framework import status
+from rest_framework.test import APIClient
+from users.models import UserProfile
+
+User = get_user_model()
+
+
+class AnalyticsTestCase(TestCase):
+    def setUp(self):
+        self.api_client = APIClient()
+
+        self.manager = User.objects.create_user(username="manager", password="pass123")
+        self.client_user = User.objects.create_user(username="client", password="pass123")
+        self.service_user = User.objects.create_user(username="service", password="pass123")
+
+        self.manager.profile.role = UserProfile.Role.MANAGER
+        self.manager.profile.save()
+        self.client_user.profile.role = UserProfile.Role.CLIENT
+        self.client_user.profile.save()
+        self.service_user.profile.role = UserProfile.Role.SERVICE
+        self.service_user.profile.save()
+
+        refs = self.refs = create_references(
+            ReferenceItem.Category.ENGINE_MODEL,
+            ReferenceItem.Category.TRANSMISSION_MODEL,
+            ReferenceItem.Category.DRIVE_AXLE_MODEL,
+            ReferenceItem.Category.STEER_AXLE_MODEL,
+        )
+        self.model_a = ReferenceItem.objects.create(
+            category=ReferenceItem.Category.MACHINE_MODEL,
+            name="Silant A",
+        )
+        self.model_b = ReferenceItem.objects.create(
+            category=ReferenceItem.Category.MACHINE_MODEL,
+            name="Silant B",
+        )
+        self.engine_node = ReferenceItem.objects.create(
+            category=ReferenceItem.Category.FAILURE_NODE,
+            name="Двигатель",
+        )
+        self.hydraulics_node = ReferenceItem.objects.create(
+            category=ReferenceItem.Category.FAILURE_NODE,
+            name="Гидравлика",
+        )
+        self.replace = ReferenceItem.objects.create(
+            category=ReferenceItem.Category.REPAIR_METHOD,
+            name="Замена узла",
+        )
+
+        def machine(serial, model, client=None, service_company=None):
+            return create_machine(
+                refs,
+                serial,
+                machine_model=model,
+                client=client,
+                service_company=service_company,
+            )
+
+        self.machine1 = machine("MACH-001", self.model_a, self.client_user, self.service_user)
+        self.machine2 = machine("MACH-002", self.model_b)
+
+        def claim(machine_obj, failure_date, recovery_date, operating_time, node):
+            return Claim.objects.create(
+                machine=machine_obj,
+                failure_date=failure_date,
+                recovery_date=recovery_date,
+                operating_time=operating_time,
+                failure_node=node,
+                failure_description="Отказ",
+                repair_method=self.replace,
+            )
+
+        claim(self.machine1, date(2024, 1, 10), date(2024, 1, 14), 100, self.engine_node)
+        claim(self.machine1, date(2024, 3, 1), date(2024, 3, 3), 300, self.hydraulics_node)
+        claim(self.machine2, date(2024, 2, 1), None, 500, self.engine_node)
+
+        refresh_claim_rollup()
+
+    def get(self, user, name, params=None):
+        self.api_client.force_authenticate(user=user)
+        response = self.api_client.get(reverse(name), params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+
+class ReliabilityAnalyticsTests(AnalyticsTestCase):
+    def test_refresh_builds_rollup(self):
+        self.assertEqual(
+            sum(ClaimRollup.objects.values_list("claims_count", flat=True)),
+            3,
+        )
+
+    def test_rollup_is_not_per_machine(self):
+        machine3 = create_machine(self.refs, "MACH-003", machine_model=self.model_a)
+        Claim.objects.create(
+            machine=machine3,
+            failure_date=date(2024, 1, 10),
+            operating_time=50,
+            failure_node=self.engine_node,
+            failure_description="Отказ",
+            repair_method=self.replace,
+        )
+        refresh_claim_rollup()
+
+        # отказ MACH-003 попал в ту же строку, что и отказ MACH-001 того же дня
+        self.assertEqual(ClaimRollup.objects.count(), 3)
+        self.assertEqual(
+            ClaimRollup.objects.get(failure_date=date(2024, 1, 10)).claims_count, 2
+        )
+
+    def test_service_sees_claims_it_performed_once(self):
+        Claim.objects.filter(machine=self.machine1).update(service_company=self.service_user)
+        Claim.objects.filter(machine=self.machine2).update(service_company=self.service_user)
+        refresh_claim_rollup()
+
+        data = self.get(self.service_user, "analytics-failure-nodes")
+        failures = {row["name"]: row["failures"] for row in data["results"]}
+        # две рекламации по своей машине (и с ним в рекламации) + одна по чужой
+        self.assertEqual(failures, {"Двигатель": 2, "Гидравлика": 1})
+
+    def test_failure_nodes_for_manager(self):
+        data = self.get(self.manager, "analytics-failure-nodes")
+        self.assertIsNotNone(data["refreshed_at"])
+        failures = {row["name"]: row["failures"] for row in data["results"]}
+        self.assertEqual(failures, {"Двигатель": 2, "Гидравлика": 1})
+
+    def test_client_sees_only_own_machines(self):
+        data = self.get(self.client_user, "analytics-failure-nodes")
+        failures = {row["name"]: row["failures"] for row in data["results"]}
+        self.assertEqual(failures, {"Двигатель": 1, "Гидравлика": 1})
+
+    def test_machine_transfer_applies_without_refresh(self):
+        new_client = User.objects.create_user(username="new_client", password="pass123")
+        new_client.profile.role = UserProfile.Role.CLIENT
+        new_client.profile.save()
+
+        self.machine1.client = new_client
+        self.machine1.service_company = None
+        self.machine1.save()
+
+        self.assertEqual(self.get(self.client_user, "analytics-failure-nodes")["results"], [])
+        self.assertEqual(self.get(self.service_user, "analytics-failure-nodes")["results"], [])
+        data = self.get(new_client, "analytics-failure-nodes")
+        self.assertEqual(sum(row["failures"] for row in data["results"]), 2)
+
+    def test_date_range_filter(self):
+        data = self.get(
+            self.manager,
+            "analytics-failure-nodes",
+            {"failure_date__gte": "2024-02-01", "failure_date__lte": "2024-02-29"},
+        )
+        self.assertEqual(len(data["results"]), 1)
+        self.assertEqual(data["results"][0]["failures"], 1)
+
+    def test_mean_downtime_by_repair_method(self):
+        data = self.get(self.manager, "analytics-repair-methods")
+        self.assertEqual(data["results"][0]["failures"], 3)
+        # простой известен только у двух рекламаций: 4 и 2 дня
+        self.assertEqual(data["results"][0]["mean_downtime"], 3.0)
+
+    def test_mtbf_and_claim_rate_by_machine_model(self):
+        data = self.get(self.manager, "analytics-mtbf")
+        mtbf = {row["name"]: row["mtbf_hours"] for row in data["results"]}
+        # Silant A: интервалы 100 и 200 м/час, Silant B: 500 м/час
+        self.assertEqual(mtbf, {"Silant A": 150.0, "Silant B": 500.0})
+
+        data = self.get(self.manager, "analytics-claim-rate")
+        self.assertEqual(data["total"]["failures"], 3)
+        self.assertEqual(data["total"]["operating_hours"], 800)
+        self.assertEqual(data["total"]["claims_per_1000_hours"], 3.75)
+
+
+class VolumeTimeSeriesTests(AnalyticsTestCase):
+    def test_monthly_claims_series(self):
+        data = self.get(
+            self.manager,
+            "analytics-timeseries",
+            {"source": "claims", "bucket": "month"},
+        )
+        series = [(str(row["period"]), row["count"], row["downtime"]) for row in data["results"]]
+        self.assertEqual(
+            series,
+            [("2024-01-01", 1, 4), ("2024-02-01", 1, None), ("2024-03-01", 1, 2)],
+        )
+
+    def test_series_uses_claim_filters_and_role_scope(self):
+        data = self.get(
+            self.client_user,
+            "analytics-timeseries",
+            {"source": "claims", "failure_node": self.engine_node.id},
+        )
+        self.assertEqual([row["count"] for row in data["results"]], [1])
+
+    def test_series_grouped_by_machine_model(self):
+        data = self.get(
+            self.manager,
+            "analytics-timeseries",
+            {"source": "claims", "bucket": "week", "group_by": "machine_model"},
+        )
+        groups = {row["group"] for row in data["results"]}
+        self.assertEqual(groups, {self.model_a.id, self.model_b.id})
+
+    def test_source_is_required(self):
+        self.api_client.force_authenticate(user=self.manager)
+        response = self.api_client.get(reverse("analytics-timeseries"))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
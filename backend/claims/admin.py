@@ -1,10 +1,11 @@
+from core.admin import LargeTableAdminMixin
 from django.contrib import admin
 
 from .models import Claim
 
 
 @admin.register(Claim)
-class ClaimAdmin(admin.ModelAdmin):
+class ClaimAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = (
         "failure_date",
         "machine",
@@ -26,3 +27,12 @@ class ClaimAdmin(admin.ModelAdmin):
     )
     date_hierarchy = "failure_date"
     readonly_fields = ("downtime", "created_at", "updated_at")
+    list_select_related = (
+        "machine__machine_model",
+        "failure_node",
+        "repair_method",
+        "service_company",
+    )
+    autocomplete_fields = ("machine", "failure_node", "repair_method", "service_company")
+    # сортировка только по колонкам с индексом
+    sortable_by = ("failure_date",)
@@ -1,15 +1,22 @@
-from django.db.models import Q
+from core.batch import BatchRetrieveMixin
+from core.bulk import BulkCreateMixin
+from core.caching import CachedReadMixin
+from core.normalize import NORMALIZE_PARAMETER, NormalizedReferencesMixin
+from core.pagination import ExportListMixin
+from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import (
     extend_schema,
     extend_schema_view,
     OpenApiParameter,
     OpenApiTypes,
 )
+from machines.models import Machine
+from references.models import ReferenceItem
 from rest_framework import permissions, viewsets
 from rest_framework.exceptions import PermissionDenied
-from rest_framework.response import Response
 from users.models import UserProfile
 
+from .filters import ClaimFilter, ClaimOrderingFilter
 from .models import Claim
 from .serializers import ClaimSerializer
 
@@ -24,10 +31,23 @@ from .serializers import ClaimSerializer
                 "- Сервисная организация: рекламации по машинам, которые она обслуживает, "
                 "а также записи, где она указана сервисной компанией\n"
                 "- Менеджер: все рекламации\n\n"
-                "По умолчанию сортировка по дате отказа."
+                "По умолчанию сортировка по дате отказа, при поиске (search) — "
+                "по релевантности."
         ),
         tags=["Claims"],
         parameters=[
+            NORMALIZE_PARAMETER,
+            OpenApiParameter(
+                name="search",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description=(
+                    "Полнотекстовый поиск по описанию отказа и запчастям "
+                    "с учётом словоформ: «гидроцилиндр течь» — оба слова, "
+                    "\"фраза\" — точная фраза, -слово — исключить."
+                ),
+            ),
             OpenApiParameter(
                 name="failure_node",
                 type=OpenApiTypes.INT,
@@ -96,11 +116,50 @@ from .serializers import ClaimSerializer
         ),
         tags=["Claims"],
     ),
+    bulk=extend_schema(
+        summary="Пакетное создание рекламаций",
+        description=(
+                "Принимает массив рекламаций (не более 500) и создаёт допустимые одной вставкой.\n\n"
+                "Права те же, что и при создании одной рекламации. Ответ содержит результат "
+                "по каждому элементу в порядке запроса: created (с id), invalid или forbidden.\n"
+                "Код ответа: 201 — созданы все, 207 — часть, 400 — ни одной."
+        ),
+        tags=["Claims"],
+        request=ClaimSerializer(many=True),
+        responses={201: OpenApiTypes.OBJECT, 207: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
+    ),
+    batch=extend_schema(
+        summary="Несколько рекламаций по ID",
+        description=(
+                "Возвращает до 100 записей одним запросом с учётом прав текущего "
+                "пользователя. Результаты идут в порядке запроса; для недоступных или "
+                "несуществующих записей возвращается {\"<параметр>\": значение, \"not_found\": true}."
+        ),
+        tags=["Claims"],
+        parameters=[
+            OpenApiParameter(
+                name="ids",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="ID записей через запятую.",
+            ),
+        ],
+    ),
 )
-class ClaimViewSet(viewsets.ModelViewSet):
+class ClaimViewSet(
+    CachedReadMixin,
+    NormalizedReferencesMixin,
+    ExportListMixin,
+    BatchRetrieveMixin,
+    BulkCreateMixin,
+    viewsets.ModelViewSet,
+):
     """
     /api/claims/       — список рекламаций (GET), создание рекламации (POST)
     /api/claims/{id}/  — детали рекламации (GET)
+    /api/claims/bulk/  — пакетное создание рекламаций (POST, массив записей)
+    /api/claims/batch/?ids=1,2 — несколько рекламаций за раз (GET)
 
     Доступ к данным:
     - менеджер: все рекламации
@@ -119,29 +178,20 @@ class ClaimViewSet(viewsets.ModelViewSet):
 
     http_method_names = ["get", "post", "head", "options"]
 
-    # фильтры:
-    # узел отказа, способ восстановления, сервисная компания, зав. номер машины, дата отказа
-    filterset_fields = {
-        "failure_node": ["exact"],
-        "repair_method": ["exact"],
-        "service_company": ["exact"],
-        "machine__serial_number": ["exact", "icontains"],
-        "failure_date": ["exact", "gte", "lte"],
-    }
+    # видимость зависит от владельцев машин, в ответе — названия из справочников:
+    # кеш ответов и числа записей сбрасывается при записи в любую из этих таблиц
+    cache_models = (Claim, Machine, ReferenceItem)
+
+    # фильтры и полнотекстовый ?search=: см. ClaimFilter
+    filter_backends = [DjangoFilterBackend, ClaimOrderingFilter]
+    filterset_class = ClaimFilter
 
     # сортировка по дате отказа (от новых к старым)
     ordering = ["-failure_date", "-id"]
     ordering_fields = ["failure_date", "id"]
 
     def get_queryset(self):
-        user = self.request.user
-        if not user.is_authenticated:
-            return Claim.objects.none()
-
-        profile = getattr(user, "profile", None)
-        role = getattr(profile, "role", None)
-
-        qs = Claim.objects.select_related(
+        return Claim.objects.visible_to(self.request.user).select_related(
             "failure_node",
             "repair_method",
             "machine",
@@ -149,53 +199,36 @@ class ClaimViewSet(viewsets.ModelViewSet):
             "service_company",
         )
 
-        if role == UserProfile.Role.MANAGER:
-            return qs
-
-        if role == UserProfile.Role.CLIENT:
-            # клиент видит рекламации только по своим машинам
-            return qs.filter(machine__client=user)
-
-        if role == UserProfile.Role.SERVICE:
-            # сервис видит рекламации:
-            # - где он указан как сервисная компания
-            # - или по машинам, которые он обслуживает
-            return qs.filter(
-                Q(service_company=user) | Q(machine__service_company=user)
-            )
-
-        return Claim.objects.none()
-
-    def perform_create(self, serializer):
+    def get_create_kwargs(self, validated_data):
+        """
+        Поля, которые сервер проставляет при создании рекламации,
+        или PermissionDenied, если роль не позволяет её создать.
+        """
         user = self.request.user
         profile = getattr(user, "profile", None)
         role = getattr(profile, "role", None)
 
-        machine = serializer.validated_data.get("machine")
+        machine = validated_data.get("machine")
         if machine is None:
             raise PermissionDenied("Не указана машина для рекламации.")
 
         # Менеджер: может создать рекламацию для любой машины,
         if role == UserProfile.Role.MANAGER:
-            service_company = machine.service_company or None
-            serializer.save(service_company=service_company)
-            return
+            return {"service_company_id": machine.service_company_id}
 
         # Сервисная организация: только для машин, которые она обслуживает
         if role == UserProfile.Role.SERVICE:
             if machine.service_company_id != user.id:
                 raise PermissionDenied("Вы не обслуживаете эту машину.")
-            serializer.save(service_company=user)
-            return
+            return {"service_company_id": user.id}
 
         # Клиент и прочие роли не создают рекламации
         raise PermissionDenied("Недостаточно прав для создания рекламации.")
 
-    def list(self, request, *args, **kwargs):
-        export = request.query_params.get("export") == "1"
-        if not export:
-            return super().list(request, *args, **kwargs)
+    def perform_create(self, serializer):
+        serializer.save(**self.get_create_kwargs(serializer.validated_data))
+
+    def prepare_bulk_instance(self, instance):
+        # bulk_create не вызывает Claim.save(), простой считаем здесь
+        instance.calculate_downtime()
 
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
@@ -0,0 +1,36 @@
+from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter
+
+from .models import Claim
+from .search import search_claims
+
+
+class ClaimFilter(filters.FilterSet):
+    search = filters.CharFilter(
+        method="filter_search",
+        label="Полнотекстовый поиск по описанию отказа и запчастям",
+    )
+
+    # узел отказа, способ восстановления, сервисная компания, зав. номер машины, дата отказа
+    class Meta:
+        model = Claim
+        fields = {
+            "failure_node": ["exact"],
+            "repair_method": ["exact"],
+            "service_company": ["exact"],
+            "machine__serial_number": ["exact", "icontains"],
+            "failure_date": ["exact", "gte", "lte"],
+        }
+
+    def filter_search(self, queryset, name, value):
+        return search_claims(queryset, value)
+
+
+class ClaimOrderingFilter(OrderingFilter):
+    """Без явного ?ordering результаты поиска идут от самых релевантных."""
+
+    def get_default_ordering(self, view):
+        ordering = super().get_default_ordering(view)
+        if view.request.query_params.get("search", "").strip():
+            return ["-search_rank", *ordering]
+        return ordering
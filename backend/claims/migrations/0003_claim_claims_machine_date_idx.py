@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0002_claim_claims_date_covering_idx'),
+        ('machines', '0002_machinestats'),
+        ('references', '0002_alter_referenceitem_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['machine', 'failure_date', 'id'], name='claims_machine_date_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0003_claim_claims_machine_date_idx'),
+        ('machines', '0002_machinestats'),
+        ('references', '0002_alter_referenceitem_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='claim',
+            name='machine',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='claims', to='machines.machine', verbose_name='Машина'),
+        ),
+        migrations.AlterField(
+            model_name='claim',
+            name='service_company',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claims_as_service_company', to=settings.AUTH_USER_MODEL, verbose_name='Сервисная компания'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['service_company', 'failure_date', 'id'], name='claims_service_date_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+from django.contrib.postgres.search import SearchVectorField
+from django.db import migrations
+
+# вектор считает триггер: так он верен при любой записи, включая
+# bulk_create и UPDATE в обход ORM. На секционированной таблице триггер
+# и индекс создаются на родителе и достаются всем секциям.
+CREATE_SQL = """
+CREATE FUNCTION claims_claim_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', coalesce(NEW.failure_description, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(NEW.spare_parts, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER claims_claim_search_vector_trigger
+BEFORE INSERT OR UPDATE OF failure_description, spare_parts, search_vector
+ON claims_claim
+FOR EACH ROW EXECUTE FUNCTION claims_claim_search_vector_update();
+
+UPDATE claims_claim SET search_vector = NULL;
+
+CREATE INDEX claims_search_idx ON claims_claim USING gin (search_vector);
+"""
+
+DROP_SQL = """
+DROP INDEX IF EXISTS claims_search_idx;
+DROP TRIGGER IF EXISTS claims_claim_search_vector_trigger ON claims_claim;
+DROP FUNCTION IF EXISTS claims_claim_search_vector_update();
+"""
+
+
+def postgresql_only(sql):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0004_alter_claim_machine_alter_claim_service_company_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='claim',
+            name='search_vector',
+            field=SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(postgresql_only(CREATE_SQL), postgresql_only(DROP_SQL)),
+    ]
@@ -1,8 +1,36 @@
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
-from machines.models import Machine
+from machines.models import Machine, MachineAccess
 from references.models import ReferenceItem
+from users.models import UserProfile
+
+
+class ClaimQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """
+        Рекламации, доступные пользователю:
+        - менеджер: все
+        - клиент: только по своим машинам
+        - сервис: где он указан сервисной компанией или по машинам, которые он обслуживает
+        """
+        if not user.is_authenticated:
+            return self.none()
+
+        profile = getattr(user, "profile", None)
+        role = getattr(profile, "role", None)
+
+        if role == UserProfile.Role.MANAGER:
+            return self
+
+        if role == UserProfile.Role.CLIENT:
+            return self.filter(machine__in=MachineAccess.objects.machine_ids(user, role))
+
+        if role == UserProfile.Role.SERVICE:
+            return self.filter(MachineAccess.objects.serviced_by(user))
+
+        return self.none()
 
 
 class Claim(models.Model):
@@ -59,6 +87,7 @@ class Claim(models.Model):
         verbose_name="Машина",
         on_delete=models.CASCADE,
         related_name="claims",
+        db_index=False,  # покрыт claims_machine_date_idx
     )
 
     service_company = models.ForeignKey(
@@ -68,24 +97,56 @@ class Claim(models.Model):
         null=True,
         blank=True,
         related_name="claims_as_service_company",
+        db_index=False,  # покрыт claims_service_date_idx
+    )
+
+    # описание отказа (вес A) и запчасти (вес B) для полнотекстового поиска;
+    # на PostgreSQL заполняется триггером (миграция 0005), см. claims.search
+    search_vector = SearchVectorField(
+        "Поисковый вектор",
+        null=True,
+        editable=False,
     )
 
     created_at = models.DateTimeField("Создано", auto_now_add=True)
     updated_at = models.DateTimeField("Обновлено", auto_now=True)
 
+    objects = ClaimQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Рекламация"
         verbose_name_plural = "Рекламации"
         ordering = ["-failure_date", "-id"]
+        indexes = [
+            # покрывающий индекс для временных рядов (analytics timeseries):
+            # бакетирование по дате без обращения к таблице
+            models.Index(
+                fields=["failure_date", "machine"],
+                include=["downtime", "service_company", "failure_node", "repair_method"],
+                name="claims_date_covering_idx",
+            ),
+            # хронология машины (machines.timeline)
+            models.Index(
+                fields=["machine", "failure_date", "id"],
+                name="claims_machine_date_idx",
+            ),
+            # списки сервисной компании (visible_to)
+            models.Index(
+                fields=["service_company", "failure_date", "id"],
+                name="claims_service_date_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"Рекламация по {self.machine} от {self.failure_date}"
 
-    def save(self, *args, **kwargs):
+    def calculate_downtime(self):
         if self.failure_date and self.recovery_date:
             days = (self.recovery_date - self.failure_date).days
             self.downtime = max(days, 0)
         else:
             self.downtime = None
 
+    def save(self, *args, **kwargs):
+        self.calculate_downtime()
         super().save(*args, **kwargs)
@@ -0,0 +1,35 @@
+"""
+Полнотекстовый поиск по описанию отказа и запчастям рекламаций.
+
+На PostgreSQL поиск идёт по колонке search_vector (русская морфология,
+GIN-индекс claims_search_idx); колонку заполняет триггер при вставке
+и изменении текста, поэтому она верна и после bulk_create и импорта.
+Запрос разбирается как в поисковиках (websearch_to_tsquery): слова
+через пробел — все сразу, "фраза в кавычках", -исключение.
+
+На других СУБД — запасной вариант: каждое слово ищется через icontains.
+"""
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, FloatField, Q, Value
+
+SEARCH_CONFIG = "russian"
+
+
+def search_claims(queryset, text):
+    """Рекламации, подходящие под запрос, с оценкой релевантности search_rank."""
+    words = text.split()
+    if not words:
+        return queryset
+
+    if connections[queryset.db].vendor == "postgresql":
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F("search_vector"), query)
+        )
+
+    condition = Q()
+    for word in words:
+        condition &= Q(failure_description__icontains=word) | Q(spare_parts__icontains=word)
+    return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
@@ -1,3 +1,4 @@
+from core.serializers import PreloadedPrimaryKeyRelatedField
 from machines.models import Machine
 from machines.serializers import MachineShortSerializer
 from references.models import ReferenceItem
@@ -14,21 +15,21 @@ class ClaimSerializer(serializers.ModelSerializer):
     machine = MachineShortSerializer(read_only=True)
     service_company = UserShortSerializer(read_only=True)
 
-    failure_node_id = serializers.PrimaryKeyRelatedField(
+    failure_node_id = PreloadedPrimaryKeyRelatedField(
         queryset=ReferenceItem.objects.filter(category="failure_node"),
         source="failure_node",
         write_only=True,
         required=True,
     )
 
-    repair_method_id = serializers.PrimaryKeyRelatedField(
+    repair_method_id = PreloadedPrimaryKeyRelatedField(
         queryset=ReferenceItem.objects.filter(category="repair_method"),
         source="repair_method",
         write_only=True,
         required=True,
     )
 
-    machine_id = serializers.PrimaryKeyRelatedField(
+    machine_id = PreloadedPrimaryKeyRelatedField(
         queryset=Machine.objects.all(),
         source="machine",
         write_only=True,
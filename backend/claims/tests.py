@@ -1,10 +1,14 @@
 from datetime import date, timedelta
+from unittest import skipUnless
 
 from claims.models import Claim
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from machines.models import Machine
+from machines.models import Machine, MachineStats
 from references.models import ReferenceItem
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -15,6 +19,7 @@ User = get_user_model()
 
 class ClaimAPITests(TestCase):
     def setUp(self):
+        cache.clear()
         self.api_client = APIClient()
 
         self.manager = User.objects.create_user(
@@ -198,6 +203,23 @@ class ClaimAPITests(TestCase):
         serials = {item["machine"]["serial_number"] for item in response.data}
         self.assertEqual(serials, {"MACH-001", "MACH-002"})
 
+    def test_service_sees_claims_where_they_are_service_company(self):
+        other_service = User.objects.create_user(username="other_service", password="pass123")
+        other_service.profile.role = UserProfile.Role.SERVICE
+        other_service.profile.save()
+
+        self.claim3.service_company = other_service
+        self.claim3.save()
+
+        self.assertEqual(
+            set(Claim.objects.visible_to(other_service).values_list("id", flat=True)),
+            {self.claim3.id},
+        )
+        self.assertEqual(
+            set(Claim.objects.visible_to(self.service_user).values_list("id", flat=True)),
+            {self.claim1.id, self.claim2.id},
+        )
+
     def test_filter_by_failure_node(self):
         url = reverse("claim-list")
         self.api_client.force_authenticate(user=self.manager)
@@ -215,3 +237,104 @@ class ClaimAPITests(TestCase):
 
         ids = {item["id"] for item in response.data}
         self.assertEqual(ids, {self.claim2.id})
+
+    def bulk_item(self, machine, **overrides):
+        item = {
+            "failure_date": "2024-05-01",
+            "recovery_date": "2024-05-04",
+            "operating_time": 400,
+            "failure_node_id": self.failure_node_1.id,
+            "failure_description": "Течь гидроцилиндра",
+            "repair_method_id": self.repair_method_1.id,
+            "machine_id": machine.id,
+        }
+        item.update(overrides)
+        return item
+
+    def test_bulk_create_reports_result_per_item(self):
+        url = reverse("claim-bulk")
+        self.api_client.force_authenticate(user=self.service_user)
+        payload = [
+            self.bulk_item(self.machine1),
+            self.bulk_item(self.machine3),
+            self.bulk_item(self.machine2, failure_node_id=self.repair_method_1.id),
+        ]
+        response = self.api_client.post(url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+
+        statuses = [item["status"] for item in response.data["results"]]
+        self.assertEqual(statuses, ["created", "forbidden", "invalid"])
+        self.assertIn("failure_node_id", response.data["results"][2]["errors"])
+
+        claim = Claim.objects.get(pk=response.data["results"][0]["id"])
+        self.assertEqual(claim.downtime, 3)
+        self.assertEqual(claim.service_company, self.service_user)
+        self.assertEqual(MachineStats.objects.get(machine=self.machine1).claims_count, 2)
+
+    def test_bulk_create_query_count_does_not_depend_on_size(self):
+        url = reverse("claim-bulk")
+        self.api_client.force_authenticate(user=self.manager)
+
+        def count_queries(size):
+            payload = [self.bulk_item(self.machine1) for _ in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.api_client.post(url, payload, format="json")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return len(queries)
+
+        self.assertEqual(count_queries(2), count_queries(20))
+
+    def test_client_cannot_bulk_create_claims(self):
+        url = reverse("claim-bulk")
+        self.api_client.force_authenticate(user=self.client_user)
+        response = self.api_client.post(url, [self.bulk_item(self.machine1)], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["results"][0]["status"], "forbidden")
+
+    def test_batch_retrieve_is_role_scoped(self):
+        url = reverse("claim-batch")
+        self.api_client.force_authenticate(user=self.client_user)
+        response = self.api_client.get(url, {"ids": f"{self.claim1.id},{self.claim3.id}"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["id"], self.claim1.id)
+        self.assertEqual(response.data["not_found"], [self.claim3.id])
+
+    @skipUnless(connection.vendor == "postgresql", "полнотекстовый поиск — PostgreSQL")
+    def test_search_matches_word_forms_and_ranks_results(self):
+        url = reverse("claim-list")
+        self.api_client.force_authenticate(user=self.manager)
+        response = self.api_client.get(url, {"search": "двигатель"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # «двигателя» в описании и «Двигатель» в запчастях — выше одиночного совпадения
+        self.assertEqual(
+            [item["id"] for item in response.data], [self.claim3.id, self.claim1.id]
+        )
+
+        response = self.api_client.get(url, {"search": "двигатель -повторный"})
+        self.assertEqual([item["id"] for item in response.data], [self.claim1.id])
+
+    @skipUnless(connection.vendor == "postgresql", "полнотекстовый поиск — PostgreSQL")
+    def test_search_respects_role_scope_and_explicit_ordering(self):
+        url = reverse("claim-list")
+        self.api_client.force_authenticate(user=self.client_user)
+        response = self.api_client.get(url, {"search": "двигатель"})
+        self.assertEqual([item["id"] for item in response.data], [self.claim1.id])
+
+        self.api_client.force_authenticate(user=self.manager)
+        response = self.api_client.get(url, {"search": "двигатель", "ordering": "failure_date"})
+        self.assertEqual(
+            [item["id"] for item in response.data], [self.claim1.id, self.claim3.id]
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "полнотекстовый поиск — PostgreSQL")
+    def test_search_vector_follows_text_changes(self):
+        Claim.objects.filter(pk=self.claim2.pk).update(
+            failure_description="Течь гидроцилиндра стрелы"
+        )
+        url = reverse("claim-list")
+        self.api_client.force_authenticate(user=self.manager)
+        response = self.api_client.get(url, {"search": "гидроцилиндр течь"})
+        self.assertEqual([item["id"] for item in response.data], [self.claim2.id])
+
+        response = self.api_client.get(url, {"search": "протечка"})
+        self.assertEqual(response.data, [])
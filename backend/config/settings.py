@@ -37,10 +37,13 @@ INSTALLED_APPS += [
 
 # my apps
 INSTALLED_APPS += [
+    'core',
     'references',
     'machines',
     'maintenance',
     'claims',
+    'analytics',
+    'jobs',
     'users.apps.UsersConfig',
 ]
 
@@ -49,6 +52,7 @@ SITE_ID = 1
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -96,6 +100,23 @@ DATABASES = {
     }
 }
 
+# Общий кеш для нескольких воркеров — Redis (REDIS_URL), без него — память
+# процесса (разработка, тесты). Ключи ответов API включают поколения данных
+# (core.generations), поэтому воркеры должны видеть один и тот же кеш.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -125,11 +146,19 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# файлы фоновых задач (входные XLSX, выгрузки); наружу отдаются только
+# через /api/jobs/{id}/download/ с проверкой доступа
+MEDIA_URL = '/media/'
+MEDIA_ROOT = Path(os.getenv("MEDIA_ROOT", BASE_DIR / 'media'))
+
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# с какого размера таблицы админка не считает строки и не строит date_hierarchy
+ADMIN_LARGE_TABLE_ROWS = int(os.getenv("ADMIN_LARGE_TABLE_ROWS", "100000"))
+
 CORS_ALLOW_ALL_ORIGINS = True
 
 REST_FRAMEWORK = {
@@ -147,8 +176,50 @@ REST_FRAMEWORK = {
         "rest_framework.filters.SearchFilter",
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # постранично только с ?page / ?page_size, иначе список целиком
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.ApproximateCountPagination",
+    # сколько доверенных прокси перед приложением: IP гостя берётся из
+    # X-Forwarded-For только за ними, иначе заголовок подделывается и каждый
+    # запрос получает свою корзину. Без прокси (как в docker-compose) — 0
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", "0")),
+    # корзины токенов (core.throttling) публичного поиска машин: гость — по IP,
+    # пользователь с JWT — по id, все вместе — по префиксу заводского номера.
+    # Общими для всех процессов они становятся только с Redis (REDIS_URL)
+    "DEFAULT_THROTTLE_RATES": {
+        "public_search_anon": os.getenv("PUBLIC_SEARCH_RATE_ANON", "20/min"),
+        "public_search_user": os.getenv("PUBLIC_SEARCH_RATE_USER", "60/min"),
+        "public_search_prefix": os.getenv("PUBLIC_SEARCH_RATE_PREFIX", "30/min"),
+    },
 }
 
+# сколько последних символов заводского номера отбрасывается для корзины
+# префикса: номера, отличающиеся только ими, делят одну корзину
+PUBLIC_SEARCH_PREFIX_TAIL = int(os.getenv("PUBLIC_SEARCH_PREFIX_TAIL", "2"))
+
+# Сжатие ответов (core.compression): br и zstd — если установлены пакеты
+# brotli / zstandard, иначе gzip. Уровни по умолчанию — быстрые: выгрузка
+# в несколько мегабайт сжимается за десятки миллисекунд.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+# сколько секунд хранить ответы list/retrieve основных вьюсетов (0 — не кешировать)
+API_RESPONSE_CACHE_TIMEOUT = int(os.getenv("API_RESPONSE_CACHE_TIMEOUT", "300"))
+
+# до скольких записей списки API считают count точно
+API_EXACT_COUNT_LIMIT = int(os.getenv("API_EXACT_COUNT_LIMIT", "10000"))
+
+# лента изменений /api/events/: auto — NOTIFY/LISTEN на PostgreSQL, иначе
+# в пределах процесса; memory — всегда в пределах процесса
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "auto")
+# раз во сколько секунд слать keepalive в простаивающий поток
+EVENTS_KEEPALIVE = int(os.getenv("EVENTS_KEEPALIVE", "15"))
+
+# схема, собранная при сборке образа (manage.py spectacular --file ...);
+# без файла /api/schema/ строит её при первом запросе
+API_SCHEMA_FILE = os.getenv("API_SCHEMA_FILE", "")
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Мой Силант API',
     'DESCRIPTION': (
@@ -167,8 +238,11 @@ SPECTACULAR_SETTINGS = {
         {'name': 'Maintenance', 'description': 'История технического обслуживания (ТО).'},
         {'name': 'Claims', 'description': 'Рекламации, отказы и простои техники.'},
         {'name': 'References', 'description': 'Справочники: модели, узлы отказа, способы восстановления и т.д.'},
+        {'name': 'Analytics', 'description': 'Аналитика надёжности по предрассчитанным агрегатам.'},
         {'name': 'Public', 'description': 'Гостевой доступ: поиск машины по заводскому номеру.'},
         {'name': 'Users', 'description': 'Профиль пользователя и роли (клиент, сервис, менеджер).'},
+        {'name': 'Jobs', 'description': 'Фоновые задачи: выгрузки и импорт, статус и результат.'},
+        {'name': 'Service', 'description': 'Служебные данные для эксплуатации API: счётчики ограничений частоты.'},
     ],
 
 
@@ -1,11 +1,14 @@
+from analytics.api import ReliabilityAnalyticsViewSet, VolumeTimeSeriesView
 from claims.api import ClaimViewSet
+from core.api import ThrottleStatsView, change_events
+from core.schema import CachedSchemaView
 from django.contrib import admin
 from django.urls import include, path
 from drf_spectacular.views import (
-    SpectacularAPIView,
     SpectacularSwaggerView,
     SpectacularRedocView,
 )
+from jobs.api import JobViewSet
 from machines.api import MachineViewSet, PublicMachineSearchView
 from maintenance.api import MaintenanceViewSet
 from references.api import ReferenceItemViewSet
@@ -18,6 +21,8 @@ router.register(r"machines", MachineViewSet, basename="machine")
 router.register(r"maintenance", MaintenanceViewSet, basename="maintenance")
 router.register(r"claims", ClaimViewSet, basename="claim")
 router.register(r"references", ReferenceItemViewSet, basename="reference")
+router.register(r"analytics", ReliabilityAnalyticsViewSet, basename="analytics")
+router.register(r"jobs", JobViewSet, basename="job")
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -39,10 +44,24 @@ urlpatterns = [
         name="public-machine-search",
     ),
 
+    # аналитика: временные ряды
+    path(
+        "api/analytics/timeseries/",
+        VolumeTimeSeriesView.as_view(),
+        name="analytics-timeseries",
+    ),
+
+    # лента изменений для дашбордов (SSE, только под ASGI)
+    path("api/events/", change_events, name="change-events"),
+
+    # счётчики отказов по ограничению частоты (для менеджера)
+    path("api/throttling/", ThrottleStatsView.as_view(), name="throttle-stats"),
+
     # основной REST API
     path("api/", include(router.urls)),
 
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+    # схема строится один раз на процесс (см. core.schema)
+    path("api/schema/", CachedSchemaView.as_view(), name="schema"),
 
     # Swagger UI
     path(
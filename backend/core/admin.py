@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from .counts import estimated_table_rows
+
+
+def large_table_rows():
+    return getattr(settings, "ADMIN_LARGE_TABLE_ROWS", 100_000)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Для нефильтрованного списка по большой таблице берёт число строк
+    из статистики планировщика вместо COUNT(*) по всей таблице.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_table_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate >= large_table_rows():
+                return estimate
+        return super().count
+
+
+class LargeTableChangeList(ChangeList):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # date_hierarchy на верхнем уровне выбирает DISTINCT по датам всей таблицы
+        if self.date_hierarchy and self.model_admin.is_large_table():
+            self.date_hierarchy = None
+
+
+class LargeTableAdminMixin:
+    """
+    Админка для больших таблиц: оценка числа строк вместо полного COUNT(*),
+    без второго подсчёта «всего записей», date_hierarchy отключается,
+    когда в таблице больше ADMIN_LARGE_TABLE_ROWS строк.
+    Связанные поля в списке (list_select_related), автодополнение в формах
+    (autocomplete_fields) и сортировки по индексам (sortable_by) задаются в
+    самих ModelAdmin.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def is_large_table(self):
+        estimate = estimated_table_rows(self.model)
+        return estimate is not None and estimate >= large_table_rows()
+
+    def get_changelist(self, request, **kwargs):
+        return LargeTableChangeList
@@ -0,0 +1,140 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from drf_spectacular.utils import extend_schema, inline_serializer
+from rest_framework import permissions, serializers
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from users.models import UserProfile
+
+from .events import RESYNC, get_broadcaster, is_visible, public_event
+from .throttling import rejection_counts
+
+# через сколько мс браузер переподключается после обрыва
+RETRY_MS = 3000
+
+
+def _authenticate(request):
+    """(id, роль) по JWT из заголовка Authorization или параметра ?token=."""
+    authentication = JWTAuthentication()
+    raw_token = request.GET.get("token")
+    try:
+        if raw_token:
+            validated = authentication.get_validated_token(raw_token.encode())
+            user = authentication.get_user(validated)
+        else:
+            result = authentication.authenticate(request)
+            if result is None:
+                return None
+            user = result[0]
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None
+
+    if not user.is_active:
+        return None
+    role = getattr(getattr(user, "profile", None), "role", None)
+    return user.pk, role
+
+
+def _message(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _stream(user_id, role):
+    broadcaster = get_broadcaster()
+    subscription = broadcaster.subscribe()
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.get(), settings.EVENTS_KEEPALIVE
+                )
+            except TimeoutError:
+                # комментарий не даёт прокси закрыть простаивающее соединение
+                yield ": keepalive\n\n"
+                continue
+            if event is RESYNC:
+                yield _message("resync", {})
+            elif is_visible(event, user_id, role):
+                yield _message("change", public_event(event))
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+@require_GET
+async def change_events(request):
+    """
+    Лента изменений машин, рекламаций и ТО (text/event-stream).
+
+    Каждое событие — {"model", "id", "action"}, action: created / updated /
+    deleted / saved (пакетная запись). Событие resync означает, что часть
+    событий потеряна и списки нужно перечитать. EventSource не умеет
+    передавать заголовки, поэтому access-токен можно передать в ?token=.
+    """
+    if not isinstance(request, ASGIRequest):
+        # под WSGI поток событий занял бы рабочий поток навсегда
+        return JsonResponse(
+            {"detail": "Лента событий доступна только через ASGI-сервер."},
+            status=503,
+        )
+
+    identity = await sync_to_async(_authenticate)(request)
+    if identity is None:
+        response = JsonResponse(
+            {"detail": "Учетные данные не были предоставлены или недействительны."},
+            status=401,
+        )
+        response["WWW-Authenticate"] = 'Bearer realm="api"'
+        return response
+
+    response = StreamingHttpResponse(_stream(*identity), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # nginx не должен буферизовать поток
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@extend_schema(
+    summary="Счётчики отказов по ограничению частоты",
+    description=(
+            "Для каждой области ограничения (см. DEFAULT_THROTTLE_RATES) — ставка "
+            "и число запросов, отклонённых с 429. Счётчики хранятся в кеше и общие "
+            "для процессов при Redis. Только для менеджера."
+    ),
+    tags=["Service"],
+    responses=inline_serializer(
+        name="ThrottleScopeStats",
+        many=True,
+        fields={
+            "scope": serializers.CharField(),
+            "rate": serializers.CharField(allow_null=True),
+            "rejected": serializers.IntegerField(),
+        },
+    ),
+)
+class ThrottleStatsView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        role = getattr(getattr(request.user, "profile", None), "role", None)
+        if role != UserProfile.Role.MANAGER:
+            raise PermissionDenied("Счётчики ограничений доступны только менеджеру.")
+
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        rejected = rejection_counts(list(rates))
+        return Response(
+            [
+                {"scope": scope, "rate": rate, "rejected": rejected[scope]}
+                for scope, rate in rates.items()
+            ]
+        )
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+
+    def ready(self):
+        from .events import connect_change_events
+        from .generations import connect_tracked_models
+
+        connect_tracked_models()
+        connect_change_events()
@@ -0,0 +1,64 @@
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+class BatchRetrieveMixin:
+    """
+    Добавляет во вьюсет GET {prefix}/batch/?ids=1,2,3 — получение нескольких
+    записей одним запросом. Queryset вьюсета (с разграничением доступа по роли)
+    применяется один раз, результаты возвращаются в порядке запроса,
+    для отсутствующих записей — {"<параметр>": значение, "not_found": true}.
+
+    batch_lookup_params: параметр запроса -> поле модели.
+    """
+
+    batch_max_items = 100
+    batch_lookup_params = {"ids": "pk"}
+
+    def _parse_batch_values(self, param, raw):
+        values = [value.strip() for value in raw.split(",") if value.strip()]
+        if not values:
+            raise ValidationError({param: "Не переданы значения."})
+        if len(values) > self.batch_max_items:
+            raise ValidationError(
+                {param: f"Не больше {self.batch_max_items} значений за запрос."}
+            )
+        if self.batch_lookup_params[param] == "pk":
+            try:
+                values = [int(value) for value in values]
+            except ValueError:
+                raise ValidationError({param: "Ожидаются целые числа через запятую."})
+        return values
+
+    @action(detail=False, methods=["get"])
+    def batch(self, request, *args, **kwargs):
+        params = [param for param in self.batch_lookup_params if param in request.query_params]
+        if len(params) != 1:
+            raise ValidationError(
+                {
+                    "detail": "Укажите ровно один из параметров: "
+                              + ", ".join(self.batch_lookup_params)
+                }
+            )
+
+        param = params[0]
+        field = self.batch_lookup_params[param]
+        values = self._parse_batch_values(param, request.query_params[param])
+
+        queryset = self.get_queryset().filter(**{f"{field}__in": set(values)})
+        by_key = {getattr(obj, field): obj for obj in queryset}
+
+        found = [by_key[value] for value in values if value in by_key]
+        serialized = iter(self.get_serializer(found, many=True).data)
+
+        results = []
+        not_found = []
+        for value in values:
+            if value in by_key:
+                results.append(next(serialized))
+            else:
+                results.append({param: value, "not_found": True})
+                not_found.append(value)
+
+        return Response({"results": results, "not_found": not_found})
@@ -0,0 +1,92 @@
+from django.db import transaction
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response
+
+from .serializers import preload_related
+from .signals import records_bulk_saved
+
+
+class BulkCreateMixin:
+    """
+    Добавляет во вьюсет POST {prefix}/bulk/ — создание пачки записей.
+
+    Связанные объекты загружаются одним запросом на поле
+    (PreloadedPrimaryKeyRelatedField), права проверяются по уже загруженным
+    машинам, вставка — одним bulk_create. Ответ содержит результат по каждому
+    элементу в порядке запроса.
+
+    Вьюсет должен реализовать get_create_kwargs(validated_data) — дополнительные
+    поля записи или PermissionDenied, если создавать запись нельзя.
+    """
+
+    bulk_create_max_items = 500
+
+    def prepare_bulk_instance(self, instance):
+        """Хук для расчётов, которые обычно делает Model.save()."""
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({"detail": "Ожидается массив записей."})
+        if not items:
+            raise ValidationError({"detail": "Массив записей пуст."})
+        if len(items) > self.bulk_create_max_items:
+            raise ValidationError(
+                {"detail": f"Не больше {self.bulk_create_max_items} записей за запрос."}
+            )
+
+        serializer_class = self.get_serializer_class()
+        context = self.get_serializer_context()
+        context["preloaded"] = preload_related(serializer_class, items)
+
+        model = serializer_class.Meta.model
+        results = []
+        pending = []
+
+        for index, item in enumerate(items):
+            serializer = serializer_class(data=item, context=context)
+            if not serializer.is_valid():
+                results.append({"index": index, "status": "invalid", "errors": serializer.errors})
+                continue
+
+            try:
+                extra = self.get_create_kwargs(serializer.validated_data)
+            except PermissionDenied as exc:
+                results.append(
+                    {"index": index, "status": "forbidden", "errors": {"detail": exc.detail}}
+                )
+                continue
+
+            instance = model(**serializer.validated_data, **extra)
+            self.prepare_bulk_instance(instance)
+            result = {"index": index, "status": "created"}
+            results.append(result)
+            pending.append((result, instance))
+
+        if pending:
+            with transaction.atomic():
+                created = model.objects.bulk_create([instance for _, instance in pending])
+                records_bulk_saved.send(sender=model, instances=created)
+
+            for (result, _), instance in zip(pending, created):
+                result["id"] = instance.pk
+
+        created_count = len(pending)
+        if created_count == len(items):
+            response_status = status.HTTP_201_CREATED
+        elif created_count:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+
+        return Response(
+            {
+                "created": created_count,
+                "failed": len(items) - created_count,
+                "results": results,
+            },
+            status=response_status,
+        )
@@ -0,0 +1,68 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+from users.models import UserProfile
+
+from .generations import generations_key
+
+
+def role_scope(user):
+    """
+    Часть ключа кеша, определяющая, что пользователь видит: менеджеры
+    видят одно и то же, клиенты и сервисы — каждый своё.
+    """
+    role = getattr(getattr(user, "profile", None), "role", None)
+    if role == UserProfile.Role.MANAGER:
+        return role
+    return f"{role}:{user.pk}"
+
+
+class CachedReadMixin:
+    """
+    Кеширует ответы list и retrieve вьюсета. Ключ: роль пользователя,
+    параметры запроса и поколения моделей cache_models (по умолчанию —
+    модель queryset), поэтому любая запись в эти таблицы делает старые
+    ответы недоступными без явной очистки кеша.
+    """
+
+    cache_models = None
+
+    def get_cache_models(self):
+        return self.cache_models or (self.get_queryset().model,)
+
+    def get_response_cache_key(self, request):
+        params = sorted(request.query_params.lists())
+        digest = hashlib.md5(repr((self.kwargs, params)).encode()).hexdigest()
+        return ":".join(
+            (
+                "response",
+                self.basename,
+                self.action,
+                role_scope(request.user),
+                generations_key(*self.get_cache_models()),
+                digest,
+            )
+        )
+
+    def _cached(self, handler, request, *args, **kwargs):
+        timeout = settings.API_RESPONSE_CACHE_TIMEOUT
+        if not timeout:
+            return handler(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
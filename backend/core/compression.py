@@ -0,0 +1,184 @@
+"""
+Сжатие ответов API (JSON-выгрузки, списки, схема).
+
+В отличие от django.middleware.gzip.GZipMiddleware умеет br и zstd (если
+установлены пакеты brotli / zstandard), не сбрасывает поток компрессора
+после каждого куска потокового ответа (иначе степень сжатия падает почти
+до нуля) и не сжимает ответы меньше COMPRESSION_MIN_SIZE — в том числе
+потоковые: первые куски копятся, пока не станет ясно, что ответ достаточно
+большой. Уровни сжатия настраиваются, по умолчанию — быстрые.
+"""
+
+import itertools
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - необязательная зависимость
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - необязательная зависимость
+    zstandard = None
+
+COMPRESSIBLE_TYPES = _lazy_re_compile(
+    r"^(text/(?!event-stream)|application/([\w.+-]*\+)?(json|xml|yaml|javascript)\b|"
+    r"application/vnd\.oai\.openapi\b)"
+)
+
+
+class _BrotliCompressor:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+def _compressor(encoding):
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compressobj()
+    if encoding == "br":
+        return _BrotliCompressor(settings.COMPRESSION_BROTLI_QUALITY)
+    return zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+
+def available_encodings():
+    """Поддерживаемые кодировки в порядке предпочтения сервера."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+def negotiate_encoding(accept_encoding, encodings=None):
+    """
+    Кодировка для заголовка Accept-Encoding: с наибольшим q, при равных q —
+    первая в encodings (по умолчанию available_encodings()). None, если
+    сжимать нельзя.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name] = q
+
+    candidates = [
+        (weights.get(encoding, weights.get("*", 0.0)), -index, encoding)
+        for index, encoding in enumerate(encodings or available_encodings())
+    ]
+    q, _, encoding = max(candidates)
+    return encoding if q > 0 else None
+
+
+def _should_compress(response):
+    if response.has_header("Content-Encoding"):
+        return False
+    if "no-transform" in response.get("Cache-Control", ""):
+        return False
+    if not COMPRESSIBLE_TYPES.match(response.get("Content-Type", "")):
+        return False
+    return True
+
+
+def _mark_compressed(response, encoding):
+    patch_vary_headers(response, ("Accept-Encoding",))
+    response["Content-Encoding"] = encoding
+    # сжатое тело — другое представление, сильный ETag к нему не подходит
+    etag = response.get("ETag")
+    if etag and etag.startswith('"'):
+        response["ETag"] = "W/" + etag
+
+
+def _compress_stream(chunks, encoding):
+    compressor = _compressor(encoding)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def _acompress_stream(chunks, encoding):
+    compressor = _compressor(encoding)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы, если клиент это принимает и тип содержимого текстовый.
+    Ставится сразу после WhiteNoiseMiddleware: статику WhiteNoise отдаёт
+    уже сжатой, до этого слоя она не доходит. text/event-stream не сжимается.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        encoding = negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None or not _should_compress(response):
+            return response
+
+        min_size = settings.COMPRESSION_MIN_SIZE
+        if response.streaming:
+            if response.is_async:
+                # асинхронный поток нельзя заранее прочитать в синхронном коде,
+                # поэтому порог размера к нему не применяется
+                response.streaming_content = _acompress_stream(
+                    response.streaming_content, encoding
+                )
+            else:
+                chunks = iter(response.streaming_content)
+                head, size = [], 0
+                for chunk in chunks:
+                    head.append(chunk)
+                    size += len(chunk)
+                    if size >= min_size:
+                        break
+                else:
+                    # поток кончился раньше порога — отдаём как есть
+                    response.streaming_content = head
+                    return response
+                response.streaming_content = _compress_stream(
+                    itertools.chain(head, chunks), encoding
+                )
+            response.headers.pop("Content-Length", None)
+            _mark_compressed(response, encoding)
+            return response
+
+        if len(response.content) < min_size:
+            return response
+
+        compressor = _compressor(encoding)
+        compressed = compressor.compress(response.content) + compressor.flush()
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        _mark_compressed(response, encoding)
+        return response
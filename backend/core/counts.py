@@ -0,0 +1,55 @@
+import json
+
+from django.db import connections
+
+
+def estimated_table_rows(model, using="default"):
+    """
+    Оценка числа строк таблицы модели по статистике планировщика
+    (pg_class.reltuples, для секционированной таблицы — сумма по секциям).
+    None, если оценки нет: не PostgreSQL или таблица ещё не анализировалась.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.reltuples, c.relkind,
+                   (SELECT sum(p.reltuples) FROM pg_inherits i
+                    JOIN pg_class p ON p.oid = i.inhrelid
+                    WHERE i.inhparent = c.oid AND p.reltuples >= 0)
+            FROM pg_class c
+            WHERE c.oid = %s::regclass
+            """,
+            [model._meta.db_table],
+        )
+        reltuples, relkind, partitions_total = cursor.fetchone()
+
+    if relkind == "p":
+        reltuples = partitions_total
+    if reltuples is None or reltuples < 0:
+        return None
+    return int(reltuples)
+
+
+def bounded_count(queryset, limit):
+    """
+    Точное число строк, но не больше limit + 1: COUNT по подзапросу с LIMIT
+    читает не больше limit + 1 строк, сколько бы их ни было всего.
+    """
+    return queryset.order_by()[: limit + 1].count()
+
+
+def planner_estimate(queryset):
+    """
+    Оценка числа строк запроса по плану (EXPLAIN), None вне PostgreSQL.
+    Соединения select_related убираются: на число строк они не влияют,
+    а оценку планировщика заметно занижают.
+    """
+    if connections[queryset.db].vendor != "postgresql":
+        return None
+    queryset = queryset.select_related(None).order_by().values("pk")
+    plan = json.loads(queryset.explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
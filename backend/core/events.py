@@ -0,0 +1,279 @@
+"""
+Лента изменений для дашбордов: при записи машин, рекламаций и ТО
+подписчикам /api/events/ уходит событие {model, id, action}.
+
+К событию прикладывается audience — id пользователей, которым запись видна
+(клиент и сервисная компания машины, сервисная компания записи). Менеджерам
+видно всё, остальные получают только события со своим id в audience.
+
+События копятся до фиксации транзакции и отправляются одной пачкой.
+На PostgreSQL пачка уходит через NOTIFY, и каждый процесс ASGI-сервера
+раздаёт её своим подписчикам (LISTEN в отдельном потоке). На других СУБД
+и при EVENTS_BACKEND=memory события видят только подписчики процесса,
+в котором произошла запись.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import select
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models.signals import post_delete, post_save
+
+from .signals import records_bulk_saved
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "silant_changes"
+
+# модель -> имя в событии
+EVENT_MODELS = {
+    "machines.Machine": "machine",
+    "claims.Claim": "claim",
+    "maintenance.Maintenance": "maintenance",
+}
+
+# событие для клиента, который не успевал читать: часть событий потеряна,
+# списки нужно перечитать целиком
+RESYNC = {"action": "resync"}
+
+# сколько событий может ждать отправки одному подписчику
+QUEUE_SIZE = 1000
+
+# как часто поток LISTEN просыпается без уведомлений и пауза перед переподключением
+LISTEN_TIMEOUT = 5
+RECONNECT_DELAY = 2
+
+_local = threading.local()
+
+
+class Subscription:
+    """Очередь событий одного подписчика; живёт в его цикле событий."""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def push(self, events):
+        for event in events:
+            if self.queue.full():
+                while not self.queue.empty():
+                    self.queue.get_nowait()
+                self.queue.put_nowait(RESYNC)
+                return
+            self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class MemoryBroadcaster:
+    """Раздача событий подписчикам текущего процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+
+    def subscribe(self):
+        subscription = Subscription()
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def dispatch(self, events):
+        # вызывается из любого потока, очереди трогаются только в их цикле
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, events)
+            except RuntimeError:
+                # цикл подписчика уже закрыт
+                self.unsubscribe(subscription)
+
+    def publish(self, events):
+        self.dispatch(events)
+
+
+class PostgresBroadcaster(MemoryBroadcaster):
+    """NOTIFY при записи, LISTEN в фоновом потоке каждого процесса."""
+
+    def __init__(self, using="default"):
+        super().__init__()
+        self.using = using
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def publish(self, events):
+        payloads = [json.dumps(event, separators=(",", ":")) for event in events]
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload",
+                [CHANNEL, payloads],
+            )
+
+    def subscribe(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen, name="events-listener", daemon=True
+                )
+                self._listener.start()
+        return super().subscribe()
+
+    def _listen(self):
+        while True:
+            try:
+                self._listen_connection()
+            except Exception:
+                logger.exception("Соединение LISTEN %s потеряно", CHANNEL)
+                time.sleep(RECONNECT_DELAY)
+
+    def _listen_connection(self):
+        # отдельное соединение: соединения Django привязаны к своим потокам
+        wrapper = connections[self.using]
+        conn = wrapper.get_new_connection(wrapper.get_connection_params())
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            while True:
+                select.select([conn], [], [], LISTEN_TIMEOUT)
+                conn.poll()
+                if conn.notifies:
+                    events = [json.loads(notify.payload) for notify in conn.notifies]
+                    conn.notifies.clear()
+                    self.dispatch(events)
+        finally:
+            conn.close()
+
+
+@functools.cache
+def get_broadcaster():
+    backend = settings.EVENTS_BACKEND
+    if backend == "auto":
+        backend = "postgres" if connection.vendor == "postgresql" else "memory"
+    if backend == "postgres":
+        return PostgresBroadcaster()
+    return MemoryBroadcaster()
+
+
+class _PendingEvents(list):
+    def flush(self):
+        if getattr(_local, "pending", None) is self:
+            _local.pending = None
+        get_broadcaster().publish(self)
+
+
+def _publish_on_commit(events):
+    conn = transaction.get_connection()
+    if not conn.in_atomic_block:
+        get_broadcaster().publish(events)
+        return
+
+    pending = getattr(_local, "pending", None)
+    # после отката транзакции её обработчик on_commit выброшен, копим заново
+    if pending is None or not any(
+        entry[1] == pending.flush for entry in conn.run_on_commit
+    ):
+        pending = _local.pending = _PendingEvents()
+        transaction.on_commit(pending.flush)
+    pending.extend(events)
+
+
+def _owners_by_machine(instances, origin=None):
+    """{machine_id: (client_id, service_company_id)} для машин записей."""
+    Machine = apps.get_model("machines", "Machine")
+    owners = {}
+    if isinstance(origin, Machine):
+        owners[origin.pk] = (origin.client_id, origin.service_company_id)
+    missing = set()
+    for instance in instances:
+        if instance.machine_id in owners:
+            continue
+        if type(instance).machine.is_cached(instance):
+            machine = instance.machine
+            owners[machine.pk] = (machine.client_id, machine.service_company_id)
+        else:
+            missing.add(instance.machine_id)
+    if missing:
+        for pk, client_id, service_company_id in Machine.objects.filter(
+            pk__in=missing
+        ).values_list("pk", "client_id", "service_company_id"):
+            owners[pk] = (client_id, service_company_id)
+    return owners
+
+
+def _audiences(model, instances, origin=None):
+    if model._meta.label == "machines.Machine":
+        for instance in instances:
+            yield {
+                instance.client_id,
+                instance.service_company_id,
+                # владельцы до изменения тоже должны узнать, что машина ушла
+                *(getattr(instance, "_access_previous", None) or ()),
+            }
+        return
+
+    owners = _owners_by_machine(instances, origin)
+    for instance in instances:
+        yield {*owners.get(instance.machine_id, ()), instance.service_company_id}
+
+
+def build_events(model, instances, action, origin=None):
+    name = EVENT_MODELS[model._meta.label]
+    return [
+        {
+            "model": name,
+            "id": instance.pk,
+            "action": action,
+            "audience": sorted(user_id for user_id in audience if user_id),
+        }
+        for instance, audience in zip(instances, _audiences(model, instances, origin))
+    ]
+
+
+def _on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    action = "created" if created else "updated"
+    _publish_on_commit(build_events(sender, [instance], action))
+
+
+def _on_delete(sender, instance, origin=None, **kwargs):
+    _publish_on_commit(build_events(sender, [instance], "deleted", origin))
+
+
+def _on_bulk_saved(sender, instances, **kwargs):
+    _publish_on_commit(build_events(sender, list(instances), "saved"))
+
+
+def connect_change_events():
+    for label in EVENT_MODELS:
+        model = apps.get_model(label)
+        uid = f"events:{label}"
+        post_save.connect(_on_save, sender=model, dispatch_uid=uid)
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=uid)
+        records_bulk_saved.connect(_on_bulk_saved, sender=model, dispatch_uid=uid)
+
+
+def is_visible(event, user_id, role):
+    from users.models import UserProfile
+
+    if event is RESYNC or role == UserProfile.Role.MANAGER:
+        return True
+    return role is not None and user_id in event["audience"]
+
+
+def public_event(event):
+    return {key: value for key, value in event.items() if key != "audience"}
@@ -0,0 +1,61 @@
+"""
+Счётчики поколений данных: номер растёт при каждой записи в таблицу модели.
+Ключи кешей, зависящих от содержимого таблицы, включают номер поколения,
+поэтому после записи старые значения просто перестают находиться.
+
+Номер увеличивается после фиксации транзакции: иначе параллельный запрос
+успел бы закешировать ещё старые данные под новым номером. Если счётчик
+вытеснен из кеша, он начинается заново не с единицы, а с текущего времени
+в наносекундах — так номер не повторяет прежний, и старые ответы не
+находятся снова.
+"""
+
+import time
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .signals import records_bulk_saved
+
+# модели, запись в которые меняет списки API
+TRACKED_MODELS = (
+    "machines.Machine",
+    "claims.Claim",
+    "maintenance.Maintenance",
+    "references.ReferenceItem",
+)
+
+
+def _key(model):
+    return f"generation:{model._meta.label_lower}"
+
+
+def get_generation(model):
+    return cache.get_or_set(_key(model), time.time_ns, timeout=None)
+
+
+def bump_generation(model):
+    try:
+        cache.incr(_key(model))
+    except ValueError:
+        cache.set(_key(model), time.time_ns(), timeout=None)
+
+
+def generations_key(*models):
+    """Часть ключа кеша: поколения всех перечисленных моделей."""
+    return ".".join(str(get_generation(model)) for model in models)
+
+
+def _bump(sender, **kwargs):
+    transaction.on_commit(lambda: bump_generation(sender))
+
+
+def connect_tracked_models():
+    for label in TRACKED_MODELS:
+        model = apps.get_model(label)
+        uid = f"generation:{label}"
+        post_save.connect(_bump, sender=model, dispatch_uid=uid)
+        post_delete.connect(_bump, sender=model, dispatch_uid=uid)
+        records_bulk_saved.connect(_bump, sender=model, dispatch_uid=uid)
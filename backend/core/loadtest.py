@@ -0,0 +1,429 @@
+"""
+Нагрузочный прогон против запущенного сервера (manage.py loadtest).
+
+Генератор входит через /api/auth/token/ клиентом, сервисной компанией
+и менеджером и собирает из API id машин, рекламаций и справочников —
+дальше каждая роль запрашивает только то, что она действительно видит.
+Потоки держат по одному keep-alive соединению и выбирают сценарии
+по весам смеси. Генератор случайностей каждого потока задаётся seed:
+при тех же параметрах прогон шлёт ту же последовательность запросов,
+поэтому отчёты разных коммитов можно сравнивать (compare_reports).
+
+Запущенный на одной машине с сервером генератор отнимает у него процессор:
+предел сервера честнее мерить с отдельной машины. Публичный поиск идёт
+с одного адреса и упирается в ограничение частоты (machines.throttling);
+такие ответы считаются отдельно от ошибок, для замера предела ставки
+поднимаются через PUBLIC_SEARCH_RATE_*.
+"""
+
+import gzip
+import http.client
+import json
+import math
+import random
+import subprocess
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+from urllib.parse import urlencode, urlsplit
+
+ROLES = ("client", "service", "manager")
+
+PAGE_SIZE = 50
+# сколько записей роли читается при подготовке (пул id для запросов)
+SAMPLE_SIZE = 200
+# списки листаются только по первым страницам, как в интерфейсе
+MAX_PAGE = 5
+
+# начало описания рекламаций, созданных прогоном (по нему их находит --cleanup)
+CLAIM_MARKER = "[loadtest]"
+SEARCH_WORDS = ("двигатель", "гидроцилиндр", "течь", "шум", "фильтр", "стартер")
+
+PERCENTILES = (50, 90, 99)
+# пауза потока после ошибки соединения, чтобы не крутиться вхолостую
+ERROR_BACKOFF = 0.1
+
+
+class LoadTestError(Exception):
+    pass
+
+
+class Connection:
+    """Keep-alive соединение одного потока; после ошибки открывается заново."""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise LoadTestError(f"Ожидается адрес вида http://host:port, получено: {base_url}")
+        self._connection_class = (
+            http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        )
+        self._address = (parts.hostname, parts.port)
+        self._prefix = parts.path.rstrip("/")
+        self._timeout = timeout
+        self._conn = None
+
+    def request(self, method, path, token=None, body=None, compressed=False):
+        headers = {"Accept": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        if compressed:
+            # как браузер: сжатие ответа входит в измеряемое время
+            headers["Accept-Encoding"] = "gzip"
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+
+        if self._conn is None:
+            self._conn = self._connection_class(*self._address, timeout=self._timeout)
+        try:
+            self._conn.request(method, self._prefix + path, payload, headers)
+            response = self._conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+        if response.getheader("Content-Encoding") == "gzip":
+            data = gzip.decompress(data)
+        return response.status, data
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+@dataclass
+class RoleData:
+    token: str
+    machines: list  # [(id, serial_number)]
+    machine_pages: int
+    claim_pages: int
+    maintenance_pages: int
+
+
+@dataclass
+class Context:
+    roles: dict
+    failure_nodes: list
+    repair_methods: list
+    serials: list = field(default_factory=list)
+
+
+def _pages(count):
+    return max(1, min(MAX_PAGE, math.ceil(count / PAGE_SIZE)))
+
+
+def _get_json(conn, path, token=None):
+    try:
+        status, data = conn.request("GET", path, token)
+    except (OSError, http.client.HTTPException) as exc:
+        raise LoadTestError(f"GET {path}: {exc}")
+    if status != 200:
+        raise LoadTestError(f"GET {path}: HTTP {status}")
+    return json.loads(data)
+
+
+def login(conn, username, password):
+    try:
+        status, data = conn.request(
+            "POST", "/api/auth/token/", body={"username": username, "password": password}
+        )
+    except (OSError, http.client.HTTPException) as exc:
+        raise LoadTestError(f"Сервер недоступен: {exc}")
+    if status != 200:
+        raise LoadTestError(f"Не удалось войти как {username}: HTTP {status}")
+    return json.loads(data)["access"]
+
+
+def _references(conn, token, category):
+    data = _get_json(conn, "/api/references/?" + urlencode({"category": category}), token)
+    return [item["id"] for item in data]
+
+
+def prepare(base_url, users, password, timeout=30):
+    """Входит под ролями users ({роль: username}) и собирает данные для запросов."""
+    conn = Connection(base_url, timeout)
+    try:
+        roles = {}
+        for role in ROLES:
+            token = login(conn, users[role], password)
+            machines = _get_json(
+                conn, f"/api/machines/?page=1&page_size={SAMPLE_SIZE}", token
+            )
+            if not machines["results"]:
+                raise LoadTestError(
+                    f"Пользователю {users[role]} не видно ни одной машины "
+                    "(см. generate_benchmark_data)."
+                )
+            claims = _get_json(conn, "/api/claims/?page=1&page_size=1", token)
+            maintenance = _get_json(conn, "/api/maintenance/?page=1&page_size=1", token)
+            roles[role] = RoleData(
+                token=token,
+                machines=[(item["id"], item["serial_number"]) for item in machines["results"]],
+                machine_pages=_pages(machines["count"]),
+                claim_pages=_pages(claims["count"]),
+                maintenance_pages=_pages(maintenance["count"]),
+            )
+
+        manager_token = roles["manager"].token
+        context = Context(
+            roles=roles,
+            failure_nodes=_references(conn, manager_token, "failure_node"),
+            repair_methods=_references(conn, manager_token, "repair_method"),
+        )
+    finally:
+        conn.close()
+
+    if not context.failure_nodes or not context.repair_methods:
+        raise LoadTestError("В справочниках нет узлов отказа или способов восстановления.")
+    context.serials = [serial for _, serial in roles["manager"].machines]
+    return context
+
+
+def _page_query(rng, pages, **params):
+    return urlencode({"page": rng.randint(1, pages), "page_size": PAGE_SIZE, **params})
+
+
+def _machines_list(ctx, role, rng):
+    return "GET", f"/api/machines/?{_page_query(rng, ctx.roles[role].machine_pages)}", None
+
+
+def _machine_detail(ctx, role, rng):
+    machine_id, _ = rng.choice(ctx.roles[role].machines)
+    return "GET", f"/api/machines/{machine_id}/", None
+
+
+def _claims_list(ctx, role, rng):
+    return "GET", f"/api/claims/?{_page_query(rng, ctx.roles[role].claim_pages)}", None
+
+
+def _claims_filter(ctx, role, rng):
+    start = date.today() - timedelta(days=rng.randint(90, 3 * 365))
+    query = urlencode(
+        {
+            "failure_date__gte": start.isoformat(),
+            "failure_date__lte": (start + timedelta(days=90)).isoformat(),
+            "page": 1,
+            "page_size": PAGE_SIZE,
+        }
+    )
+    return "GET", f"/api/claims/?{query}", None
+
+
+def _claims_search(ctx, role, rng):
+    query = urlencode({"search": rng.choice(SEARCH_WORDS), "page": 1, "page_size": PAGE_SIZE})
+    return "GET", f"/api/claims/?{query}", None
+
+
+def _maintenance_list(ctx, role, rng):
+    query = _page_query(rng, ctx.roles[role].maintenance_pages)
+    return "GET", f"/api/maintenance/?{query}", None
+
+
+def _machines_export(ctx, role, rng):
+    return "GET", "/api/machines/?export=1", None
+
+
+def _claim_create(ctx, role, rng):
+    machine_id, _ = rng.choice(ctx.roles[role].machines)
+    failure_date = date.today() - timedelta(days=rng.randint(1, 30))
+    body = {
+        "failure_date": failure_date.isoformat(),
+        "operating_time": rng.randint(1, 5000),
+        "failure_node_id": rng.choice(ctx.failure_nodes),
+        "failure_description": f"{CLAIM_MARKER} {rng.choice(SEARCH_WORDS)}",
+        "repair_method_id": rng.choice(ctx.repair_methods),
+        "spare_parts": "",
+        "recovery_date": (failure_date + timedelta(days=rng.randint(0, 5))).isoformat(),
+        "machine_id": machine_id,
+    }
+    return "POST", "/api/claims/", body
+
+
+def _public_search(ctx, role, rng):
+    return "GET", "/api/public/machines/search/?" + urlencode({"serial": rng.choice(ctx.serials)}), None
+
+
+@dataclass(frozen=True)
+class Scenario:
+    # роли, от лица которых идёт запрос; None — гость без токена
+    roles: tuple
+    build: Callable
+
+
+SCENARIOS = {
+    "machines_list": Scenario(ROLES, _machines_list),
+    "machine_detail": Scenario(ROLES, _machine_detail),
+    "claims_list": Scenario(ROLES, _claims_list),
+    "claims_filter": Scenario(("service", "manager"), _claims_filter),
+    "claims_search": Scenario(("service", "manager"), _claims_search),
+    "maintenance_list": Scenario(ROLES, _maintenance_list),
+    "machines_export": Scenario(("client",), _machines_export),
+    "claim_create": Scenario(("service",), _claim_create),
+    "public_search": Scenario((None,), _public_search),
+}
+
+DEFAULT_MIX = (
+    "machines_list=20,machine_detail=15,claims_list=15,claims_filter=10,"
+    "claims_search=5,maintenance_list=10,machines_export=3,claim_create=2,public_search=20"
+)
+
+
+def parse_mix(text):
+    """'machines_list=20,claim_create=2' -> {сценарий: вес}; в прогон идут только перечисленные."""
+    mix = {}
+    for part in filter(None, (chunk.strip() for chunk in text.split(","))):
+        name, sep, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise LoadTestError(
+                f"Неизвестный сценарий {name!r}; доступны: {', '.join(SCENARIOS)}"
+            )
+        try:
+            mix[name] = float(weight) if sep else 1.0
+        except ValueError:
+            raise LoadTestError(f"Вес сценария {name} должен быть числом: {weight!r}")
+        if mix[name] < 0:
+            raise LoadTestError(f"Вес сценария {name} не может быть отрицательным.")
+    if not any(mix.values()):
+        raise LoadTestError("В смеси нет ни одного сценария с положительным весом.")
+    return mix
+
+
+def _worker(base_url, ctx, mix, seed, measure_from, deadline, timeout):
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    conn = Connection(base_url, timeout)
+    samples = []
+    try:
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            scenario = SCENARIOS[name]
+            role = rng.choice(scenario.roles)
+            method, path, body = scenario.build(ctx, role, rng)
+            token = ctx.roles[role].token if role else None
+
+            started = time.perf_counter()
+            try:
+                status, _ = conn.request(method, path, token, body, compressed=True)
+            except (OSError, http.client.HTTPException):
+                status = 0
+            elapsed = time.perf_counter() - started
+
+            if started >= measure_from:
+                samples.append((name, status, elapsed))
+            if status == 0:
+                time.sleep(ERROR_BACKOFF)
+    finally:
+        conn.close()
+    return samples
+
+
+def _percentile(values, percent):
+    # ближайший ранг: значение, не превышенное percent% замеров
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+def _stats(samples, seconds):
+    latencies = sorted(elapsed * 1000 for _, _, elapsed in samples)
+    statuses = Counter(status for _, status, _ in samples)
+    # 429 — не ошибка сервера, а сработавшее ограничение частоты
+    errors = sum(
+        count for status, count in statuses.items() if status == 0 or (status >= 400 and status != 429)
+    )
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / seconds, 2),
+        **{f"p{percent}_ms": round(_percentile(latencies, percent), 2) for percent in PERCENTILES},
+        "max_ms": round(latencies[-1], 2),
+        "error_rate": round(errors / len(samples), 4),
+        "throttled": statuses[429],
+        # 0 — ошибка соединения или таймаут
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def summarize(samples, seconds):
+    by_scenario = defaultdict(list)
+    for sample in samples:
+        by_scenario[sample[0]].append(sample)
+    return {
+        "total": _stats(samples, seconds) if samples else None,
+        "endpoints": {name: _stats(items, seconds) for name, items in sorted(by_scenario.items())},
+    }
+
+
+def git_revision():
+    """Текущий коммит (с пометкой -dirty при незакоммиченных правках) или None."""
+    try:
+        result = subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).resolve().parent,
+            timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def run_load(base_url, ctx, mix, duration, warmup=0, concurrency=8, seed=1, timeout=30):
+    """
+    Гоняет смесь mix в concurrency потоков warmup + duration секунд; первые
+    warmup секунд (прогрев кешей и соединений) в статистику не входят.
+    """
+    started_at = datetime.now(timezone.utc)
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            executor.submit(
+                _worker, base_url, ctx, mix, seed * 1000 + n, measure_from, deadline, timeout
+            )
+            for n in range(concurrency)
+        ]
+        samples = [sample for future in futures for sample in future.result()]
+
+    # последние запросы потоков заканчиваются чуть позже deadline
+    seconds = max(time.perf_counter() - measure_from, 1e-9)
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "url": base_url,
+            "duration": duration,
+            "warmup": warmup,
+            "concurrency": concurrency,
+            "seed": seed,
+            "mix": mix,
+        },
+        **summarize(samples, seconds),
+    }
+
+
+def compare_reports(current, baseline):
+    """
+    Строки сравнения с прошлым отчётом: (сценарий, метрика, было, стало,
+    изменение в %). Сравниваются только сценарии, которые есть в обоих.
+    """
+    rows = []
+    names = ["total", *sorted(set(current["endpoints"]) & set(baseline["endpoints"]))]
+    for name in names:
+        now = current["total"] if name == "total" else current["endpoints"][name]
+        before = baseline["total"] if name == "total" else baseline["endpoints"][name]
+        if not now or not before:
+            continue
+        for metric in ("rps", "p50_ms", "p99_ms", "error_rate"):
+            old, new = before[metric], now[metric]
+            change = (new - old) / old * 100 if old else None
+            rows.append((name, metric, old, new, change))
+    return rows
@@ -0,0 +1,67 @@
+from claims.models import Claim
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from machines.models import Machine
+from maintenance.models import Maintenance
+from users.models import UserProfile
+
+User = get_user_model()
+
+# списки так, как их строят вьюсеты: выборка по роли + сортировка модели
+ROLE_QUERIES = {
+    "machines": lambda user: Machine.objects.visible_to(user),
+    "claims": lambda user: Claim.objects.visible_to(user),
+    "maintenance": lambda user: Maintenance.objects.visible_to(user),
+}
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN для списков машин, рекламаций и ТО от лица клиента и сервисной компании"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--client", help="username клиента (по умолчанию — первый клиент)")
+        parser.add_argument("--service", help="username сервисной компании (по умолчанию — первая)")
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=50,
+            help="Размер первой страницы; 0 — весь список",
+        )
+        parser.add_argument(
+            "--no-analyze",
+            action="store_true",
+            help="Только план, без выполнения запроса",
+        )
+
+    def handle(self, *args, **options):
+        users = [
+            self._get_user(UserProfile.Role.CLIENT, options["client"]),
+            self._get_user(UserProfile.Role.SERVICE, options["service"]),
+        ]
+
+        explain_options = {}
+        if connection.vendor == "postgresql" and not options["no_analyze"]:
+            explain_options = {"analyze": True, "buffers": True}
+
+        for user in users:
+            for name, build in ROLE_QUERIES.items():
+                qs = build(user)
+                if options["limit"]:
+                    qs = qs[: options["limit"]]
+
+                self.stdout.write(
+                    self.style.MIGRATE_HEADING(f"{name} / {user.profile.role} ({user.username})")
+                )
+                self.stdout.write(qs.explain(**explain_options))
+                self.stdout.write("")
+
+    def _get_user(self, role, username):
+        qs = User.objects.filter(profile__role=role).select_related("profile")
+        if username:
+            qs = qs.filter(username=username)
+
+        user = qs.order_by("pk").first()
+        if user is None:
+            raise CommandError(f"Не найден пользователь с ролью {role}.")
+        return user
@@ -0,0 +1,204 @@
+import random
+from datetime import date, timedelta
+
+from claims.models import Claim
+from core.signals import records_bulk_saved
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from machines.models import Machine
+from maintenance.models import Maintenance
+from references.models import ReferenceItem
+from users.models import UserProfile
+
+User = get_user_model()
+
+PREFIX = "bench"
+BATCH_SIZE = 5000
+
+REFERENCE_COUNTS = {
+    ReferenceItem.Category.MACHINE_MODEL: 12,
+    ReferenceItem.Category.ENGINE_MODEL: 8,
+    ReferenceItem.Category.TRANSMISSION_MODEL: 6,
+    ReferenceItem.Category.DRIVE_AXLE_MODEL: 5,
+    ReferenceItem.Category.STEER_AXLE_MODEL: 5,
+    ReferenceItem.Category.MAINTENANCE_TYPE: 4,
+    ReferenceItem.Category.FAILURE_NODE: 10,
+    ReferenceItem.Category.REPAIR_METHOD: 5,
+    ReferenceItem.Category.SERVICE_ORGANIZATION: 6,
+}
+
+FAILURES = [
+    "Течь гидроцилиндра подъёма",
+    "Не запускается двигатель",
+    "Стук в ведущем мосту",
+    "Перегрев трансмиссии",
+    "Износ тормозных колодок",
+    "Люфт рулевого управления",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерация синтетического набора данных для бенчмарков и нагрузочных тестов "
+        f"(пользователи {PREFIX}_manager, {PREFIX}_client_N, {PREFIX}_service_N)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--machines", type=int, default=10000)
+        parser.add_argument("--clients", type=int, default=200)
+        parser.add_argument("--services", type=int, default=20)
+        parser.add_argument("--claims-per-machine", type=float, default=5)
+        parser.add_argument("--maintenance-per-machine", type=float, default=10)
+        parser.add_argument("--years", type=int, default=5)
+        parser.add_argument("--password", default="bench-pass-123")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        if Machine.objects.filter(serial_number__startswith=f"{PREFIX.upper()}-").exists():
+            raise CommandError("Бенчмарк-данные уже сгенерированы в этой базе.")
+
+        rnd = random.Random(options["seed"])
+
+        with transaction.atomic():
+            refs = self._create_references()
+            clients, services = self._create_users(options)
+            machines = self._create_machines(options, rnd, refs, clients, services)
+            claims = self._create_claims(options, rnd, refs, machines)
+            maintenance = self._create_maintenance(options, rnd, refs, machines)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано: машин {len(machines)}, рекламаций {claims}, ТО {maintenance}. "
+                "Пересчитайте производные данные: rebuild_machine_stats, refresh_analytics."
+            )
+        )
+
+    def _create_references(self):
+        items = [
+            ReferenceItem(category=category, name=f"{PREFIX} {category} {n}")
+            for category, count in REFERENCE_COUNTS.items()
+            for n in range(1, count + 1)
+        ]
+        created = ReferenceItem.objects.bulk_create(items)
+
+        refs = {}
+        for item in created:
+            refs.setdefault(item.category, []).append(item.pk)
+        return refs
+
+    def _create_users(self, options):
+        password = make_password(options["password"])
+
+        specs = [(f"{PREFIX}_manager", UserProfile.Role.MANAGER)]
+        specs += [(f"{PREFIX}_client_{n}", UserProfile.Role.CLIENT) for n in range(options["clients"])]
+        specs += [(f"{PREFIX}_service_{n}", UserProfile.Role.SERVICE) for n in range(options["services"])]
+
+        users = User.objects.bulk_create(
+            [User(username=username, password=password) for username, _ in specs]
+        )
+        # bulk_create не отправляет post_save, профили создаём сами
+        UserProfile.objects.bulk_create(
+            [
+                UserProfile(user=user, role=role, organization_name=user.username)
+                for user, (_, role) in zip(users, specs)
+            ]
+        )
+
+        roles = [role for _, role in specs]
+        clients = [u.pk for u, r in zip(users, roles) if r == UserProfile.Role.CLIENT]
+        services = [u.pk for u, r in zip(users, roles) if r == UserProfile.Role.SERVICE]
+        return clients, services
+
+    def _create_machines(self, options, rnd, refs, clients, services):
+        start = date.today() - timedelta(days=365 * options["years"])
+        # несколько крупных сервисных компаний и длинный хвост мелких
+        service_weights = [1 / (n + 1) for n in range(len(services))]
+        machines = []
+        batch = []
+        for n in range(options["machines"]):
+            batch.append(
+                Machine(
+                    serial_number=f"{PREFIX.upper()}-{n:07d}",
+                    machine_model_id=rnd.choice(refs[ReferenceItem.Category.MACHINE_MODEL]),
+                    engine_model_id=rnd.choice(refs[ReferenceItem.Category.ENGINE_MODEL]),
+                    transmission_model_id=rnd.choice(refs[ReferenceItem.Category.TRANSMISSION_MODEL]),
+                    drive_axle_model_id=rnd.choice(refs[ReferenceItem.Category.DRIVE_AXLE_MODEL]),
+                    steer_axle_model_id=rnd.choice(refs[ReferenceItem.Category.STEER_AXLE_MODEL]),
+                    shipment_date=start + timedelta(days=rnd.randrange(365 * options["years"])),
+                    consignee="ООО «Бенчмарк»",
+                    delivery_address="г. Москва",
+                    client_id=rnd.choice(clients) if clients and rnd.random() < 0.9 else None,
+                    service_company_id=(
+                        rnd.choices(services, weights=service_weights)[0] if services else None
+                    ),
+                )
+            )
+            if len(batch) >= BATCH_SIZE:
+                machines += Machine.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            machines += Machine.objects.bulk_create(batch)
+
+        records_bulk_saved.send(sender=Machine, instances=machines)
+        return machines
+
+    def _events(self, rnd, machine, per_machine):
+        """Даты и наработка событий машины после отгрузки, по возрастанию."""
+        count = int(per_machine) + (1 if rnd.random() < per_machine % 1 else 0)
+        horizon = max((date.today() - machine.shipment_date).days, 1)
+        offsets = sorted(rnd.randrange(horizon) for _ in range(count))
+        return [(machine.shipment_date + timedelta(days=d), d * 8) for d in offsets]
+
+    def _create_claims(self, options, rnd, refs, machines):
+        created = 0
+        batch = []
+        for machine in machines:
+            for failure_date, hours in self._events(rnd, machine, options["claims_per_machine"]):
+                recovery = failure_date + timedelta(days=rnd.randrange(0, 15))
+                claim = Claim(
+                    machine_id=machine.pk,
+                    failure_date=failure_date,
+                    recovery_date=recovery if rnd.random() < 0.9 else None,
+                    operating_time=hours,
+                    failure_node_id=rnd.choice(refs[ReferenceItem.Category.FAILURE_NODE]),
+                    failure_description=rnd.choice(FAILURES),
+                    repair_method_id=rnd.choice(refs[ReferenceItem.Category.REPAIR_METHOD]),
+                    spare_parts="Уплотнения, фильтр",
+                    service_company_id=machine.service_company_id,
+                )
+                claim.calculate_downtime()
+                batch.append(claim)
+            if len(batch) >= BATCH_SIZE:
+                created += len(Claim.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            created += len(Claim.objects.bulk_create(batch))
+        return created
+
+    def _create_maintenance(self, options, rnd, refs, machines):
+        created = 0
+        batch = []
+        for machine in machines:
+            for maintenance_date, hours in self._events(rnd, machine, options["maintenance_per_machine"]):
+                batch.append(
+                    Maintenance(
+                        machine_id=machine.pk,
+                        maintenance_type_id=rnd.choice(refs[ReferenceItem.Category.MAINTENANCE_TYPE]),
+                        maintenance_date=maintenance_date,
+                        operating_time=hours,
+                        work_order_number=f"WO-{machine.pk}-{hours}",
+                        work_order_date=maintenance_date,
+                        service_organization_id=rnd.choice(
+                            refs[ReferenceItem.Category.SERVICE_ORGANIZATION]
+                        ),
+                        service_company_id=machine.service_company_id,
+                    )
+                )
+            if len(batch) >= BATCH_SIZE:
+                created += len(Maintenance.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            created += len(Maintenance.objects.bulk_create(batch))
+        return created
@@ -0,0 +1,138 @@
+import json
+from pathlib import Path
+
+from claims.models import Claim
+from core.loadtest import (
+    CLAIM_MARKER,
+    DEFAULT_MIX,
+    SCENARIOS,
+    LoadTestError,
+    compare_reports,
+    parse_mix,
+    prepare,
+    run_load,
+)
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный прогон против запущенного сервера: клиент, сервисная компания, "
+        "менеджер и гость в заданной смеси запросов. Отчёт — пропускная способность, "
+        "перцентили задержки и доля ошибок по сценариям; --output сохраняет его в JSON, "
+        "--compare сравнивает с прошлым отчётом. По умолчанию входит пользователями "
+        "generate_benchmark_data. Сценарии: " + ", ".join(SCENARIOS) + "."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="Адрес сервера")
+        parser.add_argument("--client", default="bench_client_0", help="username клиента")
+        parser.add_argument("--service", default="bench_service_0", help="username сервисной компании")
+        parser.add_argument("--manager", default="bench_manager", help="username менеджера")
+        parser.add_argument("--password", default="bench-pass-123", help="Пароль всех трёх пользователей")
+        parser.add_argument(
+            "--mix",
+            default=DEFAULT_MIX,
+            help="Веса сценариев: machines_list=20,claim_create=2 (только перечисленные)",
+        )
+        parser.add_argument("--duration", type=int, default=30, help="Секунд замера")
+        parser.add_argument("--warmup", type=int, default=5, help="Секунд прогрева до замера")
+        parser.add_argument("--concurrency", type=int, default=8, help="Одновременных соединений")
+        parser.add_argument("--seed", type=int, default=1, help="Seed последовательности запросов")
+        parser.add_argument("--timeout", type=float, default=30, help="Таймаут запроса, секунд")
+        parser.add_argument("--output", help="Сохранить отчёт в JSON-файл")
+        parser.add_argument("--compare", help="JSON-отчёт прошлого прогона для сравнения")
+        parser.add_argument(
+            "--cleanup",
+            action="store_true",
+            help=(
+                f"После прогона удалить рекламации «{CLAIM_MARKER} …» из базы этого "
+                "проекта (когда сервер работает с той же базой)"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["compare"]:
+            try:
+                baseline = json.loads(Path(options["compare"]).read_text(encoding="utf-8"))
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Не удалось прочитать {options['compare']}: {exc}")
+
+        users = {role: options[role] for role in ("client", "service", "manager")}
+        try:
+            mix = parse_mix(options["mix"])
+            ctx = prepare(options["url"], users, options["password"], options["timeout"])
+            self.stdout.write(
+                f"Прогон: {options['url']}, {options['concurrency']} соединений, "
+                f"прогрев {options['warmup']} с, замер {options['duration']} с"
+            )
+            report = run_load(
+                options["url"],
+                ctx,
+                mix,
+                duration=options["duration"],
+                warmup=options["warmup"],
+                concurrency=options["concurrency"],
+                seed=options["seed"],
+                timeout=options["timeout"],
+            )
+        except LoadTestError as exc:
+            raise CommandError(str(exc))
+
+        if report["total"] is None:
+            raise CommandError("За время замера не завершилось ни одного запроса.")
+
+        self.write_report(report)
+        if report["total"]["throttled"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Ответов 429: {report['total']['throttled']} — быстрые отказы занижают "
+                    "перцентили; для замера поднимите на сервере PUBLIC_SEARCH_RATE_*."
+                )
+            )
+        if baseline:
+            self.write_comparison(report, baseline)
+
+        if options["output"]:
+            Path(options["output"]).write_text(
+                json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8"
+            )
+            self.stdout.write(f"Отчёт: {options['output']}")
+
+        if options["cleanup"]:
+            deleted, _ = Claim.objects.filter(
+                failure_description__startswith=CLAIM_MARKER
+            ).delete()
+            self.stdout.write(f"Удалено рекламаций прогона: {deleted}")
+
+    def write_report(self, report):
+        header = (
+            f"{'сценарий':<18}{'запросов':>9}{'в сек':>9}{'p50 мс':>9}{'p90 мс':>9}"
+            f"{'p99 мс':>9}{'макс мс':>9}{'ошибок':>8}{'429':>6}"
+        )
+        self.stdout.write(header)
+        rows = [*report["endpoints"].items(), ("всего", report["total"])]
+        for name, stats in rows:
+            line = (
+                f"{name:<18}{stats['requests']:>9}{stats['rps']:>9.1f}{stats['p50_ms']:>9.1f}"
+                f"{stats['p90_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.1f}"
+                f"{stats['error_rate']:>8.1%}{stats['throttled']:>6}"
+            )
+            style = self.style.ERROR if stats["error_rate"] else self.style.SUCCESS
+            self.stdout.write(style(line) if name == "всего" else line)
+
+    def write_comparison(self, report, baseline):
+        meta = baseline.get("meta", {})
+        self.stdout.write(f"Сравнение с {meta.get('revision') or '?'}:")
+        differs = [
+            key for key in ("mix", "concurrency", "duration", "seed")
+            if meta.get(key) != report["meta"][key]
+        ]
+        if differs:
+            self.stdout.write(
+                self.style.WARNING(f"  параметры прогонов различаются: {', '.join(differs)}")
+            )
+        for name, metric, old, new, change in compare_reports(report, baseline):
+            delta = f"{change:+.1f}%" if change is not None else "—"
+            self.stdout.write(f"  {name:<18}{metric:<12}{old:>10}{new:>10}{delta:>10}")
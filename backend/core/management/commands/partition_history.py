@@ -0,0 +1,98 @@
+from datetime import date
+
+from core.partitioning import (
+    HISTORY_TABLES,
+    INTERVAL_MONTHS,
+    PartitioningError,
+    archive_partitions,
+    convert_table,
+    create_partitions,
+    export_partitions,
+)
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Секционирование истории рекламаций и ТО по дате (PostgreSQL). "
+        "convert — перевести таблицу в секционированную; create — создать секции наперёд; "
+        "archive — перенести старые секции в табличное пространство; "
+        "export — выгрузить старые секции в .csv.gz и удалить их."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["convert", "create", "archive", "export"])
+        parser.add_argument(
+            "--table",
+            action="append",
+            dest="tables",
+            choices=sorted(HISTORY_TABLES),
+            help="Таблица истории (можно указать несколько раз). По умолчанию — все.",
+        )
+        parser.add_argument(
+            "--interval",
+            choices=sorted(INTERVAL_MONTHS),
+            default="year",
+            help="Период секции для convert (по умолчанию year)",
+        )
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=1,
+            help="Сколько будущих периодов держать созданными (convert, create)",
+        )
+        parser.add_argument(
+            "--before",
+            type=date.fromisoformat,
+            help="archive/export: секции, целиком лежащие до этой даты (YYYY-MM-DD)",
+        )
+        parser.add_argument("--tablespace", help="archive: архивное табличное пространство")
+        parser.add_argument("--dir", dest="directory", help="export: каталог для .csv.gz")
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="export: не удалять выгруженные секции",
+        )
+
+    def handle(self, *args, **options):
+        action = options["action"]
+        tables = options["tables"] or sorted(HISTORY_TABLES)
+
+        if action in ("archive", "export") and not options["before"]:
+            raise CommandError("Укажите --before.")
+        if action == "archive" and not options["tablespace"]:
+            raise CommandError("Укажите --tablespace.")
+        if action == "export" and not options["directory"]:
+            raise CommandError("Укажите --dir.")
+
+        for name in tables:
+            try:
+                if action == "convert":
+                    result = convert_table(name, options["interval"], options["ahead"])
+                    message = f"секций создано: {len(result)}"
+                elif action == "create":
+                    result = create_partitions(name, options["ahead"])
+                    message = f"новых секций: {len(result)}"
+                elif action == "archive":
+                    result = archive_partitions(name, options["before"], options["tablespace"])
+                    message = f"перенесено в {options['tablespace']}: {len(result)}"
+                else:
+                    result = export_partitions(
+                        name,
+                        options["before"],
+                        options["directory"],
+                        drop=not options["keep"],
+                    )
+                    message = f"выгружено секций: {len(result)}"
+            except PartitioningError as exc:
+                raise CommandError(str(exc))
+
+            self.stdout.write(self.style.SUCCESS(f"{name}: {message}"))
+            for item in result:
+                self.stdout.write(f"  {item}")
+
+        if action == "export" and not options["keep"]:
+            self.stdout.write(
+                "Удалённые секции не попадают в сводки: выполните rebuild_machine_stats "
+                "и refresh_analytics."
+            )
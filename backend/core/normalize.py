@@ -0,0 +1,51 @@
+"""
+Режим ?normalize=1 для списков: вложенные элементы справочников
+заменяются их id, а сами элементы один раз отдаются в references.
+"""
+
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
+from references.serializers import ReferenceItemSerializer
+
+NORMALIZE_PARAMETER = OpenApiParameter(
+    name="normalize",
+    type=OpenApiTypes.BOOL,
+    location=OpenApiParameter.QUERY,
+    required=False,
+    description=(
+        "Если равно 1, справочники в записях заменяются их id, а сами элементы "
+        "отдаются один раз: {\"results\": [...], \"references\": {id: элемент}}."
+    ),
+)
+
+
+class NormalizedReferencesMixin:
+    """
+    Добавляет во вьюсет режим ?normalize=1 для list. ReferenceItemSerializer
+    при наличии context["references"] складывает туда элемент и отдаёт id.
+    """
+
+    def is_normalized(self):
+        return self.action == "list" and self.request.query_params.get("normalize") == "1"
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.is_normalized():
+            self._references = context["references"] = {}
+        return context
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if not self.is_normalized() or response.status_code != 200:
+            return response
+
+        references = {
+            item["id"]: item
+            for item in ReferenceItemSerializer(
+                sorted(self._references.values(), key=lambda ref: ref.pk), many=True
+            ).data
+        }
+        if isinstance(response.data, dict):
+            response.data["references"] = references
+        else:
+            response.data = {"results": response.data, "references": references}
+        return response
@@ -0,0 +1,113 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+from .counts import bounded_count, planner_estimate
+from .generations import generations_key
+
+COUNT_CACHE_TIMEOUT = 300
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    До exact_count_limit строк считает точно (COUNT с LIMIT), выше —
+    берёт оценку планировщика и держит её в кеше до следующей записи
+    в таблицы count_models, чтобы число не прыгало между страницами.
+    """
+
+    def __init__(self, *args, exact_count_limit, count_models, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.exact_count_limit = exact_count_limit
+        self.count_models = count_models
+        self.count_is_exact = True
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+
+        count = bounded_count(queryset, self.exact_count_limit)
+        if count <= self.exact_count_limit:
+            return count
+
+        sql, params = queryset.order_by().query.sql_with_params()
+        digest = hashlib.md5(repr((sql, params)).encode()).hexdigest()
+        key = f"count:{generations_key(*self.count_models)}:{digest}"
+
+        estimate = cache.get(key)
+        if estimate is None:
+            estimate = planner_estimate(queryset)
+            if estimate is None:
+                # без оценки планировщика (не PostgreSQL) считаем точно
+                return queryset.count()
+            # оценка не может быть меньше уже посчитанного
+            estimate = max(estimate, self.exact_count_limit + 1)
+            cache.set(key, estimate, COUNT_CACHE_TIMEOUT)
+
+        self.count_is_exact = False
+        return estimate
+
+
+class ApproximateCountPagination(PageNumberPagination):
+    """
+    Постраничный вывод по запросу: без ?page / ?page_size список отдаётся
+    целиком, как раньше. Ответ: count, count_is_exact, next, previous, results.
+    Модели, от которых зависит число записей, задаются во вьюсете
+    атрибутом cache_models или методом get_cache_models (по умолчанию —
+    модель queryset).
+    """
+
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.page_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        if hasattr(view, "get_cache_models"):
+            self.count_models = view.get_cache_models()
+        else:
+            self.count_models = getattr(view, "cache_models", None) or (queryset.model,)
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page, **kwargs):
+        return ApproximateCountPaginator(
+            object_list,
+            per_page,
+            exact_count_limit=settings.API_EXACT_COUNT_LIMIT,
+            count_models=self.count_models,
+            **kwargs,
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.page.paginator.count,
+                "count_is_exact": self.page.paginator.count_is_exact,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        paginated = super().get_paginated_response_schema(schema)
+        paginated["properties"]["count_is_exact"] = {"type": "boolean"}
+        paginated["required"].append("count_is_exact")
+        # без ?page / ?page_size ответ остаётся простым массивом
+        return {"oneOf": [schema, paginated]}
+
+
+class ExportListMixin:
+    """?export=1 — весь отфильтрованный список без постраничного вывода."""
+
+    def paginate_queryset(self, queryset):
+        if self.request.query_params.get("export") == "1":
+            return None
+        return super().paginate_queryset(queryset)
@@ -0,0 +1,360 @@
+"""
+Секционирование истории (рекламации, ТО) по дате — только PostgreSQL и по желанию.
+
+Таблица один раз переводится в секционированную по диапазону дат (по годам
+или кварталам), дальше команда partition_history создаёт секции наперёд,
+переносит старые секции в архивное табличное пространство или выгружает
+их в сжатые CSV. Запросы с фильтром по дате (failure_date / maintenance_date)
+читают только нужные секции.
+
+Первичный ключ секционированной таблицы — (id, дата): PostgreSQL требует,
+чтобы уникальные ключи включали ключ секционирования. id по-прежнему берётся
+из последовательности и уникален.
+"""
+
+import gzip
+import re
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+from django.apps import apps
+from django.db import connection, transaction
+
+# имя для команды -> (модель, колонка даты)
+HISTORY_TABLES = {
+    "claims": ("claims.Claim", "failure_date"),
+    "maintenance": ("maintenance.Maintenance", "maintenance_date"),
+}
+
+INTERVAL_MONTHS = {"year": 12, "quarter": 3}
+
+BOUND_RE = re.compile(r"FROM \('(?P<start>[\d-]+)'\) TO \('(?P<end>[\d-]+)'\)")
+
+
+class PartitioningError(Exception):
+    pass
+
+
+@dataclass
+class Partition:
+    name: str
+    start: date | None
+    end: date | None
+    tablespace: str | None
+
+    @property
+    def is_default(self):
+        return self.start is None
+
+
+def _table(name):
+    try:
+        model_label, column = HISTORY_TABLES[name]
+    except KeyError:
+        raise PartitioningError(f"Неизвестная таблица истории: {name}")
+    model = apps.get_model(model_label)
+    return model._meta.db_table, column, model._meta.pk.column
+
+
+def _check_vendor():
+    if connection.vendor != "postgresql":
+        raise PartitioningError("Секционирование поддерживается только на PostgreSQL.")
+
+
+def period_start(day, interval):
+    months = INTERVAL_MONTHS[interval]
+    return date(day.year, (day.month - 1) // months * months + 1, 1)
+
+
+def next_period(start, interval):
+    month = start.month - 1 + INTERVAL_MONTHS[interval]
+    return date(start.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(table, start, interval):
+    if interval == "year":
+        return f"{table}_y{start.year}"
+    return f"{table}_{start.year}q{(start.month - 1) // 3 + 1}"
+
+
+def is_partitioned(cursor, table):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = %s::regclass", [table])
+    return cursor.fetchone()[0] == "p"
+
+
+def list_partitions(cursor, table):
+    cursor.execute(
+        """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), t.spcname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        LEFT JOIN pg_tablespace t ON t.oid = c.reltablespace
+        WHERE i.inhparent = %s::regclass
+        ORDER BY c.relname
+        """,
+        [table],
+    )
+    partitions = []
+    for name, bound, tablespace in cursor.fetchall():
+        match = BOUND_RE.search(bound)
+        if match:
+            start = date.fromisoformat(match["start"])
+            end = date.fromisoformat(match["end"])
+        else:
+            start = end = None
+        partitions.append(Partition(name, start, end, tablespace))
+    return sorted(partitions, key=lambda p: (p.start is None, p.start))
+
+
+def detect_interval(partitions):
+    for partition in partitions:
+        if not partition.is_default:
+            months = (partition.end.year - partition.start.year) * 12 + (
+                partition.end.month - partition.start.month
+            )
+            return "year" if months == 12 else "quarter"
+    raise PartitioningError("Не найдено ни одной секции по датам.")
+
+
+def _create_partition(cursor, table, column, start, interval, default_name):
+    end = next_period(start, interval)
+    name = partition_name(table, start, interval)
+
+    moved = False
+    if default_name:
+        cursor.execute(
+            f'SELECT 1 FROM "{default_name}" WHERE "{column}" >= %s AND "{column}" < %s LIMIT 1',
+            [start, end],
+        )
+        moved = cursor.fetchone() is not None
+    # строки периода уже лежат в секции по умолчанию: новая секция не создастся,
+    # пока они там, поэтому секция по умолчанию отсоединяется на время переноса
+    if moved:
+        cursor.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{default_name}"')
+
+    cursor.execute(
+        f'CREATE TABLE "{name}" PARTITION OF "{table}" FOR VALUES FROM (%s) TO (%s)',
+        [start, end],
+    )
+
+    if moved:
+        where = f'"{column}" >= %s AND "{column}" < %s'
+        cursor.execute(
+            f'INSERT INTO "{table}" SELECT * FROM "{default_name}" WHERE {where}',
+            [start, end],
+        )
+        cursor.execute(f'DELETE FROM "{default_name}" WHERE {where}', [start, end])
+        cursor.execute(f'ALTER TABLE "{table}" ATTACH PARTITION "{default_name}" DEFAULT')
+    return name
+
+
+def _create_range(cursor, table, column, first, last, interval, existing, default_name):
+    created = []
+    start = period_start(first, interval)
+    while start <= last:
+        if start not in existing:
+            created.append(
+                _create_partition(cursor, table, column, start, interval, default_name)
+            )
+        start = next_period(start, interval)
+    return created
+
+
+def _future_limit(interval, ahead):
+    last = period_start(date.today(), interval)
+    for _ in range(ahead):
+        last = next_period(last, interval)
+    return last
+
+
+@transaction.atomic
+def convert_table(name, interval, ahead=1):
+    """
+    Переводит таблицу в секционированную: секции на все периоды с данными
+    и ahead периодов вперёд, плюс секция по умолчанию. Индексы, внешние ключи
+    и триггеры пересоздаются с прежними именами. Возвращает список созданных секций.
+    """
+    _check_vendor()
+    table, column, pk_column = _table(name)
+    legacy = f"{table}_unpartitioned"
+
+    with connection.cursor() as cursor:
+        # ALTER TABLE невозможен, пока в транзакции есть отложенные проверки FK
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+        if is_partitioned(cursor, table):
+            raise PartitioningError(f"Таблица {table} уже секционирована.")
+
+        cursor.execute(
+            """
+            SELECT i.relname, pg_get_indexdef(x.indexrelid), x.indisprimary, x.indisunique
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            WHERE x.indrelid = %s::regclass
+            """,
+            [table],
+        )
+        indexes = []
+        pk_name = f"{table}_pkey"
+        for index_name, definition, is_primary, is_unique in cursor.fetchall():
+            if is_primary:
+                pk_name = index_name
+            elif is_unique:
+                raise PartitioningError(
+                    f"Уникальный индекс {index_name} не содержит ключ секционирования."
+                )
+            else:
+                indexes.append(definition)
+
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype = 'f'
+            """,
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+
+        # CREATE TABLE … LIKE триггеры не копирует (например, поисковый вектор рекламаций)
+        cursor.execute(
+            "SELECT pg_get_triggerdef(oid) FROM pg_trigger "
+            "WHERE tgrelid = %s::regclass AND NOT tgisinternal",
+            [table],
+        )
+        triggers = [definition for (definition,) in cursor.fetchall()]
+
+        cursor.execute(f'SELECT min("{column}"), max("{column}") FROM "{table}"')
+        first, last = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+        cursor.execute(
+            f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS '
+            f"INCLUDING IDENTITY INCLUDING CONSTRAINTS) "
+            f'PARTITION BY RANGE ("{column}")'
+        )
+
+        today = date.today()
+        created = _create_range(
+            cursor,
+            table,
+            column,
+            min(first or today, today),
+            max(last or today, _future_limit(interval, ahead)),
+            interval,
+            existing=set(),
+            default_name=None,
+        )
+        default_name = f"{table}_default"
+        cursor.execute(f'CREATE TABLE "{default_name}" PARTITION OF "{table}" DEFAULT')
+        created.append(default_name)
+
+        cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, %s), "
+            f'COALESCE((SELECT max("{pk_column}") FROM "{table}"), 0) + 1, false)',
+            [table, pk_column],
+        )
+        cursor.execute(f'DROP TABLE "{legacy}"')
+
+        cursor.execute(
+            f'ALTER TABLE "{table}" ADD CONSTRAINT "{pk_name}" '
+            f'PRIMARY KEY ("{pk_column}", "{column}")'
+        )
+        for definition in indexes:
+            cursor.execute(definition)
+        for constraint_name, definition in foreign_keys:
+            cursor.execute(
+                f'ALTER TABLE "{table}" ADD CONSTRAINT "{constraint_name}" {definition}'
+            )
+        for definition in triggers:
+            cursor.execute(definition)
+        # статистика старой таблицы не переносится, без неё планировщик ошибается
+        cursor.execute(f'ANALYZE "{table}"')
+
+    return created
+
+
+def _partitions(cursor, name):
+    _check_vendor()
+    table, column, _ = _table(name)
+    if not is_partitioned(cursor, table):
+        raise PartitioningError(
+            f"Таблица {table} не секционирована (см. partition_history convert)."
+        )
+    return table, column, list_partitions(cursor, table)
+
+
+@transaction.atomic
+def create_partitions(name, ahead=1):
+    """Создаёт недостающие секции от текущего периода на ahead периодов вперёд."""
+    with connection.cursor() as cursor:
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        table, column, partitions = _partitions(cursor, name)
+        interval = detect_interval(partitions)
+        default = next((p.name for p in partitions if p.is_default), None)
+
+        return _create_range(
+            cursor,
+            table,
+            column,
+            date.today(),
+            _future_limit(interval, ahead),
+            interval,
+            existing={p.start for p in partitions if not p.is_default},
+            default_name=default,
+        )
+
+
+def _old_partitions(partitions, before):
+    return [p for p in partitions if not p.is_default and p.end <= before]
+
+
+@transaction.atomic
+def archive_partitions(name, before, tablespace):
+    """Переносит секции, целиком лежащие до даты before, в табличное пространство."""
+    moved = []
+    with connection.cursor() as cursor:
+        table, _, partitions = _partitions(cursor, name)
+        for partition in _old_partitions(partitions, before):
+            if partition.tablespace == tablespace:
+                continue
+            cursor.execute(
+                f'ALTER TABLE "{partition.name}" SET TABLESPACE "{tablespace}"'
+            )
+            cursor.execute(
+                "SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = %s::regclass",
+                [partition.name],
+            )
+            for (index_name,) in cursor.fetchall():
+                cursor.execute(f"ALTER INDEX {index_name} SET TABLESPACE \"{tablespace}\"")
+            moved.append(partition.name)
+    return moved
+
+
+@transaction.atomic
+def export_partitions(name, before, directory, drop=True):
+    """
+    Выгружает секции, целиком лежащие до даты before, в <directory>/<секция>.csv.gz
+    и (по умолчанию) отсоединяет и удаляет их. Возвращает список путей.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    exported = []
+    with connection.cursor() as cursor:
+        table, _, partitions = _partitions(cursor, name)
+        for partition in _old_partitions(partitions, before):
+            path = directory / f"{partition.name}.csv.gz"
+            with gzip.open(path, "wb") as fh:
+                cursor.cursor.copy_expert(
+                    f'COPY "{partition.name}" TO STDOUT WITH (FORMAT csv, HEADER)', fh
+                )
+            if drop:
+                cursor.execute(
+                    f'ALTER TABLE "{table}" DETACH PARTITION "{partition.name}"'
+                )
+                cursor.execute(f'DROP TABLE "{partition.name}"')
+            exported.append(path)
+    return exported
@@ -0,0 +1,116 @@
+"""
+OpenAPI-схема без пересборки на каждый запрос. Схема меняется только
+с кодом, поэтому она строится один раз на процесс: из файла, собранного
+при сборке образа (manage.py spectacular --file, настройка API_SCHEMA_FILE),
+или при первом запросе. Готовый ответ хранится в памяти вместе с ETag
+и сжатой копией. Параметры lang и version вне settings.LANGUAGES
+и ALLOWED_VERSIONS отбрасываются: иначе каждое новое значение строило бы
+и держало в памяти ещё одну копию схемы.
+"""
+
+import gzip
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+
+import yaml
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+from rest_framework.settings import api_settings
+
+from .compression import negotiate_encoding
+
+
+@dataclass(frozen=True)
+class RenderedSchema:
+    content: bytes
+    compressed: bytes
+    etag: str
+    content_type: str
+    disposition: str
+
+
+class CachedSchemaView(SpectacularAPIView):
+    # (формат, lang, version) -> RenderedSchema, общий для всех запросов процесса
+    rendered = {}
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        self.normalize_params(request)
+        key = (
+            request.accepted_media_type,
+            request.GET.get("lang"),
+            request.GET.get("version"),
+        )
+        schema = self.rendered.get(key)
+        if schema is None:
+            schema = self.rendered[key] = self.render_schema(request, *args, **kwargs)
+
+        client_etags = parse_etags(request.headers.get("If-None-Match", ""))
+        if schema.etag in (value.removeprefix("W/") for value in client_etags):
+            response = HttpResponseNotModified()
+        elif negotiate_encoding(request.headers.get("Accept-Encoding", ""), ["gzip"]):
+            response = HttpResponse(schema.compressed, content_type=schema.content_type)
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(schema.content, content_type=schema.content_type)
+
+        response["ETag"] = schema.etag
+        response["Content-Disposition"] = schema.disposition
+        patch_vary_headers(response, ["Accept", "Accept-Encoding"])
+        return response
+
+    def normalize_params(self, request):
+        """
+        Убирает из запроса lang вне settings.LANGUAGES и version вне
+        ALLOWED_VERSIONS: схема для них строится и кешируется как без параметра.
+        """
+        params = request.GET.copy()
+        if params.get("lang") not in dict(settings.LANGUAGES):
+            params.pop("lang", None)
+        if params.get("version") not in (api_settings.ALLOWED_VERSIONS or ()):
+            params.pop("version", None)
+        if params != request.GET:
+            request._request.GET = params
+
+    def render_schema(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        path = self.prebuilt_schema_path(request)
+        if path and renderer.format == "yaml":
+            # файл уже в нужном формате, разбирать и рендерить его заново незачем
+            content = path.read_bytes()
+        else:
+            if path:
+                with path.open(encoding="utf-8") as fh:
+                    # C-загрузчик в разы быстрее, если PyYAML собран с libyaml
+                    data = yaml.load(fh, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+            else:
+                data = super().get(request, *args, **kwargs).data
+            content = renderer.render(
+                data, request.accepted_media_type, {"request": request, "view": self}
+            )
+
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+        version = self.api_version or request.version or self._get_version_parameter(request)
+
+        return RenderedSchema(
+            content=content,
+            compressed=gzip.compress(content),
+            etag=quote_etag(hashlib.sha1(content).hexdigest()),
+            content_type=content_type,
+            disposition=f'inline; filename="{self._get_filename(request, version)}"',
+        )
+
+    def prebuilt_schema_path(self, request):
+        """API_SCHEMA_FILE, если файл есть и не запрошен другой язык/версия."""
+        path = settings.API_SCHEMA_FILE
+        if not path or request.GET.get("lang") or request.GET.get("version"):
+            return None
+        path = Path(path)
+        return path if path.is_file() else None
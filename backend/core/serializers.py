@@ -0,0 +1,50 @@
+from rest_framework import serializers
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PK-поле, которое при пакетной обработке берёт объекты из заранее
+    загруженного словаря context["preloaded"][field_name] вместо запроса
+    в БД на каждый элемент. Без предзагрузки ведёт себя как обычное поле.
+    """
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get("preloaded", {}).get(self.field_name)
+        if preloaded is None:
+            return super().to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+        obj = preloaded.get(pk)
+        if obj is None:
+            self.fail("does_not_exist", pk_value=data)
+        return obj
+
+
+def preload_related(serializer_class, items):
+    """
+    Загружает объекты для всех PreloadedPrimaryKeyRelatedField сериализатора
+    одним запросом на поле. Возвращает {field_name: {pk: obj}}.
+    """
+    preloaded = {}
+    for name, field in serializer_class().fields.items():
+        if not isinstance(field, PreloadedPrimaryKeyRelatedField):
+            continue
+
+        pks = set()
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                pks.add(int(item.get(name)))
+            except (TypeError, ValueError):
+                continue
+
+        queryset = field.get_queryset().filter(pk__in=pks) if pks else []
+        preloaded[name] = {obj.pk: obj for obj in queryset}
+    return preloaded
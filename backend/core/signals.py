@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# bulk_create/bulk_update не отправляют post_save, поэтому пакетные операции
+# сообщают о сохранённых объектах этим сигналом.
+# sender — модель, instances — список сохранённых объектов.
+records_bulk_saved = Signal()
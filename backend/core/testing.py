@@ -0,0 +1,47 @@
+"""
+Общие заготовки данных для тестов приложений: справочники и машина
+со всеми пятью моделями узлов.
+"""
+
+from machines.models import Machine
+from references.models import ReferenceItem
+
+# поле машины -> категория справочника её модели
+MACHINE_MODEL_FIELDS = {
+    "machine_model": ReferenceItem.Category.MACHINE_MODEL,
+    "engine_model": ReferenceItem.Category.ENGINE_MODEL,
+    "transmission_model": ReferenceItem.Category.TRANSMISSION_MODEL,
+    "drive_axle_model": ReferenceItem.Category.DRIVE_AXLE_MODEL,
+    "steer_axle_model": ReferenceItem.Category.STEER_AXLE_MODEL,
+}
+
+
+def create_references(*categories):
+    """
+    {категория: ReferenceItem} — по одной записи на категорию, с именем,
+    равным категории. Без аргументов — пять моделей узлов машины.
+    """
+    return {
+        category: ReferenceItem.objects.create(category=category, name=category)
+        for category in categories or MACHINE_MODEL_FIELDS.values()
+    }
+
+
+def build_machine(refs, serial_number, **kwargs):
+    """
+    Несохранённая машина с моделями из refs; kwargs задают остальные поля
+    и заменяют модели (например, machine_model).
+    """
+    fields = {
+        field: refs[category]
+        for field, category in MACHINE_MODEL_FIELDS.items()
+        if category in refs
+    }
+    fields.update(kwargs)
+    return Machine(serial_number=serial_number, **fields)
+
+
+def create_machine(refs, serial_number, **kwargs):
+    machine = build_machine(refs, serial_number, **kwargs)
+    machine.save()
+    return machine
@@ -0,0 +1,600 @@
+import asyncio
+import gzip
+import json
+import tempfile
+from datetime import date
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from claims.filters import ClaimFilter
+from claims.models import Claim
+from core.compression import CompressionMiddleware, negotiate_encoding
+from core.events import MemoryBroadcaster
+from core.generations import get_generation
+from core.loadtest import CLAIM_MARKER, summarize
+from core.partitioning import convert_table, create_partitions, export_partitions
+from core.schema import CachedSchemaView
+from core.testing import MACHINE_MODEL_FIELDS, create_machine, create_references
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import F
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import (
+    AsyncClient,
+    LiveServerTestCase,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from machines.models import Machine
+from maintenance.models import Maintenance
+from references.models import ReferenceItem
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from users.models import UserProfile
+
+User = get_user_model()
+
+
+class BenchmarkCommandsTests(TestCase):
+    def test_generate_benchmark_data(self):
+        call_command(
+            "generate_benchmark_data",
+            machines=30,
+            clients=3,
+            services=2,
+            claims_per_machine=2,
+            maintenance_per_machine=3,
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(Machine.objects.count(), 30)
+        self.assertEqual(Claim.objects.count(), 60)
+        self.assertEqual(Maintenance.objects.count(), 90)
+        self.assertEqual(UserProfile.objects.filter(role=UserProfile.Role.SERVICE).count(), 2)
+
+        # рекламации ложатся после даты отгрузки своей машины
+        self.assertFalse(
+            Claim.objects.filter(failure_date__lt=F("machine__shipment_date")).exists()
+        )
+
+        with self.assertRaises(CommandError):
+            call_command("generate_benchmark_data", machines=1, stdout=StringIO())
+
+    def test_explain_role_queries(self):
+        call_command(
+            "generate_benchmark_data",
+            machines=10,
+            clients=2,
+            services=1,
+            stdout=StringIO(),
+        )
+
+        out = StringIO()
+        call_command("explain_role_queries", "--no-analyze", stdout=out)
+
+        output = out.getvalue()
+        for heading in ("machines / client", "claims / service", "maintenance / service"):
+            self.assertIn(heading, output)
+
+
+class LoadTestTests(LiveServerTestCase):
+    def test_loadtest_drives_role_mix_and_writes_report(self):
+        call_command(
+            "generate_benchmark_data",
+            machines=10,
+            clients=1,
+            services=1,
+            stdout=StringIO(),
+        )
+        cache.clear()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            target = Path(tmp) / "report.json"
+            out = StringIO()
+            call_command(
+                "loadtest",
+                url=self.live_server_url,
+                mix="machines_list=2,machine_detail=2,claims_search=1,claim_create=1",
+                duration=1,
+                warmup=0,
+                concurrency=2,
+                output=str(target),
+                cleanup=True,
+                stdout=out,
+            )
+            report = json.loads(target.read_text(encoding="utf-8"))
+
+        self.assertEqual(report["meta"]["concurrency"], 2)
+        self.assertGreater(report["total"]["requests"], 0)
+        self.assertEqual(report["total"]["error_rate"], 0)
+        self.assertLessEqual(
+            set(report["endpoints"]),
+            {"machines_list", "machine_detail", "claims_search", "claim_create"},
+        )
+        self.assertIn("Удалено рекламаций прогона", out.getvalue())
+        self.assertFalse(
+            Claim.objects.filter(failure_description__startswith=CLAIM_MARKER).exists()
+        )
+
+    def test_summary_separates_throttling_from_errors(self):
+        samples = [("public_search", 200, 0.010)] * 7 + [
+            ("public_search", 429, 0.001),
+            ("public_search", 500, 0.100),
+            ("public_search", 0, 0.200),
+        ]
+        stats = summarize(samples, seconds=2)["endpoints"]["public_search"]
+
+        self.assertEqual(stats["rps"], 5)
+        self.assertEqual(stats["p50_ms"], 10)
+        self.assertEqual(stats["p99_ms"], 200)
+        self.assertEqual(stats["throttled"], 1)
+        self.assertEqual(stats["error_rate"], 0.2)
+
+
+class HistoryFixtureMixin:
+    def setUp(self):
+        self.refs = create_references(
+            *MACHINE_MODEL_FIELDS.values(),
+            ReferenceItem.Category.FAILURE_NODE,
+            ReferenceItem.Category.REPAIR_METHOD,
+        )
+        self.machine = create_machine(self.refs, "MACH-001")
+        for failure_date in (date(2022, 3, 1), date(2023, 7, 1), date(2024, 11, 1)):
+            self.create_claim(failure_date)
+
+    def create_claim(self, failure_date):
+        return Claim.objects.create(
+            failure_date=failure_date,
+            operating_time=100,
+            failure_node=self.refs[ReferenceItem.Category.FAILURE_NODE],
+            failure_description="Отказ",
+            repair_method=self.refs[ReferenceItem.Category.REPAIR_METHOD],
+            machine=self.machine,
+        )
+
+
+@skipUnless(connection.vendor == "postgresql", "секционирование только для PostgreSQL")
+class PartitioningTests(HistoryFixtureMixin, TestCase):
+    def test_convert_keeps_rows_and_prunes_by_date(self):
+        created = convert_table("claims", "year")
+
+        self.assertIn("claims_claim_y2022", created)
+        self.assertIn("claims_claim_default", created)
+        self.assertEqual(Claim.objects.count(), 3)
+
+        claim = self.create_claim(date(2024, 1, 5))
+        self.assertGreater(claim.pk, Claim.objects.exclude(pk=claim.pk).order_by("-pk")[0].pk)
+        # триггер поискового вектора пересоздан на секционированной таблице
+        found = ClaimFilter({"search": "отказы"}, queryset=Claim.objects.all()).qs
+        self.assertEqual(found.count(), 4)
+
+        qs = ClaimFilter(
+            {"failure_date__gte": "2023-01-01", "failure_date__lte": "2023-12-31"},
+            queryset=Claim.objects.all(),
+        ).qs
+        plan = qs.explain()
+        self.assertIn("claims_claim_y2023", plan)
+        self.assertNotIn("claims_claim_y2022", plan)
+
+        with self.assertRaises(CommandError):
+            call_command("partition_history", "convert", "--table", "claims", stdout=StringIO())
+
+    def test_create_moves_rows_out_of_default_partition(self):
+        convert_table("claims", "year", ahead=0)
+        far = date.today().replace(month=1, day=1, year=date.today().year + 3)
+        self.create_claim(far)
+
+        created = create_partitions("claims", ahead=3)
+
+        self.assertIn(f"claims_claim_y{far.year}", created)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM claims_claim_y{far.year}")
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute("SELECT count(*) FROM claims_claim_default")
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_export_writes_gzip_and_drops_old_partitions(self):
+        convert_table("claims", "year")
+
+        with tempfile.TemporaryDirectory() as directory:
+            paths = export_partitions("claims", date(2024, 1, 1), directory)
+
+            self.assertEqual(
+                sorted(Path(path).name for path in paths),
+                ["claims_claim_y2022.csv.gz", "claims_claim_y2023.csv.gz"],
+            )
+            with gzip.open(paths[0], "rt") as fh:
+                lines = fh.read().splitlines()
+            self.assertTrue(lines[0].startswith("id,failure_date"))
+            self.assertEqual(len(lines), 2)
+
+        self.assertEqual(
+            list(Claim.objects.values_list("failure_date", flat=True)),
+            [date(2024, 11, 1)],
+        )
+
+
+class LargeTableAdminTests(HistoryFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin_user = User.objects.create_superuser(username="admin", password="pass123")
+        self.client.force_login(self.admin_user)
+
+    def get_changelist(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("admin:claims_claim_changelist"), HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 200)
+        return response, [query["sql"] for query in ctx.captured_queries]
+
+    def test_small_table_keeps_exact_count_and_date_hierarchy(self):
+        response, _ = self.get_changelist()
+
+        self.assertEqual(response.context["cl"].date_hierarchy, "failure_date")
+        self.assertEqual(response.context["cl"].result_count, 3)
+
+    @skipUnless(connection.vendor == "postgresql", "оценка строк только для PostgreSQL")
+    @override_settings(ADMIN_LARGE_TABLE_ROWS=0)
+    def test_large_table_uses_estimate_and_drops_date_hierarchy(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE claims_claim")
+
+        response, queries = self.get_changelist()
+
+        self.assertIsNone(response.context["cl"].date_hierarchy)
+        self.assertFalse([sql for sql in queries if "COUNT(*)" in sql and "WHERE" not in sql])
+        self.assertFalse([sql for sql in queries if "DISTINCT DATE_TRUNC" in sql])
+
+    def test_change_form_uses_autocomplete(self):
+        claim = Claim.objects.first()
+        response = self.client.get(
+            reverse("admin:claims_claim_change", args=[claim.pk]),
+            HTTP_HOST="localhost",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        html = response.content.decode()
+        for field in ("machine", "failure_node", "repair_method", "service_company"):
+            self.assertRegex(html, rf'<select name="{field}"[^>]*class="admin-autocomplete"')
+
+
+class ApproximateCountPaginationTests(HistoryFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.manager = User.objects.create_user(username="manager", password="pass123")
+        self.manager.profile.role = UserProfile.Role.MANAGER
+        self.manager.profile.save()
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(user=self.manager)
+
+    def test_list_without_page_is_not_paginated(self):
+        response = self.api_client.get("/api/claims/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 3)
+
+    def test_small_result_has_exact_count(self):
+        response = self.api_client.get("/api/claims/", {"page_size": 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 3)
+        self.assertTrue(response.data["count_is_exact"])
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNotNone(response.data["next"])
+
+    @skipUnless(connection.vendor == "postgresql", "оценка планировщика только для PostgreSQL")
+    @override_settings(API_EXACT_COUNT_LIMIT=1)
+    def test_large_result_uses_cached_estimate(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE claims_claim")
+
+        response = self.api_client.get("/api/claims/", {"page": 1})
+        self.assertFalse(response.data["count_is_exact"])
+        self.assertGreaterEqual(response.data["count"], 2)
+
+        # повторный запрос берёт оценку из кеша, точный COUNT не выполняется
+        with CaptureQueriesContext(connection) as ctx:
+            self.api_client.get("/api/claims/", {"page": 1})
+        self.assertFalse([q["sql"] for q in ctx.captured_queries if "EXPLAIN" in q["sql"]])
+
+    def test_write_bumps_generation_after_commit(self):
+        before = get_generation(Claim)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.create_claim(date(2024, 12, 1))
+                self.assertEqual(get_generation(Claim), before)
+
+        self.assertGreater(get_generation(Claim), before)
+
+    def test_evicted_generation_does_not_repeat(self):
+        before = get_generation(Claim)
+
+        cache.clear()
+
+        self.assertGreater(get_generation(Claim), before)
+
+
+class CachedReadTests(HistoryFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.manager = User.objects.create_user(username="manager", password="pass123")
+        self.manager.profile.role = UserProfile.Role.MANAGER
+        self.manager.profile.save()
+        self.client_user = User.objects.create_user(username="client", password="pass123")
+        self.client_user.profile.role = UserProfile.Role.CLIENT
+        self.client_user.profile.save()
+        self.api_client = APIClient()
+
+    def get_claims(self, user, **params):
+        self.api_client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api_client.get("/api/claims/", params)
+        self.assertEqual(response.status_code, 200)
+        claim_queries = [q for q in ctx.captured_queries if "claims_claim" in q["sql"]]
+        return response.data, claim_queries
+
+    def test_repeated_list_is_served_from_cache(self):
+        first, queries = self.get_claims(self.manager)
+        self.assertTrue(queries)
+
+        second, queries = self.get_claims(self.manager)
+        self.assertEqual(second, first)
+        self.assertFalse(queries)
+
+        # другие параметры — другой ключ
+        _, queries = self.get_claims(self.manager, failure_date_after="2023-01-01")
+        self.assertTrue(queries)
+
+    def test_write_invalidates_cached_list(self):
+        self.get_claims(self.manager)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_claim(date(2024, 12, 1))
+
+        data, queries = self.get_claims(self.manager)
+        self.assertTrue(queries)
+        self.assertEqual(len(data), 4)
+
+    def test_roles_do_not_share_cached_responses(self):
+        self.get_claims(self.manager)
+
+        data, _ = self.get_claims(self.client_user)
+
+        self.assertEqual(data, [])
+
+
+class RecordingBroadcaster(MemoryBroadcaster):
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    def publish(self, events):
+        self.published.append(list(events))
+        super().publish(events)
+
+
+class ChangeEventsTests(HistoryFixtureMixin, TestCase):
+    def setUp(self):
+        self.broadcaster = RecordingBroadcaster()
+        for target in ("core.events.get_broadcaster", "core.api.get_broadcaster"):
+            patcher = mock.patch(target, return_value=self.broadcaster)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # события подготовки данных отправляются и отбрасываются
+        with self.captureOnCommitCallbacks(execute=True):
+            super().setUp()
+            self.manager = User.objects.create_user(username="manager", password="pass123")
+            self.manager.profile.role = UserProfile.Role.MANAGER
+            self.manager.profile.save()
+            self.owner = User.objects.create_user(username="owner", password="pass123")
+            self.owner.profile.role = UserProfile.Role.CLIENT
+            self.owner.profile.save()
+            self.stranger = User.objects.create_user(username="stranger", password="pass123")
+            self.stranger.profile.role = UserProfile.Role.CLIENT
+            self.stranger.profile.save()
+            self.machine.client = self.owner
+            self.machine.save()
+        self.broadcaster.published.clear()
+
+    def test_events_are_published_once_per_transaction_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                first = self.create_claim(date(2024, 12, 1))
+                second = self.create_claim(date(2024, 12, 2))
+                self.assertEqual(self.broadcaster.published, [])
+
+        [events] = self.broadcaster.published
+        self.assertEqual(
+            [(e["model"], e["id"], e["action"]) for e in events],
+            [("claim", first.pk, "created"), ("claim", second.pk, "created")],
+        )
+        self.assertEqual(events[0]["audience"], [self.owner.pk])
+
+    def test_rolled_back_writes_are_not_published(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.create_claim(date(2024, 12, 1))
+                raise RuntimeError
+            with transaction.atomic():
+                self.machine.delete()
+
+        [events] = self.broadcaster.published
+        self.assertEqual({e["action"] for e in events}, {"deleted"})
+        self.assertEqual({e["model"] for e in events}, {"claim", "machine"})
+
+    async def read_event(self, stream):
+        return await asyncio.wait_for(anext(stream), timeout=2)
+
+    async def test_stream_delivers_only_visible_events(self):
+        streams = {}
+        for user in (self.manager, self.owner, self.stranger):
+            response = await AsyncClient().get(
+                "/api/events/", {"token": str(AccessToken.for_user(user))}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            streams[user.username] = aiter(response.streaming_content)
+            self.assertTrue((await self.read_event(streams[user.username])).startswith(b"retry:"))
+
+        event = {"model": "claim", "id": 7, "action": "updated", "audience": [self.owner.pk]}
+        self.broadcaster.publish([event])
+
+        for name in ("manager", "owner"):
+            chunk = await self.read_event(streams[name])
+            self.assertEqual(
+                chunk,
+                b'event: change\ndata: {"model": "claim", "id": 7, "action": "updated"}\n\n',
+            )
+        with self.assertRaises(TimeoutError):
+            await asyncio.wait_for(anext(streams["stranger"]), timeout=0.2)
+
+        for stream in streams.values():
+            await stream.aclose()
+
+    async def test_stream_requires_token(self):
+        response = await AsyncClient().get("/api/events/", {"token": "broken"})
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_stream_is_not_served_under_wsgi(self):
+        self.client.force_login(self.manager)
+
+        response = self.client.get("/api/events/", HTTP_HOST="localhost")
+
+        self.assertEqual(response.status_code, 503)
+
+
+class CachedSchemaViewTests(TestCase):
+    def setUp(self):
+        CachedSchemaView.rendered.clear()
+        self.addCleanup(CachedSchemaView.rendered.clear)
+
+    def get_schema(self, **headers):
+        return self.client.get(reverse("schema"), HTTP_HOST="localhost", **headers)
+
+    def test_schema_is_built_once_and_revalidated_by_etag(self):
+        first = self.get_schema()
+        self.assertEqual(first.status_code, 200)
+        self.assertIn(b"/api/claims/", first.content)
+
+        with CaptureQueriesContext(connection):
+            second = self.get_schema()
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(len(CachedSchemaView.rendered), 1)
+
+        not_modified = self.get_schema(HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_schema_is_served_gzipped(self):
+        plain = self.get_schema()
+
+        response = self.get_schema(HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        refused = self.get_schema(HTTP_ACCEPT_ENCODING="br, gzip;q=0")
+        self.assertFalse(refused.has_header("Content-Encoding"))
+        self.assertEqual(refused.content, plain.content)
+
+    def test_unknown_lang_and_version_share_the_default_schema(self):
+        plain = self.get_schema()
+
+        for query in ("?lang=zz0", "?lang=zz1", "?version=v99", "?lang=zz2&version=x"):
+            response = self.client.get(reverse("schema") + query, HTTP_HOST="localhost")
+            self.assertEqual(response.content, plain.content, query)
+
+        self.assertEqual(len(CachedSchemaView.rendered), 1)
+
+    def test_operation_tags_are_declared(self):
+        schema = self.get_schema(HTTP_ACCEPT="application/vnd.oai.openapi+json").json()
+
+        declared = {tag["name"] for tag in schema["tags"]}
+        for prefix in ("/api/throttling/", "/api/jobs/"):
+            for path, operations in schema["paths"].items():
+                if path.startswith(prefix):
+                    for operation in operations.values():
+                        self.assertLessEqual(set(operation["tags"]), declared, path)
+
+        throttling = schema["paths"]["/api/throttling/"]["get"]["responses"]["200"]
+        self.assertEqual(
+            throttling["content"]["application/json"]["schema"]["items"]["$ref"],
+            "#/components/schemas/ThrottleScopeStats",
+        )
+
+    def test_prebuilt_schema_file_is_used(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "schema.yml"
+            path.write_text("openapi: 3.0.3\ninfo:\n  title: Собранная схема\n", encoding="utf-8")
+
+            with override_settings(API_SCHEMA_FILE=str(path)):
+                response = self.get_schema(HTTP_ACCEPT="application/vnd.oai.openapi+json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["info"]["title"], "Собранная схема")
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100)
+class CompressionMiddlewareTests(SimpleTestCase):
+    payload = ('{"name": "Погрузчик вилочный"}, ' * 50).encode()
+
+    def process(self, response, accept_encoding="gzip, deflate, br"):
+        request = RequestFactory().get("/api/machines/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_negotiation_respects_q_values_and_available_codecs(self):
+        self.assertEqual(negotiate_encoding("gzip, deflate"), "gzip")
+        self.assertEqual(negotiate_encoding("*"), "gzip")
+        self.assertIsNone(negotiate_encoding("gzip;q=0, identity"))
+        self.assertIsNone(negotiate_encoding(""))
+
+    def test_large_json_is_compressed_and_etag_weakened(self):
+        response = HttpResponse(self.payload, content_type="application/json")
+        response["ETag"] = '"abc"'
+
+        response = self.process(response)
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), self.payload)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertEqual(response["ETag"], 'W/"abc"')
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_small_and_binary_responses_are_left_alone(self):
+        small = self.process(HttpResponse(b"{}", content_type="application/json"))
+        binary = self.process(HttpResponse(self.payload, content_type="application/zip"))
+
+        self.assertFalse(small.has_header("Content-Encoding"))
+        self.assertFalse(binary.has_header("Content-Encoding"))
+
+    def test_streaming_response_is_compressed_as_one_stream(self):
+        chunks = [self.payload[i:i + 64] for i in range(0, len(self.payload), 64)]
+        response = self.process(
+            StreamingHttpResponse(iter(chunks), content_type="application/json")
+        )
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), self.payload)
+
+    def test_short_stream_and_event_stream_are_not_compressed(self):
+        short = self.process(
+            StreamingHttpResponse(iter([b"[", b"]"]), content_type="application/json")
+        )
+        events = self.process(
+            StreamingHttpResponse(iter([self.payload]), content_type="text/event-stream")
+        )
+
+        self.assertFalse(short.has_header("Content-Encoding"))
+        self.assertEqual(b"".join(short.streaming_content), b"[]")
+        self.assertFalse(events.has_header("Content-Encoding"))
@@ -0,0 +1,89 @@
+"""
+Ограничение частоты запросов корзиной токенов (token bucket).
+
+Корзина вмещает N токенов и пополняется со скоростью N за период
+(ставка "N/min" из DEFAULT_THROTTLE_RATES), каждый запрос забирает один.
+Так разрешается короткий всплеск до N запросов, а в среднем — не больше
+ставки. Состояние корзины хранится в кеше Django, поэтому с Redis
+(REDIS_URL) оно общее для всех процессов; с LocMemCache — своё у каждого.
+Чтение и запись корзины не атомарны: при одновременных запросах из разных
+процессов изредка проходит на запрос-другой больше ставки.
+
+Отказы считаются по областям (scope) в том же кеше — см. rejection_counts.
+"""
+
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.throttling import SimpleRateThrottle
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+
+def _rejections_key(scope):
+    return f"throttle:rejected:{scope}"
+
+
+def record_rejection(scope):
+    try:
+        cache.incr(_rejections_key(scope))
+    except ValueError:
+        cache.set(_rejections_key(scope), 1, timeout=None)
+
+
+def rejection_counts(scopes):
+    """{scope: число отказов} с момента последней очистки кеша."""
+    counts = cache.get_many([_rejections_key(scope) for scope in scopes])
+    return {scope: counts.get(_rejections_key(scope), 0) for scope in scopes}
+
+
+def token_user_id(request):
+    """
+    id пользователя из JWT в заголовке Authorization — только по подписи
+    токена, без запроса к БД. None, если токена нет или он недействителен.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return None
+    try:
+        raw_token = authentication.get_raw_token(header)
+        if raw_token is None:
+            return None
+        token = authentication.get_validated_token(raw_token)
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None
+    return token.get(jwt_settings.USER_ID_CLAIM)
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    SimpleRateThrottle с корзиной токенов вместо скользящего окна: в кеше
+    лежит пара (токены, время), а не история запросов, и отказ ничего
+    не записывает. Ключ корзины задаёт get_cache_key подкласса.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = self.timer()
+        tokens, updated = self.cache.get(self.key) or (self.num_requests, now)
+        refill = (now - updated) * self.num_requests / self.duration
+        tokens = min(self.num_requests, tokens + refill)
+
+        if tokens < 1:
+            self.wait_seconds = (1 - tokens) * self.duration / self.num_requests
+            record_rejection(self.scope)
+            return False
+
+        # за период корзина наполняется целиком, дольше хранить незачем
+        self.cache.set(self.key, (tokens - 1, now), self.duration)
+        return True
+
+    def wait(self):
+        return getattr(self, "wait_seconds", None)
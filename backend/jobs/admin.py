@@ -0,0 +1,34 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "created_by", "progress_done", "progress_total", "created_at", "finished_at")
+    list_filter = ("kind", "status")
+    list_select_related = ("created_by",)
+    readonly_fields = (
+        "kind",
+        "params",
+        "created_by",
+        "source",
+        "result",
+        "progress_done",
+        "progress_total",
+        "message",
+        "error",
+        "worker",
+        "attempts",
+        "created_at",
+        "started_at",
+        "heartbeat_at",
+        "finished_at",
+    )
+    actions = ["requeue"]
+
+    @admin.action(description="Поставить в очередь заново")
+    def requeue(self, request, queryset):
+        queryset.exclude(status=Job.Status.RUNNING).update(
+            status=Job.Status.QUEUED, error="", message="", finished_at=None
+        )
@@ -0,0 +1,95 @@
+from django.http import FileResponse
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiTypes
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.response import Response
+from users.models import UserProfile
+
+from .models import Job
+from .serializers import JobCreateSerializer, JobSerializer
+
+
+@extend_schema_view(
+    list=extend_schema(
+        summary="Фоновые задачи",
+        description="Задачи текущего пользователя (менеджер видит все).",
+        tags=["Jobs"],
+    ),
+    retrieve=extend_schema(
+        summary="Статус и прогресс задачи",
+        tags=["Jobs"],
+    ),
+    create=extend_schema(
+        summary="Поставить задачу в очередь",
+        description=(
+                "Выгрузки (export_machines, export_claims, export_maintenance): в params — "
+                "те же фильтры, что у списков API; результат — JSON-массив записей, "
+                "доступных автору задачи.\n\n"
+                "Импорт машин (import_machines, только менеджер): multipart с файлом source "
+                "(XLSX), params.update=true — обновлять существующие машины.\n\n"
+                "Задачу выполняет воркер (manage.py run_jobs_worker); статус — "
+                "GET /api/jobs/{id}/, результат — GET /api/jobs/{id}/download/."
+        ),
+        tags=["Jobs"],
+        request=JobCreateSerializer,
+        responses={202: JobSerializer},
+    ),
+    download=extend_schema(
+        summary="Скачать результат задачи",
+        tags=["Jobs"],
+        responses={(200, "application/octet-stream"): OpenApiTypes.BINARY},
+    ),
+)
+class JobViewSet(
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    /api/jobs/                 — список задач (GET), постановка в очередь (POST)
+    /api/jobs/{id}/            — статус и прогресс
+    /api/jobs/{id}/download/   — результат (файл выгрузки или журнал импорта)
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    filterset_fields = ["kind", "status"]
+    ordering = ["-created_at", "-id"]
+
+    def get_queryset(self):
+        return Job.objects.visible_to(self.request.user)
+
+    def get_serializer_class(self):
+        if self.action == "create":
+            return JobCreateSerializer
+        return JobSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        role = getattr(getattr(request.user, "profile", None), "role", None)
+        if (
+            serializer.validated_data["kind"] == Job.Kind.IMPORT_MACHINES
+            and role != UserProfile.Role.MANAGER
+        ):
+            raise PermissionDenied("Импорт доступен только менеджеру.")
+
+        job = serializer.save(created_by=request.user)
+        data = JobSerializer(job, context=self.get_serializer_context()).data
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["get"])
+    def download(self, request, *args, **kwargs):
+        job = self.get_object()
+        if job.status != Job.Status.SUCCEEDED or not job.result:
+            raise NotFound("Результат ещё не готов.")
+        return FileResponse(
+            job.result.open("rb"),
+            as_attachment=True,
+            filename=job.result.name.rsplit("/", 1)[-1],
+        )
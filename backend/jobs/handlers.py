@@ -0,0 +1,132 @@
+"""
+Обработчики фоновых задач: kind -> функция(job). Обработчик сам сохраняет
+результат в job.result и сообщает прогресс через job.report_progress().
+"""
+
+import tempfile
+import threading
+from contextlib import contextmanager
+from io import StringIO
+from itertools import islice
+
+from django.core.files import File
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpRequest, QueryDict
+from django.utils.module_loading import import_string
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .models import Job
+
+# сколько записей сериализуется за раз; после каждой пачки — отметка прогресса
+EXPORT_CHUNK_SIZE = 2000
+
+# как часто отмечается задача, пока обработчик не может сделать это сам;
+# должно быть заметно меньше --stale-after воркера (10 минут)
+HEARTBEAT_INTERVAL = 60
+
+EXPORT_VIEWSETS = {
+    Job.Kind.EXPORT_MACHINES: "machines.api.MachineViewSet",
+    Job.Kind.EXPORT_CLAIMS: "claims.api.ClaimViewSet",
+    Job.Kind.EXPORT_MAINTENANCE: "maintenance.api.MaintenanceViewSet",
+}
+
+
+def _list_view(viewset_class, user, params):
+    """
+    Вьюсет в состоянии action=list для пользователя задачи: выгрузка берёт
+    тот же queryset, фильтры, сортировку и сериализатор, что и ?export=1.
+    """
+    http_request = HttpRequest()
+    http_request.method = "GET"
+    http_request.GET = QueryDict(mutable=True)
+    for name, value in params.items():
+        if name in ("normalize", "page", "page_size"):
+            continue
+        http_request.GET.setlist(name, value if isinstance(value, list) else [value])
+
+    request = Request(http_request)
+    request.user = user
+
+    return viewset_class(request=request, action="list", format_kwarg=None, args=(), kwargs={})
+
+
+def run_export(job):
+    view = _list_view(import_string(EXPORT_VIEWSETS[job.kind]), job.created_by, job.params)
+    queryset = view.filter_queryset(view.get_queryset())
+    serializer_class = view.get_serializer_class()
+    context = view.get_serializer_context()
+    renderer = JSONRenderer()
+
+    total = queryset.count()
+    job.report_progress(0, total)
+
+    done = 0
+    rows = queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    with tempfile.TemporaryFile() as tmp:
+        tmp.write(b"[")
+        while chunk := list(islice(rows, EXPORT_CHUNK_SIZE)):
+            data = renderer.render(serializer_class(chunk, many=True, context=context).data)
+            if done:
+                tmp.write(b",")
+            # пачка рендерится как массив, скобки снимаются, чтобы склеить один массив
+            tmp.write(data[1:-1])
+            done += len(chunk)
+            job.report_progress(done)
+        tmp.write(b"]")
+
+        tmp.seek(0)
+        job.result.save(f"{job.kind}-{job.pk}.json", File(tmp), save=False)
+    job.message = f"Выгружено записей: {done}"
+
+
+@contextmanager
+def _heartbeat(job):
+    """
+    Отмечает задачу из отдельного потока каждые HEARTBEAT_INTERVAL секунд.
+    Нужно там, где прогресс не сохранить: импорт пишет машины одной
+    транзакцией, и отметка из неё не видна другим воркерам до коммита.
+    """
+    stopped = threading.Event()
+
+    def beat():
+        try:
+            while not stopped.wait(HEARTBEAT_INTERVAL):
+                if not job.heartbeat():
+                    break
+        finally:
+            # у потока своё соединение с базой
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f"job-{job.pk}-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def run_import_machines(job):
+    job.report_progress(0, message="Импорт начат")
+    output = StringIO()
+    with _heartbeat(job):
+        call_command(
+            "import_machines_from_xlsx",
+            path=job.source.path,
+            update=bool(job.params.get("update")),
+            stdout=output,
+            stderr=output,
+        )
+
+    log = output.getvalue()
+    job.result.save(f"{job.kind}-{job.pk}.log", File(StringIO(log)), save=False)
+    lines = log.strip().splitlines()
+    job.message = lines[-1] if lines else ""
+
+
+HANDLERS = {
+    **{kind: run_export for kind in EXPORT_VIEWSETS},
+    Job.Kind.IMPORT_MACHINES: run_import_machines,
+}
@@ -0,0 +1,86 @@
+import os
+import signal
+import socket
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from jobs.models import MAX_ATTEMPTS, Job
+from jobs.worker import run_next
+
+
+class Command(BaseCommand):
+    help = (
+        "Воркер фоновых задач (выгрузки, импорт): разбирает очередь в таблице "
+        "jobs_job. Можно запускать несколько экземпляров."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Выполнить всё, что уже в очереди, и выйти",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=2.0,
+            help="Пауза между проверками пустой очереди, секунд (по умолчанию 2)",
+        )
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=10,
+            help=(
+                "Через сколько минут без отметки воркера задача running "
+                "возвращается в очередь (по умолчанию 10)"
+            ),
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=MAX_ATTEMPTS,
+            help=(
+                "После скольких попыток зависшая задача не возвращается в очередь, "
+                f"а помечается ошибкой (по умолчанию {MAX_ATTEMPTS})"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        stale_after = timedelta(minutes=options["stale_after"])
+        max_attempts = options["max_attempts"]
+
+        self.stopping = False
+        # текущая задача доводится до конца, новые не берутся
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        requeued, failed = Job.objects.requeue_stale(stale_after, max_attempts)
+        if requeued:
+            self.stdout.write(f"Возвращено в очередь зависших задач: {requeued}")
+        if failed:
+            self.stdout.write(
+                self.style.ERROR(f"Сняты с ошибкой после {max_attempts} попыток: {failed}")
+            )
+        self.stdout.write(f"Воркер {worker} запущен")
+
+        while not self.stopping:
+            job = run_next(worker)
+            if job is not None:
+                if job.worker != worker:
+                    self.stdout.write(
+                        self.style.WARNING(f"{job}: возвращена в очередь, итог отброшен")
+                    )
+                elif job.status == Job.Status.SUCCEEDED:
+                    self.stdout.write(self.style.SUCCESS(f"{job}: {job.message}"))
+                else:
+                    self.stdout.write(self.style.ERROR(f"{job}: {job.error.strip().splitlines()[-1]}"))
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["poll"])
+            Job.objects.requeue_stale(stale_after, max_attempts)
+
+    def stop(self, signum, frame):
+        self.stopping = True
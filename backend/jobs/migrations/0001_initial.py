@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('export_machines', 'Выгрузка машин'), ('export_claims', 'Выгрузка рекламаций'), ('export_maintenance', 'Выгрузка ТО'), ('import_machines', 'Импорт машин из XLSX')], max_length=32, verbose_name='Тип')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('running', 'Выполняется'), ('succeeded', 'Выполнена'), ('failed', 'Ошибка')], default='queued', max_length=16, verbose_name='Статус')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Параметры')),
+                ('source', models.FileField(blank=True, upload_to='jobs/sources/%Y/%m/', verbose_name='Входной файл')),
+                ('result', models.FileField(blank=True, upload_to='jobs/results/%Y/%m/', verbose_name='Результат')),
+                ('progress_done', models.PositiveIntegerField(default=0, verbose_name='Обработано')),
+                ('progress_total', models.PositiveIntegerField(blank=True, null=True, verbose_name='Всего')),
+                ('message', models.TextField(blank=True, verbose_name='Сообщение')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='Воркер')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создана')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начата')),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True, verbose_name='Последняя отметка воркера')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершена')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Фоновая задача',
+                'verbose_name_plural': 'Фоновые задачи',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(condition=models.Q(('status', 'queued')), fields=['created_at', 'id'], name='jobs_queued_idx'), models.Index(fields=['created_by', '-created_at'], name='jobs_user_created_idx')],
+            },
+        ),
+    ]
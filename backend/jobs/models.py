@@ -0,0 +1,170 @@
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+from users.models import UserProfile
+
+# сколько раз задачу берут заново после потери воркера, прежде чем снять её с ошибкой
+MAX_ATTEMPTS = 3
+
+
+class JobQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Менеджер видит все задачи, остальные — только свои."""
+        if not user.is_authenticated:
+            return self.none()
+
+        profile = getattr(user, "profile", None)
+        role = getattr(profile, "role", None)
+
+        if role == UserProfile.Role.MANAGER:
+            return self
+        return self.filter(created_by=user)
+
+    def claim_next(self, worker):
+        """
+        Берёт самую старую задачу из очереди и помечает её выполняемой.
+        SKIP LOCKED: несколько воркеров не ждут друг друга и не получают
+        одну и ту же задачу.
+        """
+        with transaction.atomic():
+            job = (
+                self.select_for_update(skip_locked=True)
+                .filter(status=Job.Status.QUEUED)
+                .order_by("created_at", "id")
+                .first()
+            )
+            if job is None:
+                return None
+            now = timezone.now()
+            job.status = Job.Status.RUNNING
+            job.worker = worker
+            job.attempts += 1
+            job.started_at = now
+            job.heartbeat_at = now
+            job.save(
+                update_fields=["status", "worker", "attempts", "started_at", "heartbeat_at"]
+            )
+            return job
+
+    def requeue_stale(self, older_than, max_attempts=MAX_ATTEMPTS):
+        """
+        Возвращает в очередь задачи, чей воркер перестал отмечаться
+        (процесс упал или был перезапущен посреди задачи). Задача, которую
+        брали уже max_attempts раз, в очередь не возвращается, а помечается
+        ошибкой: скорее всего, воркер падает на ней самой. Возвращает пару
+        (возвращено в очередь, снято с ошибкой).
+        """
+        with transaction.atomic():
+            stale = self.filter(
+                status=Job.Status.RUNNING,
+                heartbeat_at__lt=timezone.now() - older_than,
+            )
+            failed = stale.filter(attempts__gte=max_attempts).update(
+                status=Job.Status.FAILED,
+                worker="",
+                error=f"Воркер перестал отмечаться во всех попытках выполнения ({max_attempts})",
+                finished_at=timezone.now(),
+            )
+            requeued = stale.update(status=Job.Status.QUEUED, worker="")
+        return requeued, failed
+
+
+class Job(models.Model):
+    """
+    Фоновая задача (выгрузка, импорт). Очередь — сама таблица: задачи
+    со статусом queued разбирает команда run_jobs_worker.
+    """
+
+    class Kind(models.TextChoices):
+        EXPORT_MACHINES = "export_machines", "Выгрузка машин"
+        EXPORT_CLAIMS = "export_claims", "Выгрузка рекламаций"
+        EXPORT_MAINTENANCE = "export_maintenance", "Выгрузка ТО"
+        IMPORT_MACHINES = "import_machines", "Импорт машин из XLSX"
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "В очереди"
+        RUNNING = "running", "Выполняется"
+        SUCCEEDED = "succeeded", "Выполнена"
+        FAILED = "failed", "Ошибка"
+
+    kind = models.CharField("Тип", max_length=32, choices=Kind.choices)
+    status = models.CharField(
+        "Статус",
+        max_length=16,
+        choices=Status.choices,
+        default=Status.QUEUED,
+    )
+    params = models.JSONField("Параметры", default=dict, blank=True)
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name="Автор",
+        on_delete=models.CASCADE,
+        related_name="jobs",
+    )
+
+    source = models.FileField("Входной файл", upload_to="jobs/sources/%Y/%m/", blank=True)
+    result = models.FileField("Результат", upload_to="jobs/results/%Y/%m/", blank=True)
+
+    progress_done = models.PositiveIntegerField("Обработано", default=0)
+    progress_total = models.PositiveIntegerField("Всего", null=True, blank=True)
+    message = models.TextField("Сообщение", blank=True)
+    error = models.TextField("Ошибка", blank=True)
+
+    worker = models.CharField("Воркер", max_length=100, blank=True)
+    attempts = models.PositiveSmallIntegerField("Попыток", default=0)
+
+    created_at = models.DateTimeField("Создана", auto_now_add=True)
+    started_at = models.DateTimeField("Начата", null=True, blank=True)
+    heartbeat_at = models.DateTimeField("Последняя отметка воркера", null=True, blank=True)
+    finished_at = models.DateTimeField("Завершена", null=True, blank=True)
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            # очередь: воркер ищет самые старые queued
+            models.Index(
+                fields=["created_at", "id"],
+                condition=models.Q(status="queued"),
+                name="jobs_queued_idx",
+            ),
+            models.Index(fields=["created_by", "-created_at"], name="jobs_user_created_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.SUCCEEDED, self.Status.FAILED)
+
+    def owned(self):
+        """
+        Эта задача, пока она выполняется этим воркером. Если отметок долго
+        не было, requeue_stale вернёт её в очередь и её возьмёт другой
+        воркер — тогда запись через owned() не пройдёт и не затрёт его данные.
+        """
+        return Job.objects.filter(pk=self.pk, worker=self.worker, status=Job.Status.RUNNING)
+
+    def heartbeat(self):
+        """Отметка, что воркер жив. False, если задача уже не его."""
+        return bool(self.owned().update(heartbeat_at=timezone.now()))
+
+    def report_progress(self, done, total=None, message=None):
+        """Сохраняет прогресс; заодно это отметка, что воркер жив."""
+        self.progress_done = done
+        if total is not None:
+            self.progress_total = total
+        if message is not None:
+            self.message = message
+        self.heartbeat_at = timezone.now()
+        self.owned().update(
+            progress_done=self.progress_done,
+            progress_total=self.progress_total,
+            message=self.message,
+            heartbeat_at=self.heartbeat_at,
+        )
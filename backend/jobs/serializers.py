@@ -0,0 +1,68 @@
+from rest_framework import serializers
+from rest_framework.reverse import reverse
+
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = (
+            "id",
+            "kind",
+            "status",
+            "params",
+            "progress_done",
+            "progress_total",
+            "progress",
+            "message",
+            "error",
+            "download_url",
+            "created_at",
+            "started_at",
+            "finished_at",
+        )
+        read_only_fields = fields
+
+    def get_progress(self, obj) -> float | None:
+        """Доля выполненного, 0..1; None, пока объём неизвестен."""
+        if obj.status == Job.Status.SUCCEEDED:
+            return 1.0
+        if not obj.progress_total:
+            return None
+        return round(min(obj.progress_done / obj.progress_total, 1.0), 3)
+
+    def get_download_url(self, obj) -> str | None:
+        if not obj.result:
+            return None
+        return reverse("job-download", args=[obj.pk], request=self.context.get("request"))
+
+
+class JobCreateSerializer(serializers.ModelSerializer):
+    params = serializers.DictField(required=False, default=dict)
+
+    class Meta:
+        model = Job
+        fields = ("kind", "params", "source")
+
+    def validate(self, attrs):
+        is_import = attrs["kind"] == Job.Kind.IMPORT_MACHINES
+        source = attrs.get("source")
+
+        if is_import and not source:
+            raise serializers.ValidationError({"source": "Для импорта нужен XLSX-файл."})
+        if is_import and not source.name.lower().endswith(".xlsx"):
+            raise serializers.ValidationError({"source": "Ожидается файл .xlsx."})
+        if not is_import and source:
+            raise serializers.ValidationError({"source": "Файл нужен только для импорта."})
+
+        for name, value in attrs.get("params", {}).items():
+            values = value if isinstance(value, list) else [value]
+            if not all(isinstance(item, (str, int, bool)) for item in values):
+                raise serializers.ValidationError(
+                    {"params": f"{name}: ожидается строка, число или список строк."}
+                )
+        return attrs
@@ -0,0 +1,200 @@
+import json
+import tempfile
+import time
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from claims.models import Claim
+from core.testing import create_machine, create_references
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from machines.importing import EXCEL_COLUMNS
+from machines.models import Machine
+from openpyxl import Workbook
+from references.models import ReferenceItem
+from rest_framework import status
+from rest_framework.test import APIClient
+from users.models import UserProfile
+
+from .handlers import run_import_machines
+from .models import MAX_ATTEMPTS, Job
+from .worker import run_job
+
+User = get_user_model()
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.api_client = APIClient()
+        self.manager = User.objects.create_user(username="manager", password="pass123")
+        self.manager.profile.role = UserProfile.Role.MANAGER
+        self.manager.profile.save()
+        self.client_user = User.objects.create_user(username="client", password="pass123")
+        self.client_user.profile.role = UserProfile.Role.CLIENT
+        self.client_user.profile.save()
+
+        refs = create_references(*ReferenceItem.Category.values)
+        self.refs = refs
+        for serial, client in (("MACH-001", self.client_user), ("MACH-002", None)):
+            machine = create_machine(refs, serial, client=client)
+            Claim.objects.create(
+                failure_date=date(2024, 5, 1),
+                operating_time=100,
+                failure_node=refs[ReferenceItem.Category.FAILURE_NODE],
+                failure_description="Отказ",
+                repair_method=refs[ReferenceItem.Category.REPAIR_METHOD],
+                machine=machine,
+            )
+
+    def run_worker(self):
+        # в TestCase всё идёт в одной транзакции: закрытие соединения её оборвёт
+        with mock.patch("jobs.worker.close_old_connections"):
+            call_command("run_jobs_worker", "--once", stdout=StringIO())
+
+    def test_export_job_runs_in_worker_and_respects_role(self):
+        self.api_client.force_authenticate(user=self.client_user)
+        response = self.api_client.post(
+            "/api/jobs/", {"kind": "export_claims", "params": {"ordering": "id"}}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], Job.Status.QUEUED)
+        job_id = response.data["id"]
+
+        self.run_worker()
+
+        response = self.api_client.get(f"/api/jobs/{job_id}/")
+        self.assertEqual(response.data["status"], Job.Status.SUCCEEDED)
+        self.assertEqual(response.data["progress_done"], 1)
+        self.assertEqual(response.data["progress"], 1.0)
+        self.assertIsNotNone(response.data["download_url"])
+
+        download = self.api_client.get(f"/api/jobs/{job_id}/download/")
+        self.assertEqual(download.status_code, status.HTTP_200_OK)
+        rows = json.loads(b"".join(download.streaming_content))
+        self.assertEqual([row["machine"]["serial_number"] for row in rows], ["MACH-001"])
+
+    def test_jobs_are_private_to_their_author(self):
+        job = Job.objects.create(kind=Job.Kind.EXPORT_MACHINES, created_by=self.manager)
+
+        self.api_client.force_authenticate(user=self.client_user)
+        self.assertEqual(self.api_client.get(f"/api/jobs/{job.pk}/").status_code, 404)
+        self.assertEqual(self.api_client.get("/api/jobs/").data, [])
+
+    def make_xlsx(self, serial):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(list(EXCEL_COLUMNS.values()))
+        sheet.append([serial if key == "serial_number" else f"{key}-1" for key in EXCEL_COLUMNS])
+        buffer = BytesIO()
+        workbook.save(buffer)
+        return SimpleUploadedFile("machines.xlsx", buffer.getvalue())
+
+    def test_import_job_requires_manager_and_imports_file(self):
+        self.api_client.force_authenticate(user=self.client_user)
+        response = self.api_client.post(
+            "/api/jobs/", {"kind": "import_machines", "source": self.make_xlsx("NEW-1")}
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.api_client.force_authenticate(user=self.manager)
+        response = self.api_client.post(
+            "/api/jobs/", {"kind": "import_machines", "source": self.make_xlsx("NEW-1")}
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        self.run_worker()
+
+        job = Job.objects.get(pk=response.data["id"])
+        self.assertEqual(job.status, Job.Status.SUCCEEDED, job.error)
+        self.assertIn("Создано: 1", job.message)
+        self.assertTrue(Machine.objects.filter(serial_number="NEW-1").exists())
+
+    def test_failed_job_keeps_error_and_queue_moves_on(self):
+        broken = Job.objects.create(
+            kind=Job.Kind.IMPORT_MACHINES, source="missing.xlsx", created_by=self.manager
+        )
+        ok = Job.objects.create(kind=Job.Kind.EXPORT_MACHINES, created_by=self.manager)
+
+        self.run_worker()
+
+        broken.refresh_from_db()
+        ok.refresh_from_db()
+        self.assertEqual(broken.status, Job.Status.FAILED)
+        self.assertIn("Файл не найден", broken.error)
+        self.assertEqual(ok.status, Job.Status.SUCCEEDED)
+
+    def test_claim_next_takes_oldest_and_stale_jobs_are_requeued(self):
+        first = Job.objects.create(kind=Job.Kind.EXPORT_MACHINES, created_by=self.manager)
+        Job.objects.create(kind=Job.Kind.EXPORT_MACHINES, created_by=self.manager)
+
+        claimed = Job.objects.claim_next("test-worker")
+        self.assertEqual(claimed.pk, first.pk)
+        self.assertEqual(claimed.status, Job.Status.RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+
+        self.assertEqual(Job.objects.requeue_stale(timedelta(minutes=5)), (0, 0))
+        self.assertEqual(Job.objects.requeue_stale(timedelta(seconds=-1)), (1, 0))
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, Job.Status.QUEUED)
+
+    def test_stale_job_fails_after_max_attempts(self):
+        job = Job.objects.create(kind=Job.Kind.EXPORT_MACHINES, created_by=self.manager)
+
+        for _ in range(MAX_ATTEMPTS - 1):
+            Job.objects.claim_next("crashing-worker")
+            self.assertEqual(Job.objects.requeue_stale(timedelta(seconds=-1)), (1, 0))
+
+        Job.objects.claim_next("crashing-worker")
+        self.assertEqual(Job.objects.requeue_stale(timedelta(seconds=-1)), (0, 1))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.attempts, MAX_ATTEMPTS)
+        self.assertEqual(job.worker, "")
+        self.assertIn("Воркер перестал отмечаться", job.error)
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(Job.objects.claim_next("other-worker"))
+
+    def test_requeued_job_result_is_not_overwritten(self):
+        Job.objects.create(kind=Job.Kind.EXPORT_MACHINES, created_by=self.manager)
+        job = Job.objects.claim_next("slow-worker")
+
+        def lost_while_running(job):
+            # воркер не отмечался: задачу вернули в очередь и взял другой
+            Job.objects.requeue_stale(timedelta(seconds=-1))
+            Job.objects.claim_next("other-worker")
+            job.report_progress(10, 10)
+            job.message = "Выгружено записей: 10"
+
+        with mock.patch.dict("jobs.worker.HANDLERS", {job.kind: lost_while_running}):
+            job = run_job(job)
+
+        self.assertEqual(job.worker, "other-worker")
+        self.assertEqual(job.status, Job.Status.RUNNING)
+        self.assertEqual(job.progress_done, 0)
+        self.assertEqual(job.message, "")
+        self.assertIsNone(job.finished_at)
+
+    def test_import_keeps_heartbeat_while_command_runs(self):
+        Job.objects.create(
+            kind=Job.Kind.IMPORT_MACHINES, source="machines.xlsx", created_by=self.manager
+        )
+        job = Job.objects.claim_next("test-worker")
+
+        with (
+            mock.patch("jobs.handlers.HEARTBEAT_INTERVAL", 0.01),
+            mock.patch("jobs.handlers.call_command", side_effect=lambda *a, **kw: time.sleep(0.2)),
+            mock.patch.object(Job, "heartbeat", return_value=True) as heartbeat,
+        ):
+            run_import_machines(job)
+
+        self.assertGreater(heartbeat.call_count, 1)
@@ -0,0 +1,48 @@
+import logging
+import traceback
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .handlers import HANDLERS
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def run_job(job):
+    """Выполняет задачу, уже помеченную running, и записывает итог."""
+    try:
+        HANDLERS[job.kind](job)
+    except Exception:
+        logger.exception("Задача %s завершилась ошибкой", job.pk)
+        job.status = Job.Status.FAILED
+        job.error = traceback.format_exc()
+    else:
+        job.status = Job.Status.SUCCEEDED
+        job.error = ""
+    job.finished_at = timezone.now()
+    saved = job.owned().update(
+        status=job.status,
+        error=job.error,
+        message=job.message,
+        result=job.result.name,
+        finished_at=job.finished_at,
+    )
+    if not saved:
+        # задачу вернули в очередь, пока она выполнялась: итог теперь за
+        # другим воркером, свой результат не записывается
+        logger.warning("Задача %s уже не за воркером %s, итог отброшен", job.pk, job.worker)
+        if job.result:
+            job.result.delete(save=False)
+        job.refresh_from_db()
+    return job
+
+
+def run_next(worker):
+    """Берёт и выполняет одну задачу из очереди. None, если очередь пуста."""
+    close_old_connections()
+    job = Job.objects.claim_next(worker)
+    if job is None:
+        return None
+    return run_job(job)
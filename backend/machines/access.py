@@ -0,0 +1,71 @@
+from collections import defaultdict
+
+from django.dispatch import Signal
+from users.models import UserProfile
+
+from .models import Machine, MachineAccess
+
+BATCH_SIZE = 5000
+
+# доступ к машинам изменился (sync_machine_access); sender — MachineAccess,
+# owners — {id машины: id пользователей, получивших или потерявших доступ}
+access_changed = Signal()
+
+
+def _access_rows(machines):
+    """Строки доступа по значениям (pk, client_id, service_company_id)."""
+    for machine_id, client_id, service_company_id in machines:
+        if client_id:
+            yield MachineAccess(
+                user_id=client_id,
+                role=UserProfile.Role.CLIENT,
+                machine_id=machine_id,
+            )
+        if service_company_id:
+            yield MachineAccess(
+                user_id=service_company_id,
+                role=UserProfile.Role.SERVICE,
+                machine_id=machine_id,
+            )
+
+
+def sync_machine_access(machines):
+    """Пересобирает доступ для переданных (уже сохранённых) машин."""
+    values = [(m.pk, m.client_id, m.service_company_id) for m in machines]
+    if not values:
+        return
+
+    access = MachineAccess.objects.filter(machine_id__in=[pk for pk, _, _ in values])
+    previous = set(access.values_list("machine_id", "user_id", "role"))
+    rows = list(_access_rows(values))
+
+    access.delete()
+    MachineAccess.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+    # только те, кто получил или потерял доступ
+    owners = defaultdict(set)
+    for machine_id, user_id, _ in previous ^ {(r.machine_id, r.user_id, r.role) for r in rows}:
+        owners[machine_id].add(user_id)
+    if owners:
+        access_changed.send(sender=MachineAccess, owners=dict(owners))
+
+
+def rebuild_machine_access(machine_ids=None):
+    """
+    Пересобирает таблицу доступа из Machine. machine_ids=None — весь парк.
+    Возвращает количество созданных строк.
+    """
+    machines = Machine.objects.order_by()
+    access = MachineAccess.objects.all()
+    if machine_ids is not None:
+        machines = machines.filter(pk__in=machine_ids)
+        access = access.filter(machine_id__in=machine_ids)
+
+    access.delete()
+
+    values = machines.values_list("pk", "client_id", "service_company_id")
+    created = MachineAccess.objects.bulk_create(
+        _access_rows(values.iterator(chunk_size=BATCH_SIZE)),
+        batch_size=BATCH_SIZE,
+    )
+    return len(created)
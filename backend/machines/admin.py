@@ -1,10 +1,11 @@
+from core.admin import LargeTableAdminMixin
 from django.contrib import admin
 
 from .models import Machine
 
 
 @admin.register(Machine)
-class MachineAdmin(admin.ModelAdmin):
+class MachineAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = (
         "serial_number",
         "machine_model",
@@ -16,3 +17,15 @@ class MachineAdmin(admin.ModelAdmin):
     list_filter = ("machine_model", "engine_model", "service_company")
     search_fields = ("serial_number", "client__username", "service_company__username")
     date_hierarchy = "shipment_date"
+    list_select_related = ("machine_model", "engine_model", "client", "service_company")
+    autocomplete_fields = (
+        "machine_model",
+        "engine_model",
+        "transmission_model",
+        "drive_axle_model",
+        "steer_axle_model",
+        "client",
+        "service_company",
+    )
+    # сортировка только по колонкам с индексом
+    sortable_by = ("serial_number", "shipment_date")
@@ -1,3 +1,8 @@
+from claims.models import Claim
+from core.batch import BatchRetrieveMixin
+from core.caching import CachedReadMixin
+from core.normalize import NORMALIZE_PARAMETER, NormalizedReferencesMixin
+from core.pagination import ExportListMixin
 from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import (
     extend_schema,
@@ -5,14 +10,26 @@ from drf_spectacular.utils import (
     OpenApiParameter,
     OpenApiTypes,
 )
+from maintenance.models import Maintenance
 from references.models import ReferenceItem
 from rest_framework import permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
-from users.models import UserProfile
 
 from .models import Machine
 from .serializers import MachineSerializer, MachinePublicSerializer
+from .throttling import (
+    PublicSearchAnonThrottle,
+    PublicSearchUserThrottle,
+    SerialPrefixThrottle,
+)
+from .timeline import decode_cursor, encode_cursor, machine_events
+
+TIMELINE_PAGE_SIZE = 50
+TIMELINE_MAX_PAGE_SIZE = 200
 
 
 @extend_schema_view(
@@ -28,6 +45,7 @@ from .serializers import MachineSerializer, MachinePublicSerializer
         ),
         tags=["Machines"],
         parameters=[
+            NORMALIZE_PARAMETER,
             OpenApiParameter(
                 name='machine_model',
                 type=OpenApiTypes.INT,
@@ -75,11 +93,70 @@ from .serializers import MachineSerializer, MachinePublicSerializer
         ),
         tags=["Machines"],
     ),
+    batch=extend_schema(
+        summary="Несколько машин по ID или заводским номерам",
+        description=(
+                "Возвращает до 100 записей одним запросом (по ids или serial_numbers) с учётом прав текущего "
+                "пользователя. Результаты идут в порядке запроса; для недоступных или "
+                "несуществующих записей возвращается {\"<параметр>\": значение, \"not_found\": true}."
+        ),
+        tags=["Machines"],
+        parameters=[
+            OpenApiParameter(
+                name="ids",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="ID записей через запятую.",
+            ),
+            OpenApiParameter(
+                name="serial_numbers",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="Заводские номера машин через запятую.",
+            ),
+        ],
+    ),
+    timeline=extend_schema(
+        summary="Хронология машины",
+        description=(
+                "ТО и рекламации машины одним списком, от новых к старым.\n\n"
+                "Пагинация курсором: в ответе next — ссылка на следующую страницу "
+                "(или null). Доступ к машине — по роли пользователя."
+        ),
+        tags=["Machines"],
+        parameters=[
+            OpenApiParameter(
+                name="cursor",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="Курсор следующей страницы (из поля next).",
+            ),
+            OpenApiParameter(
+                name="page_size",
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="Размер страницы (по умолчанию 50, не больше 200).",
+            ),
+        ],
+        responses=OpenApiTypes.OBJECT,
+    ),
 )
-class MachineViewSet(viewsets.ReadOnlyModelViewSet):
+class MachineViewSet(
+    CachedReadMixin,
+    NormalizedReferencesMixin,
+    ExportListMixin,
+    BatchRetrieveMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     """
     /api/machines/ — список машин (только для авторизованных)
     /api/machines/{id}/ — детальная информация
+    /api/machines/batch/?ids=1,2 | ?serial_numbers=A,B — несколько машин за раз
+    /api/machines/{id}/timeline/ — хронология ТО и рекламаций машины
     """
 
     serializer_class = MachineSerializer
@@ -97,15 +174,13 @@ class MachineViewSet(viewsets.ReadOnlyModelViewSet):
 
     search_fields = ["serial_number"]
 
-    def get_queryset(self):
-        user = self.request.user
-        if not user.is_authenticated:
-            return Machine.objects.none()
+    batch_lookup_params = {"ids": "pk", "serial_numbers": "serial_number"}
 
-        profile = getattr(user, "profile", None)
-        role = getattr(profile, "role", None)
+    # в ответе — сводка по рекламациям и ТО и названия из справочников
+    cache_models = (Machine, Claim, Maintenance, ReferenceItem)
 
-        qs = Machine.objects.select_related(
+    def get_queryset(self):
+        return Machine.objects.visible_to(self.request.user).select_related(
             "machine_model",
             "engine_model",
             "transmission_model",
@@ -113,27 +188,37 @@ class MachineViewSet(viewsets.ReadOnlyModelViewSet):
             "steer_axle_model",
             "client",
             "service_company",
+            "stats",
+            "stats__last_maintenance_type",
         )
 
-        if role == UserProfile.Role.MANAGER:
-            return qs
-
-        if role == UserProfile.Role.CLIENT:
-            return qs.filter(client=user)
+    @action(detail=True, methods=["get"])
+    def timeline(self, request, *args, **kwargs):
+        machine = self.get_object()
 
-        if role == UserProfile.Role.SERVICE:
-            return qs.filter(service_company=user)
+        try:
+            page_size = int(request.query_params.get("page_size", TIMELINE_PAGE_SIZE))
+        except ValueError:
+            raise ValidationError({"page_size": "Ожидается целое число."})
+        page_size = min(max(page_size, 1), TIMELINE_MAX_PAGE_SIZE)
 
-        return Machine.objects.none()
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            try:
+                cursor = decode_cursor(cursor)
+            except ValueError as exc:
+                raise ValidationError({"cursor": str(exc)})
 
-    def list(self, request, *args, **kwargs):
-        export = request.query_params.get('export') == '1'
-        if not export:
-            return super().list(request, *args, **kwargs)
+        # лишнее событие показывает, есть ли следующая страница
+        events = machine_events(machine.pk, page_size + 1, cursor)
+        next_url = None
+        if len(events) > page_size:
+            events = events[:page_size]
+            next_url = replace_query_param(
+                request.build_absolute_uri(), "cursor", encode_cursor(events[-1])
+            )
 
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response({"next": next_url, "results": events})
 
 
 @extend_schema(
@@ -141,7 +226,10 @@ class MachineViewSet(viewsets.ReadOnlyModelViewSet):
     description=(
             "Гостевой доступ без авторизации.\n\n"
             "Пользователь передаёт заводской номер машины и получает ограниченную информацию "
-            "о комплектации (поля 1–10 по ТЗ). Если машина не найдена, возвращается сообщение об ошибке."
+            "о комплектации (поля 1–10 по ТЗ). Если машина не найдена, возвращается сообщение об ошибке.\n\n"
+            "Частота запросов ограничена: для гостя — по IP, для пользователя с JWT — "
+            "по учётной записи, и общая — по префиксу заводского номера. При превышении "
+            "возвращается 429 с заголовком Retry-After."
     ),
     tags=["Public"],
     parameters=[
@@ -156,6 +244,23 @@ class MachineViewSet(viewsets.ReadOnlyModelViewSet):
 )
 class PublicMachineSearchView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [
+        PublicSearchAnonThrottle,
+        PublicSearchUserThrottle,
+        SerialPrefixThrottle,
+    ]
+
+    def perform_authentication(self, request):
+        # пользователь здесь не нужен, ограничения читают только подпись JWT:
+        # без ленивой аутентификации каждый отказ стоил бы запроса к БД
+        pass
+
+    def check_throttles(self, request):
+        # первый отказ прекращает проверку: запрос, отклонённый по IP,
+        # не расходует корзину префикса, общую с другими посетителями
+        for throttle in self.get_throttles():
+            if not throttle.allow_request(request, self):
+                self.throttled(request, throttle.wait())
 
     def get(self, request, *args, **kwargs):
         serial = request.query_params.get("serial")
@@ -0,0 +1,513 @@
+"""
+Импорт машин из XLSX: разбор книг и запись одним писателем.
+
+Разбор базу не трогает: каждая книга превращается в список MachineRow
+с очищенными значениями полей и названиями справочников. Если книг
+несколько, они разбираются в пуле процессов — openpyxl упирается в CPU.
+Писатель сводит строки всех книг, разрешает справочники и существующие
+машины несколькими запросами и пишет пачками. Перед записью строки
+сверяются с базой по полям: пишутся только новые и изменившиеся машины,
+сверку можно выполнить и без записи (пробный прогон).
+
+Повторы зав. номера разрешаются детерминированно: книги идут в порядке
+путей, внутри книги — в порядке строк, побеждает последняя строка.
+Выгрузки за более поздний месяц лежат дальше по имени и перекрывают ранние.
+"""
+
+import gc
+import glob
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from itertools import zip_longest
+from pathlib import Path
+
+import django
+from core.signals import records_bulk_saved
+from django.db import transaction
+from django.utils import timezone
+from openpyxl import load_workbook
+from references.models import ReferenceItem
+
+from .models import Machine
+
+EXCEL_COLUMNS = {
+    "serial_number": "Зав. № машины",
+    "machine_model": "Модель техники",
+    "engine_model": "Модель двигателя",
+    "engine_serial_number": "Зав. № двигателя",
+    "transmission_model": "Модель трансмиссии",
+    "transmission_serial_number": "Зав. № трансмиссии",
+    "drive_axle_model": "Модель ведущего моста",
+    "drive_axle_serial_number": "Зав. № ведущего моста",
+    "steer_axle_model": "Модель управляемого моста",
+    "steer_axle_serial_number": "Зав. № управляемого моста",
+    "contract_number_and_date": "Договор поставки №, дата",
+    "shipment_date": "Дата отгрузки с завода",
+    "consignee": "Грузополучатель (конечный потребитель)",
+    "delivery_address": "Адрес поставки (эксплуатации)",
+    "options": "Комплектация (доп. опции)",
+}
+
+# поле машины -> категория справочника
+REFERENCE_FIELDS = {
+    "machine_model": ReferenceItem.Category.MACHINE_MODEL,
+    "engine_model": ReferenceItem.Category.ENGINE_MODEL,
+    "transmission_model": ReferenceItem.Category.TRANSMISSION_MODEL,
+    "drive_axle_model": ReferenceItem.Category.DRIVE_AXLE_MODEL,
+    "steer_axle_model": ReferenceItem.Category.STEER_AXLE_MODEL,
+}
+
+TEXT_FIELDS = (
+    "engine_serial_number",
+    "transmission_serial_number",
+    "drive_axle_serial_number",
+    "steer_axle_serial_number",
+    "contract_number_and_date",
+    "consignee",
+    "delivery_address",
+    "options",
+)
+
+DATE_FIELDS = ("shipment_date",)
+DATE_FORMATS = ("%d.%m.%Y", "%Y-%m-%d")
+
+WRITE_BATCH_SIZE = 2000
+
+
+class MachineImportError(Exception):
+    pass
+
+
+@dataclass(slots=True)
+class MachineRow:
+    source: str
+    serial_number: str
+    values: dict
+    references: dict
+
+
+@dataclass
+class ParsedFile:
+    path: str
+    rows: list = field(default_factory=list)
+    warnings: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+    skipped: int = 0
+    # этап -> секунды
+    timings: dict = field(default_factory=dict, compare=False)
+
+
+@dataclass
+class MachineChange:
+    row: MachineRow
+    pk: int
+    # поле -> (в базе, в файле)
+    fields: dict
+
+
+@dataclass
+class MachineDiff:
+    new: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    unchanged: list = field(default_factory=list)
+
+    def changed_fields(self):
+        """{поле: сколько машин с изменением}, по убыванию."""
+        counts = Counter(name for change in self.changed for name in change.fields)
+        return dict(counts.most_common())
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    warnings: list = field(default_factory=list)
+    diff: MachineDiff | None = None
+    timings: dict = field(default_factory=dict)
+
+
+def find_workbooks(path):
+    """Книги по пути к файлу, каталогу (все *.xlsx в нём) или шаблону glob."""
+    path = str(path)
+    if os.path.isdir(path):
+        paths = glob.glob(os.path.join(path, "*.xlsx"))
+    elif glob.has_magic(path):
+        paths = glob.glob(path)
+    elif os.path.exists(path):
+        return [Path(path)]
+    else:
+        raise MachineImportError(f"Файл не найден: {path}")
+
+    # ~$… — файлы блокировки, которые Excel оставляет рядом с открытой книгой
+    found = sorted(Path(p) for p in paths if not Path(p).name.startswith("~$"))
+    if not found:
+        raise MachineImportError(f"Не найдено ни одного XLSX-файла: {path}")
+    return found
+
+
+_INVALID_DATE = object()
+
+
+def _parse_date_text(text, formats):
+    if not text:
+        return None
+    for position, fmt in enumerate(formats):
+        try:
+            value = datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+        if position:
+            # формат колонки обычно один: найденный пробуется первым
+            formats.insert(0, formats.pop(position))
+        return value
+    return _INVALID_DATE
+
+
+def parse_date_column(values):
+    """
+    Разбирает колонку дат: (даты, индексы нераспознанных значений).
+    Ячейки-даты берутся как есть. Строки разбираются один раз на значение:
+    у многих машин одна и та же дата отгрузки, повторы берутся из памяти.
+    """
+    formats = list(DATE_FORMATS)
+    memo = {}
+    dates = []
+    invalid = []
+    for index, value in enumerate(values):
+        if isinstance(value, datetime):
+            value = value.date()
+        elif value is not None and not isinstance(value, date):
+            parsed = memo.get(value)
+            if parsed is None and value not in memo:
+                parsed = memo[value] = _parse_date_text(str(value).strip(), formats)
+            value = parsed
+            if value is _INVALID_DATE:
+                invalid.append(index)
+                value = None
+        dates.append(value)
+    return dates, invalid
+
+
+def _clean(value):
+    if type(value) is str:
+        return value.strip()
+    return "" if value is None else str(value).strip()
+
+
+def clean_column(values):
+    # то же, что _clean, без вызова функции на каждую ячейку
+    return [
+        value.strip() if type(value) is str else "" if value is None else str(value).strip()
+        for value in values
+    ]
+
+
+@contextmanager
+def _gc_paused():
+    # нормализация создаёт сотни тысяч словарей и объектов без циклических
+    # ссылок; сборщик циклов на них только тратит время (до половины этапа)
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def parse_workbook(path):
+    """Разбирает одну книгу в ParsedFile. Выполняется и в дочерних процессах."""
+    path = Path(path)
+    parsed = ParsedFile(path=str(path))
+
+    started = time.perf_counter()
+    workbook = load_workbook(filename=str(path), read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        # строки без единого значения пропускаются, номера строк листа сохраняются
+        numbered = [(row_num, row) for row_num, row in enumerate(rows, start=2) if any(row)]
+    finally:
+        workbook.close()
+    parsed.timings["read"] = time.perf_counter() - started
+
+    if header is None:
+        parsed.warnings.append(f"{path.name}: файл пустой")
+        return parsed
+
+    started = time.perf_counter()
+    with _gc_paused():
+        normalize_rows(parsed, path.name, header, numbered)
+    parsed.timings["normalize"] = time.perf_counter() - started
+    return parsed
+
+
+def _column_indexes(parsed, file_name, header):
+    header_index = {
+        _clean(name): idx for idx, name in enumerate(header) if name is not None
+    }
+    missing_headers = [
+        excel_name
+        for excel_name in EXCEL_COLUMNS.values()
+        if excel_name not in header_index
+    ]
+    if missing_headers:
+        parsed.warnings.append(
+            f"{file_name}: в файле не найдены некоторые ожидаемые колонки:\n"
+            + "\n".join(f"  - {h}" for h in missing_headers)
+        )
+    return {
+        name: header_index.get(excel_name)
+        for name, excel_name in EXCEL_COLUMNS.items()
+    }
+
+
+def normalize_rows(parsed, file_name, header, numbered):
+    """
+    Колоночная нормализация строк листа ([(номер строки, значения)]):
+    индексы колонок находятся один раз, каждая колонка очищается
+    и проверяется целиком, затем строки собираются в MachineRow.
+    """
+    indexes = _column_indexes(parsed, file_name, header)
+    row_nums = [row_num for row_num, _ in numbered]
+    table = list(zip_longest(*(row for _, row in numbered)))
+    empty = (None,) * len(numbered)
+
+    def column(name):
+        idx = indexes[name]
+        return table[idx] if idx is not None and idx < len(table) else empty
+
+    serials = clean_column(column("serial_number"))
+    references = {name: clean_column(column(name)) for name in REFERENCE_FIELDS}
+    values = {name: clean_column(column(name)) for name in TEXT_FIELDS}
+    for name in DATE_FIELDS:
+        raw = column(name)
+        values[name], invalid = parse_date_column(raw)
+        for index in invalid:
+            if serials[index]:
+                parsed.warnings.append(
+                    f"Строка {file_name}:{row_nums[index]}: не удалось распознать "
+                    f"дату '{_clean(raw[index])}', пропускаю."
+                )
+
+    for index, serial_number in enumerate(serials):
+        if not serial_number:
+            parsed.skipped += 1
+            parsed.warnings.append(
+                f"Строка {file_name}:{row_nums[index]}: нет значения в колонке "
+                f"'{EXCEL_COLUMNS['serial_number']}', пропускаю."
+            )
+    for name, column_values in references.items():
+        for index, value in enumerate(column_values):
+            if not value and serials[index]:
+                parsed.errors.append(
+                    f"Строка {file_name}:{row_nums[index]}: {EXCEL_COLUMNS[name]} "
+                    f"пустое для машины с серийным номером '{serials[index]}'"
+                )
+
+    value_names = list(values)
+    reference_names = list(references)
+    for row_num, serial_number, row_values, row_references in zip(
+        row_nums, serials, zip(*values.values()), zip(*references.values())
+    ):
+        if serial_number:
+            parsed.rows.append(
+                MachineRow(
+                    f"{file_name}:{row_num}",
+                    serial_number,
+                    dict(zip(value_names, row_values)),
+                    dict(zip(reference_names, row_references)),
+                )
+            )
+
+
+def parse_workbooks(paths, workers=None):
+    """
+    Разбирает книги в порядке paths. Несколько книг — в пуле из workers
+    процессов (по умолчанию по числу ядер).
+    """
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        return [parse_workbook(path) for path in paths]
+
+    # при fork дочерние процессы не трогают унаследованные соединения с базой
+    # и завершаются через os._exit, не закрывая их; при spawn — поднимают Django
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        return list(pool.map(parse_workbook, paths))
+
+
+def merge_rows(parsed_files):
+    """Строки всех книг без повторов зав. номера (побеждает последняя) и предупреждения."""
+    merged = {}
+    warnings = []
+    for parsed in parsed_files:
+        for row in parsed.rows:
+            previous = merged.pop(row.serial_number, None)
+            if previous is not None:
+                warnings.append(
+                    f"Строка {row.source}: зав. № '{row.serial_number}' уже был "
+                    f"в строке {previous.source}, беру последнюю."
+                )
+            merged[row.serial_number] = row
+    return list(merged.values()), warnings
+
+
+def _resolve_references(rows):
+    """{(категория, название): id}; недостающие элементы справочников создаются."""
+    wanted = {
+        (REFERENCE_FIELDS[name], value)
+        for row in rows
+        for name, value in row.references.items()
+    }
+    resolved = {}
+    for category in {category for category, _ in wanted}:
+        names = [name for cat, name in wanted if cat == category]
+        # при дублях в справочнике берётся самый ранний элемент
+        for pk, name in (
+            ReferenceItem.objects.filter(category=category, name__in=names)
+            .order_by("-pk")
+            .values_list("pk", "name")
+        ):
+            resolved[(category, name)] = pk
+
+    missing = [
+        ReferenceItem(category=category, name=name, description="")
+        for category, name in sorted(wanted - resolved.keys())
+    ]
+    for item in ReferenceItem.objects.bulk_create(missing):
+        resolved[(item.category, item.name)] = item.pk
+    return resolved
+
+
+def _batches(items):
+    for start in range(0, len(items), WRITE_BATCH_SIZE):
+        yield items[start : start + WRITE_BATCH_SIZE]
+
+
+def diff_machines(rows):
+    """
+    Сравнивает строки с базой по полям: один запрос на пачку строк.
+    Справочники сравниваются по названию, поэтому для сравнения
+    ничего не нужно создавать.
+    """
+    diff = MachineDiff()
+    reference_columns = [f"{name}__name" for name in REFERENCE_FIELDS]
+    for batch in _batches(rows):
+        current = {
+            values["serial_number"]: values
+            for values in Machine.objects.filter(
+                serial_number__in=[row.serial_number for row in batch]
+            ).values("pk", "serial_number", *TEXT_FIELDS, *DATE_FIELDS, *reference_columns)
+        }
+        for row in batch:
+            values = current.get(row.serial_number)
+            if values is None:
+                diff.new.append(row)
+                continue
+            fields = {}
+            for name, new in row.references.items():
+                if values[f"{name}__name"] != new:
+                    fields[name] = (values[f"{name}__name"], new)
+            for name, new in row.values.items():
+                if values[name] != new:
+                    fields[name] = (values[name], new)
+            if fields:
+                diff.changed.append(MachineChange(row, values["pk"], fields))
+            else:
+                diff.unchanged.append(row)
+    return diff
+
+
+def _build_machine(row, references, pk=None):
+    machine = Machine(pk=pk, serial_number=row.serial_number, **row.values)
+    for name, value in row.references.items():
+        setattr(machine, f"{name}_id", references[(REFERENCE_FIELDS[name], value)])
+    return machine
+
+
+def write_machines(rows, update=False, dry_run=False):
+    """
+    Сверяет строки с базой и пишет одной транзакцией: новые машины —
+    bulk_create, с update изменившиеся — bulk_update только изменённых
+    полей. Машины без изменений не трогаются (updated_at остаётся прежним),
+    без update существующие пропускаются. С dry_run в базу ничего не пишется.
+    """
+    result = ImportResult()
+    with transaction.atomic():
+        started = time.perf_counter()
+        diff = result.diff = diff_machines(rows)
+        result.timings["diff"] = time.perf_counter() - started
+        result.unchanged = len(diff.unchanged)
+        existing = len(diff.changed) + len(diff.unchanged)
+        if not update and existing:
+            result.skipped = existing
+            result.warnings.append(
+                f"Уже есть в базе: {existing} (из них с отличиями: {len(diff.changed)}), "
+                f"пропускаю (запусти с --update, чтобы обновлять)."
+            )
+        changes = diff.changed if update else []
+        result.created = len(diff.new)
+        result.updated = len(changes)
+        if dry_run:
+            return result
+
+        started = time.perf_counter()
+        references = _resolve_references([*diff.new, *(change.row for change in changes)])
+
+        for batch in _batches(diff.new):
+            created = Machine.objects.bulk_create(
+                [_build_machine(row, references) for row in batch]
+            )
+            records_bulk_saved.send(sender=Machine, instances=created)
+
+        # bulk_update не проставляет auto_now, время изменения ставится явно
+        now = timezone.now()
+        for batch in _batches(changes):
+            machines = []
+            for change in batch:
+                machine = _build_machine(change.row, references, pk=change.pk)
+                machine.updated_at = now
+                machines.append(machine)
+            fields = sorted({name for change in batch for name in change.fields})
+            Machine.objects.bulk_update(machines, [*fields, "updated_at"])
+            # у собранных объектов нет клиента и сервиса, получателям сигнала
+            # (доступ, события) нужны записи из базы
+            records_bulk_saved.send(
+                sender=Machine,
+                instances=list(Machine.objects.filter(pk__in=[m.pk for m in machines])),
+            )
+        result.timings["write"] = time.perf_counter() - started
+
+    return result
+
+
+def diff_report(diff):
+    """Отчёт о сверке для сохранения в JSON."""
+    return {
+        "summary": {
+            "new": len(diff.new),
+            "changed": len(diff.changed),
+            "unchanged": len(diff.unchanged),
+            "changed_fields": diff.changed_fields(),
+        },
+        "new": [row.serial_number for row in diff.new],
+        "changed": [
+            {
+                "serial_number": change.row.serial_number,
+                "source": change.row.source,
+                "fields": {
+                    name: {"old": old, "new": new}
+                    for name, (old, new) in change.fields.items()
+                },
+            }
+            for change in diff.changed
+        ],
+        "unchanged": [row.serial_number for row in diff.unchanged],
+    }
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from machines.access import rebuild_machine_access
+
+
+class Command(BaseCommand):
+    help = "Полная пересборка таблицы доступа пользователей к машинам"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--machine",
+            type=int,
+            action="append",
+            dest="machine_ids",
+            help="ID машины для пересборки (можно указать несколько раз). "
+                 "По умолчанию пересобирается весь парк.",
+        )
+
+    def handle(self, *args, **options):
+        machine_ids = options.get("machine_ids")
+
+        with transaction.atomic():
+            created = rebuild_machine_access(machine_ids)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Доступ пересобран. Создано записей: {created}")
+        )
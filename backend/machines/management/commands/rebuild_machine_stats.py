@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from machines.stats import refresh_machine_stats
+
+
+class Command(BaseCommand):
+    help = "Полный пересчёт сводок по машинам (рекламации, простои, последнее ТО)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--machine",
+            type=int,
+            action="append",
+            dest="machine_ids",
+            help="ID машины для пересчёта (можно указать несколько раз). "
+                 "По умолчанию пересчитывается весь парк.",
+        )
+
+    def handle(self, *args, **options):
+        machine_ids = options.get("machine_ids")
+
+        with transaction.atomic():
+            processed = refresh_machine_stats(machine_ids)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Сводки пересчитаны. Машин обработано: {processed}")
+        )
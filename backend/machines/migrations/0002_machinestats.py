@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0001_initial'),
+        ('references', '0002_alter_referenceitem_category'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MachineStats',
+            fields=[
+                ('machine', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='machines.machine', verbose_name='Машина')),
+                ('claims_count', models.PositiveIntegerField(default=0, verbose_name='Количество рекламаций')),
+                ('total_downtime', models.PositiveIntegerField(default=0, verbose_name='Суммарный простой, дни')),
+                ('last_failure_date', models.DateField(blank=True, null=True, verbose_name='Дата последнего отказа')),
+                ('last_maintenance_date', models.DateField(blank=True, null=True, verbose_name='Дата последнего ТО')),
+                ('max_operating_time', models.PositiveIntegerField(blank=True, null=True, verbose_name='Максимальная наработка, м/час')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('last_maintenance_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='references.referenceitem', verbose_name='Вид последнего ТО')),
+            ],
+            options={
+                'verbose_name': 'Сводка по машине',
+                'verbose_name_plural': 'Сводки по машинам',
+            },
+        ),
+    ]
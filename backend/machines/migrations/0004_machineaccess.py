@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0003_alter_machine_client_alter_machine_service_company_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MachineAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('client', 'Клиент'), ('service', 'Сервисная организация'), ('manager', 'Менеджер')], max_length=20, verbose_name='Роль')),
+                ('machine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access', to='machines.machine', verbose_name='Машина')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='machine_access', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Доступ к машине',
+                'verbose_name_plural': 'Доступы к машинам',
+                'constraints': [models.UniqueConstraint(fields=('user', 'role', 'machine'), name='machine_access_unique')],
+            },
+        ),
+    ]
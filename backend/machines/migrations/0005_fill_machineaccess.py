@@ -0,0 +1,29 @@
+from django.db import migrations
+
+BATCH_SIZE = 5000
+
+
+def fill_machine_access(apps, schema_editor):
+    Machine = apps.get_model("machines", "Machine")
+    MachineAccess = apps.get_model("machines", "MachineAccess")
+
+    rows = []
+    machines = Machine.objects.order_by().values_list("pk", "client_id", "service_company_id")
+    for machine_id, client_id, service_company_id in machines.iterator(chunk_size=BATCH_SIZE):
+        if client_id:
+            rows.append(MachineAccess(user_id=client_id, role="client", machine_id=machine_id))
+        if service_company_id:
+            rows.append(MachineAccess(user_id=service_company_id, role="service", machine_id=machine_id))
+
+    MachineAccess.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("machines", "0004_machineaccess"),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_machine_access, migrations.RunPython.noop),
+    ]
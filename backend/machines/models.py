@@ -1,7 +1,35 @@
 from django.conf import settings
 from django.db import models
+from django.db.models import BooleanField, F, Func, Q, Subquery
 
 from references.models import ReferenceItem
+from users.models import UserProfile
+
+
+class MachineQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """
+        Машины, доступные пользователю:
+        - менеджер: все
+        - клиент: только свои
+        - сервис: только те, которые он обслуживает
+        """
+        if not user.is_authenticated:
+            return self.none()
+
+        profile = getattr(user, "profile", None)
+        role = getattr(profile, "role", None)
+
+        if role == UserProfile.Role.MANAGER:
+            return self
+
+        if role == UserProfile.Role.CLIENT:
+            return self.filter(client=user)
+
+        if role == UserProfile.Role.SERVICE:
+            return self.filter(service_company=user)
+
+        return self.none()
 
 
 class Machine(models.Model):
@@ -103,6 +131,7 @@ class Machine(models.Model):
         null=True,
         blank=True,
         on_delete=models.SET_NULL,
+        db_index=False,  # покрыт machines_client_ship_idx
     )
     service_company = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -111,15 +140,170 @@ class Machine(models.Model):
         null=True,
         blank=True,
         on_delete=models.SET_NULL,
+        db_index=False,  # покрыт machines_service_ship_idx
     )
 
     created_at = models.DateTimeField("Создано", auto_now_add=True)
     updated_at = models.DateTimeField("Обновлено", auto_now=True)
 
+    objects = MachineQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Машина"
         verbose_name_plural = "Машины"
         ordering = ["-shipment_date", "serial_number"]
+        indexes = [
+            # общий список (менеджер, админка) в порядке сортировки модели
+            models.Index(
+                fields=["-shipment_date", "serial_number"],
+                name="machines_ship_idx",
+            ),
+            # списки клиента и сервиса: фильтр по роли + сортировка модели
+            # читаются из индекса по порядку, без сортировки в памяти
+            models.Index(
+                fields=["client", "-shipment_date", "serial_number"],
+                name="machines_client_ship_idx",
+            ),
+            models.Index(
+                fields=["service_company", "-shipment_date", "serial_number"],
+                name="machines_service_ship_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.serial_number} ({self.machine_model})"
+
+
+class MachineStats(models.Model):
+    """
+    Денормализованная сводка по машине: рекламации, простои и последнее ТО.
+    Пересчитывается при записи рекламаций/ТО (machines.signals)
+    и целиком — командой rebuild_machine_stats.
+    """
+
+    machine = models.OneToOneField(
+        Machine,
+        verbose_name="Машина",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+    )
+
+    claims_count = models.PositiveIntegerField("Количество рекламаций", default=0)
+    total_downtime = models.PositiveIntegerField("Суммарный простой, дни", default=0)
+    last_failure_date = models.DateField(
+        "Дата последнего отказа",
+        null=True,
+        blank=True,
+    )
+
+    last_maintenance_date = models.DateField(
+        "Дата последнего ТО",
+        null=True,
+        blank=True,
+    )
+    last_maintenance_type = models.ForeignKey(
+        ReferenceItem,
+        verbose_name="Вид последнего ТО",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
+    max_operating_time = models.PositiveIntegerField(
+        "Максимальная наработка, м/час",
+        null=True,
+        blank=True,
+    )
+
+    updated_at = models.DateTimeField("Обновлено", auto_now=True)
+
+    class Meta:
+        verbose_name = "Сводка по машине"
+        verbose_name_plural = "Сводки по машинам"
+
+    def __str__(self) -> str:
+        return f"Сводка по {self.machine_id}"
+
+
+class InSubquery(Func):
+    """
+    field IN (подзапрос). В PostgreSQL — field = ANY(ARRAY(подзапрос)):
+    массив считается один раз (InitPlan), и условие берётся из индекса
+    даже в OR с другим индексируемым условием (BitmapOr), а IN с подзапросом
+    там проверяется по каждой строке таблицы. См. docs/query-plans.md.
+    """
+
+    output_field = BooleanField()
+
+    def __init__(self, field, queryset):
+        super().__init__(F(field), Subquery(queryset))
+
+    def as_sql(self, compiler, connection, template="%s IN %s"):
+        lhs, subquery = self.source_expressions
+        lhs_sql, lhs_params = compiler.compile(lhs)
+        subquery_sql, subquery_params = compiler.compile(subquery)
+        return template % (lhs_sql, subquery_sql), (*lhs_params, *subquery_params)
+
+    def as_postgresql(self, compiler, connection):
+        # подзапрос уже в скобках: ARRAY(SELECT ...)
+        return self.as_sql(compiler, connection, template="%s = ANY(ARRAY%s)")
+
+
+class MachineAccessQuerySet(models.QuerySet):
+    def machine_ids(self, user, role):
+        """id машин, доступных пользователю в данной роли (годится как подзапрос)."""
+        return self.filter(user=user, role=role).values_list("machine", flat=True)
+
+    def serviced_by(self, user):
+        """
+        Условие на записи (рекламации, ТО, срезы), видимые сервисной компании:
+        она указана в записи или обслуживает машину. Один SQL-запрос: id машин
+        берутся подзапросом, а не отдельным запросом со списком в параметрах.
+        """
+        serviced = self.machine_ids(user, UserProfile.Role.SERVICE)
+        return Q(service_company=user) | Q(InSubquery("machine", serviced))
+
+
+class MachineAccess(models.Model):
+    """
+    Кому видна машина: клиенту и обслуживающей сервисной компании.
+    Повторяет Machine.client / service_company, чтобы выборки рекламаций и ТО
+    по роли не соединялись с таблицей машин. Поддерживается machines.signals,
+    целиком пересобирается командой rebuild_machine_access.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name="Пользователь",
+        on_delete=models.CASCADE,
+        related_name="machine_access",
+        db_index=False,  # покрыт machine_access_unique
+    )
+    role = models.CharField(
+        "Роль",
+        max_length=20,
+        choices=UserProfile.Role.choices,
+    )
+    machine = models.ForeignKey(
+        Machine,
+        verbose_name="Машина",
+        on_delete=models.CASCADE,
+        related_name="access",
+    )
+
+    objects = MachineAccessQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Доступ к машине"
+        verbose_name_plural = "Доступы к машинам"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "role", "machine"],
+                name="machine_access_unique",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_id} ({self.role}) → {self.machine_id}"
@@ -2,7 +2,7 @@ from references.serializers import ReferenceItemSerializer
 from rest_framework import serializers
 from users.serializers import UserShortSerializer
 
-from .models import Machine
+from .models import Machine, MachineStats
 
 
 class MachineShortSerializer(serializers.ModelSerializer):
@@ -40,6 +40,21 @@ class MachinePublicSerializer(serializers.ModelSerializer):
         )
 
 
+class MachineStatsSerializer(serializers.ModelSerializer):
+    last_maintenance_type = ReferenceItemSerializer(read_only=True)
+
+    class Meta:
+        model = MachineStats
+        fields = (
+            "claims_count",
+            "total_downtime",
+            "last_failure_date",
+            "last_maintenance_date",
+            "last_maintenance_type",
+            "max_operating_time",
+        )
+
+
 class MachineSerializer(serializers.ModelSerializer):
 
     machine_model = ReferenceItemSerializer(read_only=True)
@@ -51,6 +66,9 @@ class MachineSerializer(serializers.ModelSerializer):
     client = UserShortSerializer(read_only=True)
     service_company = UserShortSerializer(read_only=True)
 
+    # сводка из MachineStats; null, если она ещё не рассчитана
+    stats = MachineStatsSerializer(read_only=True, allow_null=True)
+
     class Meta:
         model = Machine
         fields = (
@@ -72,4 +90,5 @@ class MachineSerializer(serializers.ModelSerializer):
             "options",
             "client",
             "service_company",
+            "stats",
         )
@@ -0,0 +1,69 @@
+from claims.models import Claim
+from core.signals import records_bulk_saved
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from maintenance.models import Maintenance
+
+from .access import sync_machine_access
+from .models import Machine
+from .stats import refresh_machine_stats
+
+
+@receiver(pre_save, sender=Claim)
+@receiver(pre_save, sender=Maintenance)
+def remember_previous_machine(sender, instance, **kwargs):
+    # при переносе записи на другую машину нужно пересчитать и старую
+    if instance.pk is None:
+        return
+    instance._stats_previous_machine_id = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list("machine_id", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Claim)
+@receiver(post_save, sender=Maintenance)
+def update_stats_on_save(sender, instance, **kwargs):
+    refresh_machine_stats(
+        {instance.machine_id, getattr(instance, "_stats_previous_machine_id", None)}
+    )
+
+
+@receiver(post_delete, sender=Claim)
+@receiver(post_delete, sender=Maintenance)
+def update_stats_on_delete(sender, instance, origin=None, **kwargs):
+    # при удалении самой машины сводка удаляется каскадом, пересчитывать нечего
+    if isinstance(origin, Machine) or getattr(origin, "model", None) is Machine:
+        return
+    refresh_machine_stats({instance.machine_id})
+
+
+@receiver(records_bulk_saved, sender=Claim)
+@receiver(records_bulk_saved, sender=Maintenance)
+def update_stats_on_bulk_save(sender, instances, **kwargs):
+    refresh_machine_stats({instance.machine_id for instance in instances})
+
+
+@receiver(pre_save, sender=Machine)
+def remember_previous_access(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    instance._access_previous = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list("client_id", "service_company_id")
+        .first()
+    )
+
+
+@receiver(post_save, sender=Machine)
+def update_access_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_access_previous", None)
+    if not created and previous == (instance.client_id, instance.service_company_id):
+        return
+    sync_machine_access([instance])
+
+
+@receiver(records_bulk_saved, sender=Machine)
+def update_access_on_bulk_save(sender, instances, **kwargs):
+    sync_machine_access(instances)
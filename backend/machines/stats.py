@@ -0,0 +1,122 @@
+from claims.models import Claim
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Sum
+from maintenance.models import Maintenance
+
+from .models import Machine, MachineStats
+
+STATS_UPDATE_FIELDS = (
+    "claims_count",
+    "total_downtime",
+    "last_failure_date",
+    "last_maintenance_date",
+    "last_maintenance_type",
+    "max_operating_time",
+    "updated_at",
+)
+
+BATCH_SIZE = 1000
+
+
+def _aggregate(queryset, expression):
+    """Коррелированный подзапрос с агрегатом по машине из OuterRef."""
+    return Subquery(
+        queryset.filter(machine=OuterRef("pk"))
+        .order_by()
+        .values("machine")
+        .annotate(value=expression)
+        .values("value")[:1]
+    )
+
+
+def annotate_machine_stats(queryset):
+    """
+    Добавляет к queryset машин все поля сводки одним SQL-запросом
+    (по подзапросу на каждый показатель, без N отдельных агрегатов).
+    """
+    last_maintenance = Maintenance.objects.filter(machine=OuterRef("pk")).order_by(
+        "-maintenance_date", "-id"
+    )
+
+    return queryset.annotate(
+        stat_claims_count=_aggregate(
+            Claim.objects, Count("id", output_field=IntegerField())
+        ),
+        stat_total_downtime=_aggregate(Claim.objects, Sum("downtime")),
+        stat_last_failure_date=_aggregate(Claim.objects, Max("failure_date")),
+        stat_claims_operating_time=_aggregate(Claim.objects, Max("operating_time")),
+        stat_maintenance_operating_time=_aggregate(
+            Maintenance.objects, Max("operating_time")
+        ),
+        stat_last_maintenance_date=Subquery(
+            last_maintenance.values("maintenance_date")[:1]
+        ),
+        stat_last_maintenance_type=Subquery(
+            last_maintenance.values("maintenance_type")[:1]
+        ),
+    )
+
+
+def _build_stats(row):
+    operating_times = [
+        value
+        for value in (
+            row["stat_claims_operating_time"],
+            row["stat_maintenance_operating_time"],
+        )
+        if value is not None
+    ]
+    return MachineStats(
+        machine_id=row["pk"],
+        claims_count=row["stat_claims_count"] or 0,
+        total_downtime=row["stat_total_downtime"] or 0,
+        last_failure_date=row["stat_last_failure_date"],
+        last_maintenance_date=row["stat_last_maintenance_date"],
+        last_maintenance_type_id=row["stat_last_maintenance_type"],
+        max_operating_time=max(operating_times) if operating_times else None,
+    )
+
+
+def refresh_machine_stats(machine_ids=None):
+    """
+    Пересчитывает сводки для указанных машин (или для всего парка, если
+    machine_ids не передан) и записывает их пачками через upsert.
+    Возвращает количество обработанных машин.
+    """
+    machines = Machine.objects.order_by("pk")
+    if machine_ids is not None:
+        machine_ids = {pk for pk in machine_ids if pk is not None}
+        if not machine_ids:
+            return 0
+        machines = machines.filter(pk__in=machine_ids)
+
+    rows = annotate_machine_stats(machines).values(
+        "pk",
+        "stat_claims_count",
+        "stat_total_downtime",
+        "stat_last_failure_date",
+        "stat_claims_operating_time",
+        "stat_maintenance_operating_time",
+        "stat_last_maintenance_date",
+        "stat_last_maintenance_type",
+    )
+
+    processed = 0
+    batch = []
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(_build_stats(row))
+        if len(batch) >= BATCH_SIZE:
+            processed += _save_batch(batch)
+            batch = []
+    if batch:
+        processed += _save_batch(batch)
+    return processed
+
+
+def _save_batch(batch):
+    MachineStats.objects.bulk_create(
+        batch,
+        update_conflicts=True,
+        unique_fields=["machine"],
+        update_fields=STATS_UPDATE_FIELDS,
+    )
+    return len(batch)
@@ -1,10 +1,27 @@
+import json
+import tempfile
+from datetime import date
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from claims.models import Claim
+from core.throttling import TokenBucketThrottle
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
 from django.test import TestCase
 from django.urls import reverse
-from machines.models import Machine
+from core.signals import records_bulk_saved
+from core.testing import MACHINE_MODEL_FIELDS, build_machine, create_machine, create_references
+from machines.importing import EXCEL_COLUMNS, parse_date_column, parse_workbooks
+from machines.models import Machine, MachineAccess, MachineStats
+from maintenance.models import Maintenance
+from openpyxl import Workbook
 from references.models import ReferenceItem
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
 from users.models import UserProfile
 
 User = get_user_model()
@@ -12,6 +29,8 @@ User = get_user_model()
 
 class MachineAPITests(TestCase):
     def setUp(self):
+        # кешированные списки предыдущих тестов не должны находиться
+        cache.clear()
         self.api_client = APIClient()
 
         self.manager = User.objects.create_user(
@@ -158,6 +177,31 @@ class MachineAPITests(TestCase):
             {self.machine1.serial_number, self.machine2.serial_number},
         )
 
+    def test_normalized_list_moves_references_to_side_table(self):
+        """?normalize=1: в машинах id справочников, сами элементы — один раз."""
+        url = reverse("machine-list")
+        self.api_client.force_authenticate(user=self.manager)
+        response = self.api_client.get(url, {"normalize": "1"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(len(response.data["results"]), 3)
+        for item in response.data["results"]:
+            self.assertEqual(item["machine_model"], self.machine_model.id)
+            self.assertEqual(item["engine_model"], self.engine_model.id)
+        references = response.data["references"]
+        self.assertEqual(len(references), 5)
+        self.assertEqual(references[self.machine_model.id]["name"], "Silant 1.5")
+
+    def test_normalized_paginated_list_keeps_page_fields(self):
+        url = reverse("machine-list")
+        self.api_client.force_authenticate(user=self.manager)
+        response = self.api_client.get(url, {"normalize": "1", "page_size": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIn(self.steer_axle_model.id, response.data["references"])
+
     def test_client_cannot_access_foreign_machine_detail(self):
         """Клиент не может получить детальную инфу по чужой машине."""
         url = reverse("machine-detail", args=[self.machine3.id])
@@ -165,3 +209,497 @@ class MachineAPITests(TestCase):
         response = self.api_client.get(url)
         # так как в queryset клиенту просто недоступна эта машина — будет 404
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_batch_returns_results_in_request_order(self):
+        url = reverse("machine-batch")
+        self.api_client.force_authenticate(user=self.service_user)
+        ids = f"{self.machine2.id},{self.machine3.id},{self.machine1.id}"
+        response = self.api_client.get(url, {"ids": ids})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        results = response.data["results"]
+        self.assertEqual(results[0]["serial_number"], self.machine2.serial_number)
+        # machine3 сервису недоступна — возвращается маркер, а не данные
+        self.assertEqual(results[1], {"ids": self.machine3.id, "not_found": True})
+        self.assertEqual(results[2]["serial_number"], self.machine1.serial_number)
+        self.assertEqual(response.data["not_found"], [self.machine3.id])
+
+    def test_batch_by_serial_numbers(self):
+        url = reverse("machine-batch")
+        self.api_client.force_authenticate(user=self.manager)
+        response = self.api_client.get(url, {"serial_numbers": "MACH-003,UNKNOWN"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["id"], self.machine3.id)
+        self.assertEqual(response.data["not_found"], ["UNKNOWN"])
+
+    def test_batch_rejects_invalid_ids(self):
+        url = reverse("machine-batch")
+        self.api_client.force_authenticate(user=self.manager)
+        response = self.api_client.get(url, {"ids": "1,abc"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PublicSearchThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.api_client = APIClient()
+        self.url = reverse("public-machine-search")
+
+        self.manager = User.objects.create_user(username="manager", password="pass123")
+        self.manager.profile.role = UserProfile.Role.MANAGER
+        self.manager.profile.save()
+
+        rates = mock.patch.dict(
+            TokenBucketThrottle.THROTTLE_RATES,
+            {
+                "public_search_anon": "2/min",
+                "public_search_user": "4/min",
+                "public_search_prefix": "3/min",
+            },
+        )
+        rates.start()
+        self.addCleanup(rates.stop)
+
+    def search(self, serial, token=None):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}
+        return self.api_client.get(self.url, {"serial": serial}, **headers)
+
+    def test_anonymous_rejection_is_answered_without_queries(self):
+        self.assertEqual(self.search("0017").status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.search("0117").status_code, status.HTTP_404_NOT_FOUND)
+
+        with self.assertNumQueries(0):
+            response = self.search("0217")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response["Retry-After"]), 0)
+
+        # подделанный X-Forwarded-For не даёт новую корзину
+        response = self.api_client.get(
+            self.url, {"serial": "0317"}, HTTP_X_FORWARDED_FOR="203.0.113.7"
+        )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        # у пользователя с JWT своя корзина, и она больше гостевой
+        token = str(RefreshToken.for_user(self.manager).access_token)
+        statuses = [self.search(f"0{n}17", token).status_code for n in range(4, 9)]
+        self.assertEqual(statuses[:4], [status.HTTP_404_NOT_FOUND] * 4)
+        self.assertEqual(statuses[4], status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_prefix_bucket_is_shared_and_not_drained_by_rejected_requests(self):
+        for n, address in enumerate(("10.0.0.1", "10.0.0.2", "10.0.0.3")):
+            response = self.api_client.get(
+                self.url, {"serial": f"00{n}7"}, REMOTE_ADDR=address
+            )
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.api_client.get(self.url, {"serial": "0099"}, REMOTE_ADDR="10.0.0.4")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        response = self.api_client.get(self.url, {"serial": "0199"}, REMOTE_ADDR="10.0.0.4")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # отказ по IP не трогает корзину префикса «02»
+        for _ in range(3):
+            response = self.api_client.get(self.url, {"serial": "0299"}, REMOTE_ADDR="10.0.0.4")
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        response = self.api_client.get(self.url, {"serial": "0298"}, REMOTE_ADDR="10.0.0.5")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rejection_counters_are_visible_to_manager_only(self):
+        for _ in range(3):
+            self.search("0017")
+
+        self.api_client.force_authenticate(user=self.manager)
+        response = self.api_client.get(reverse("throttle-stats"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        counters = {item["scope"]: item["rejected"] for item in response.data}
+        self.assertEqual(counters["public_search_anon"], 1)
+        self.assertEqual(counters["public_search_prefix"], 0)
+
+        client_user = User.objects.create_user(username="client", password="pass123")
+        self.api_client.force_authenticate(user=client_user)
+        response = self.api_client.get(reverse("throttle-stats"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class MachineStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.api_client = APIClient()
+
+        self.manager = User.objects.create_user(username="manager", password="pass123")
+        self.manager.profile.role = UserProfile.Role.MANAGER
+        self.manager.profile.save()
+
+        refs = create_references(
+            *MACHINE_MODEL_FIELDS.values(),
+            ReferenceItem.Category.FAILURE_NODE,
+            ReferenceItem.Category.REPAIR_METHOD,
+        )
+
+        self.maintenance_type_1 = ReferenceItem.objects.create(
+            category=ReferenceItem.Category.MAINTENANCE_TYPE,
+            name="ТО-1",
+        )
+        self.maintenance_type_2 = ReferenceItem.objects.create(
+            category=ReferenceItem.Category.MAINTENANCE_TYPE,
+            name="ТО-2",
+        )
+        self.failure_node = refs[ReferenceItem.Category.FAILURE_NODE]
+        self.repair_method = refs[ReferenceItem.Category.REPAIR_METHOD]
+
+        self.machine = create_machine(refs, "MACH-001")
+
+    def create_claim(self, failure_date, recovery_date, operating_time):
+        return Claim.objects.create(
+            failure_date=failure_date,
+            recovery_date=recovery_date,
+            operating_time=operating_time,
+            failure_node=self.failure_node,
+            failure_description="Отказ",
+            repair_method=self.repair_method,
+            machine=self.machine,
+        )
+
+    def test_stats_follow_claim_and_maintenance_writes(self):
+        self.create_claim(date(2024, 1, 10), date(2024, 1, 15), 100)
+        claim = self.create_claim(date(2024, 3, 1), date(2024, 3, 3), 400)
+        Maintenance.objects.create(
+            maintenance_type=self.maintenance_type_1,
+            maintenance_date=date(2024, 2, 1),
+            operating_time=250,
+            machine=self.machine,
+        )
+        Maintenance.objects.create(
+            maintenance_type=self.maintenance_type_2,
+            maintenance_date=date(2024, 4, 1),
+            operating_time=500,
+            machine=self.machine,
+        )
+
+        stats = MachineStats.objects.get(machine=self.machine)
+        self.assertEqual(stats.claims_count, 2)
+        self.assertEqual(stats.total_downtime, 7)
+        self.assertEqual(stats.last_failure_date, date(2024, 3, 1))
+        self.assertEqual(stats.last_maintenance_date, date(2024, 4, 1))
+        self.assertEqual(stats.last_maintenance_type, self.maintenance_type_2)
+        self.assertEqual(stats.max_operating_time, 500)
+
+        claim.delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.claims_count, 1)
+        self.assertEqual(stats.total_downtime, 5)
+        self.assertEqual(stats.last_failure_date, date(2024, 1, 10))
+
+    def test_machine_delete_removes_stats(self):
+        self.create_claim(date(2024, 1, 10), None, 100)
+        self.machine.delete()
+        self.assertFalse(MachineStats.objects.exists())
+
+    def test_rebuild_command_restores_stats(self):
+        self.create_claim(date(2024, 1, 10), date(2024, 1, 12), 100)
+        MachineStats.objects.all().delete()
+
+        call_command("rebuild_machine_stats", stdout=StringIO())
+
+        stats = MachineStats.objects.get(machine=self.machine)
+        self.assertEqual(stats.claims_count, 1)
+        self.assertEqual(stats.total_downtime, 2)
+
+    def test_stats_are_exposed_in_machine_list(self):
+        self.create_claim(date(2024, 1, 10), date(2024, 1, 12), 100)
+        other = Machine.objects.create(
+            serial_number="MACH-002",
+            machine_model=self.machine.machine_model,
+            engine_model=self.machine.engine_model,
+            transmission_model=self.machine.transmission_model,
+            drive_axle_model=self.machine.drive_axle_model,
+            steer_axle_model=self.machine.steer_axle_model,
+        )
+
+        self.api_client.force_authenticate(user=self.manager)
+        response = self.api_client.get(reverse("machine-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        by_serial = {item["serial_number"]: item for item in response.data}
+        self.assertEqual(by_serial[self.machine.serial_number]["stats"]["claims_count"], 1)
+        self.assertIsNone(by_serial[other.serial_number]["stats"])
+
+    def test_timeline_merges_events_with_cursor_pagination(self):
+        self.create_claim(date(2024, 1, 10), date(2024, 1, 12), 100)
+        self.create_claim(date(2024, 3, 1), None, 300)
+        Maintenance.objects.create(
+            maintenance_type=self.maintenance_type_1,
+            maintenance_date=date(2024, 3, 1),
+            operating_time=300,
+            machine=self.machine,
+        )
+        Maintenance.objects.create(
+            maintenance_type=self.maintenance_type_2,
+            maintenance_date=date(2024, 2, 1),
+            operating_time=200,
+            machine=self.machine,
+        )
+
+        self.api_client.force_authenticate(user=self.manager)
+        url = reverse("machine-timeline", args=[self.machine.id])
+
+        events = []
+        pages = 0
+        params = {"page_size": 2}
+        while url:
+            response = self.api_client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            events.extend(response.data["results"])
+            url, params = response.data["next"], None
+            pages += 1
+
+        self.assertEqual(pages, 2)
+        self.assertEqual(
+            [(str(event["date"]), event["kind"]) for event in events],
+            [
+                ("2024-03-01", "maintenance"),
+                ("2024-03-01", "claim"),
+                ("2024-02-01", "maintenance"),
+                ("2024-01-10", "claim"),
+            ],
+        )
+        self.assertEqual(events[0]["title"], "ТО-1")
+        self.assertEqual(events[3]["downtime"], 2)
+
+    def test_timeline_rejects_broken_cursor(self):
+        self.api_client.force_authenticate(user=self.manager)
+        url = reverse("machine-timeline", args=[self.machine.id])
+        response = self.api_client.get(url, {"cursor": "garbage"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MachineAccessTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client_user = User.objects.create_user(username="client", password="pass123")
+        self.service_user = User.objects.create_user(username="service", password="pass123")
+        self.other_service = User.objects.create_user(username="other_service", password="pass123")
+
+        self.refs = create_references()
+
+    def build_machine(self, serial_number, **kwargs):
+        return build_machine(self.refs, serial_number, **kwargs)
+
+    def access(self):
+        return set(MachineAccess.objects.values_list("user__username", "role", "machine__serial_number"))
+
+    def test_access_follows_machine_owners(self):
+        machine = self.build_machine(
+            "MACH-001",
+            client=self.client_user,
+            service_company=self.service_user,
+        )
+        machine.save()
+        self.assertEqual(
+            self.access(),
+            {("client", "client", "MACH-001"), ("service", "service", "MACH-001")},
+        )
+
+        machine.service_company = self.other_service
+        machine.save()
+        self.assertEqual(
+            self.access(),
+            {("client", "client", "MACH-001"), ("other_service", "service", "MACH-001")},
+        )
+
+        machine.client = None
+        machine.save()
+        self.assertEqual(self.access(), {("other_service", "service", "MACH-001")})
+
+        machine.delete()
+        self.assertEqual(self.access(), set())
+
+    def test_unchanged_owners_do_not_touch_access(self):
+        machine = self.build_machine("MACH-001", service_company=self.service_user)
+        machine.save()
+
+        machine.options = "Кабина"
+        # pre_save + сохранение машины, без пересборки доступа
+        with self.assertNumQueries(2):
+            machine.save()
+
+    def test_bulk_saved_machines_get_access(self):
+        machines = Machine.objects.bulk_create(
+            [
+                self.build_machine("MACH-001", client=self.client_user),
+                self.build_machine("MACH-002", service_company=self.service_user),
+            ]
+        )
+        self.assertEqual(self.access(), set())
+
+        records_bulk_saved.send(sender=Machine, instances=machines)
+        self.assertEqual(
+            self.access(),
+            {("client", "client", "MACH-001"), ("service", "service", "MACH-002")},
+        )
+
+    def test_rebuild_command_restores_access(self):
+        self.build_machine("MACH-001", client=self.client_user).save()
+        MachineAccess.objects.all().delete()
+
+        call_command("rebuild_machine_access", stdout=StringIO())
+        self.assertEqual(self.access(), {("client", "client", "MACH-001")})
+
+    def test_service_scope_is_one_query(self):
+        refs = create_references(
+            ReferenceItem.Category.FAILURE_NODE, ReferenceItem.Category.REPAIR_METHOD
+        )
+        serviced = self.build_machine("MACH-001", service_company=self.service_user)
+        foreign = self.build_machine("MACH-002", service_company=self.other_service)
+        serviced.save()
+        foreign.save()
+
+        def claim(machine, service_company=None):
+            return Claim.objects.create(
+                failure_date=date(2024, 5, 1),
+                operating_time=100,
+                failure_node=refs[ReferenceItem.Category.FAILURE_NODE],
+                failure_description="Отказ",
+                repair_method=refs[ReferenceItem.Category.REPAIR_METHOD],
+                machine=machine,
+                service_company=service_company,
+            )
+
+        on_serviced = claim(serviced)
+        performed = claim(foreign, service_company=self.service_user)
+        claim(foreign, service_company=self.other_service)
+
+        with self.assertNumQueries(1):
+            found = set(Claim.objects.filter(MachineAccess.objects.serviced_by(self.service_user)))
+        self.assertEqual(found, {on_serviced, performed})
+
+
+class MachineImportTests(TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+
+    def make_xlsx(self, name, *rows):
+        """rows — словари полей поверх значений по умолчанию."""
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(list(EXCEL_COLUMNS.values()))
+        for row in rows:
+            values = {key: f"{key}-1" for key in EXCEL_COLUMNS}
+            values["shipment_date"] = "01.02.2024"
+            values.update(row)
+            sheet.append([values[key] for key in EXCEL_COLUMNS])
+        path = self.directory / name
+        workbook.save(path)
+        return path
+
+    def run_import(self, path, **options):
+        output = StringIO()
+        call_command("import_machines_from_xlsx", path=str(path), stdout=output, **options)
+        return output.getvalue()
+
+    def test_directory_import_resolves_duplicates_by_file_order(self):
+        self.make_xlsx("2024-02.xlsx", {"serial_number": "M-2", "consignee": "Февраль"})
+        self.make_xlsx(
+            "2024-01.xlsx",
+            {"serial_number": "M-1"},
+            {"serial_number": "M-2", "consignee": "Январь"},
+        )
+
+        output = self.run_import(self.directory, workers=1)
+
+        self.assertIn("Создано: 2", output)
+        self.assertIn("беру последнюю", output)
+        self.assertEqual(Machine.objects.get(serial_number="M-2").consignee, "Февраль")
+        self.assertEqual(Machine.objects.get(serial_number="M-1").shipment_date, date(2024, 2, 1))
+        # справочники общие для всех строк
+        self.assertEqual(
+            ReferenceItem.objects.filter(category=ReferenceItem.Category.MACHINE_MODEL).count(), 1
+        )
+
+    def test_update_writes_only_changed_machines(self):
+        path = self.make_xlsx(
+            "data.xlsx", {"serial_number": "M-1"}, {"serial_number": "M-2"}
+        )
+        self.run_import(path)
+        owner = User.objects.create_user(username="client", password="pass123")
+        machine = Machine.objects.get(serial_number="M-1")
+        machine.client = owner
+        machine.save()
+        untouched = Machine.objects.get(serial_number="M-2").updated_at
+
+        path = self.make_xlsx(
+            "data.xlsx",
+            {"serial_number": "M-1", "consignee": "Новый"},
+            {"serial_number": "M-2"},
+            {"serial_number": "M-3"},
+        )
+        output = self.run_import(path)
+        self.assertIn("Создано: 1, обновлено: 0", output)
+        self.assertIn("Уже есть в базе: 2 (из них с отличиями: 1)", output)
+        self.assertEqual(Machine.objects.get(serial_number="M-1").consignee, "consignee-1")
+
+        output = self.run_import(path, update=True)
+
+        self.assertIn("Создано: 0, обновлено: 1, без изменений: 2", output)
+        machine.refresh_from_db()
+        self.assertEqual(machine.consignee, "Новый")
+        self.assertEqual(machine.client, owner)
+        self.assertTrue(MachineAccess.objects.filter(user=owner, machine=machine).exists())
+        self.assertEqual(Machine.objects.get(serial_number="M-2").updated_at, untouched)
+
+    def test_dry_run_reports_field_diff_without_writing(self):
+        self.run_import(self.make_xlsx("data.xlsx", {"serial_number": "M-1"}))
+        path = self.make_xlsx(
+            "data.xlsx",
+            {"serial_number": "M-1", "engine_model": "Д-2", "shipment_date": "2024-03-01"},
+            {"serial_number": "M-2"},
+        )
+        report_path = self.directory / "report.json"
+
+        output = self.run_import(path, update=True, dry_run=True, report=str(report_path))
+
+        self.assertIn("Новых: 1, изменённых: 1, без изменений: 0", output)
+        self.assertFalse(Machine.objects.filter(serial_number="M-2").exists())
+        self.assertFalse(ReferenceItem.objects.filter(name="Д-2").exists())
+
+        report = json.loads(report_path.read_text(encoding="utf-8"))
+        self.assertEqual(report["new"], ["M-2"])
+        self.assertEqual(
+            report["changed"][0]["fields"],
+            {
+                "engine_model": {"old": "engine_model-1", "new": "Д-2"},
+                "shipment_date": {"old": "2024-02-01", "new": "2024-03-01"},
+            },
+        )
+        self.assertEqual(report["summary"]["changed_fields"], {"engine_model": 1, "shipment_date": 1})
+
+    def test_empty_reference_aborts_whole_import(self):
+        path = self.make_xlsx(
+            "data.xlsx", {"serial_number": "M-1"}, {"serial_number": "M-2", "engine_model": ""}
+        )
+
+        with self.assertRaisesMessage(CommandError, "Модель двигателя пустое"):
+            self.run_import(path)
+        self.assertFalse(Machine.objects.exists())
+
+    def test_date_column_detects_format_and_reports_invalid_values(self):
+        dates, invalid = parse_date_column(
+            ["2024-03-01", None, "01.02.2024", "2024-03-01", " ", "завтра", date(2024, 1, 5)]
+        )
+
+        self.assertEqual(
+            dates,
+            [date(2024, 3, 1), None, date(2024, 2, 1), date(2024, 3, 1), None, None, date(2024, 1, 5)],
+        )
+        self.assertEqual(invalid, [5])
+
+    def test_process_pool_parses_like_single_process(self):
+        paths = [
+            self.make_xlsx(f"{month}.xlsx", {"serial_number": f"M-{month}"})
+            for month in ("01", "02", "03")
+        ]
+
+        parallel = parse_workbooks(paths, workers=2)
+
+        self.assertEqual(parallel, parse_workbooks(paths, workers=1))
+        self.assertEqual([p.rows[0].serial_number for p in parallel], ["M-01", "M-02", "M-03"])
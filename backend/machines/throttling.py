@@ -0,0 +1,51 @@
+"""
+Ограничения публичного поиска машин по заводскому номеру.
+
+Гость ограничен по IP, пользователь с JWT — по id (ставка выше), а все
+вместе — по префиксу номера: перебор соседних номеров с множества адресов
+упирается в общую корзину префикса. Пользователь определяется только
+по подписи токена, поэтому отказ обходится без запросов к БД.
+"""
+
+import hashlib
+
+from core.throttling import TokenBucketThrottle, token_user_id
+from django.conf import settings
+
+
+class PublicSearchAnonThrottle(TokenBucketThrottle):
+    scope = "public_search_anon"
+
+    def get_cache_key(self, request, view):
+        if token_user_id(request) is not None:
+            return None
+        return self.cache_format % {"scope": self.scope, "ident": self.get_ident(request)}
+
+
+class PublicSearchUserThrottle(TokenBucketThrottle):
+    scope = "public_search_user"
+
+    def get_cache_key(self, request, view):
+        user_id = token_user_id(request)
+        if user_id is None:
+            return None
+        return self.cache_format % {"scope": self.scope, "ident": user_id}
+
+
+def serial_prefix(serial):
+    """Номер без последних PUBLIC_SEARCH_PREFIX_TAIL символов: 0017 -> 00."""
+    serial = serial.strip().upper()
+    tail = settings.PUBLIC_SEARCH_PREFIX_TAIL
+    return serial[:-tail] if tail and len(serial) > tail else serial
+
+
+class SerialPrefixThrottle(TokenBucketThrottle):
+    scope = "public_search_prefix"
+
+    def get_cache_key(self, request, view):
+        serial = request.query_params.get("serial", "")
+        if not serial.strip():
+            return None
+        # номер приходит от гостя: в ключ кеша идёт хеш, а не сам текст
+        digest = hashlib.md5(serial_prefix(serial).encode()).hexdigest()
+        return self.cache_format % {"scope": self.scope, "ident": digest}
@@ -0,0 +1,89 @@
+"""
+Хронология машины: ТО и рекламации одним UNION ALL запросом
+с курсорной пагинацией по (дата, вид события, id).
+"""
+import base64
+import binascii
+from datetime import date
+
+from claims.models import Claim
+from django.db.models import F, IntegerField, Q, Value
+from maintenance.models import Maintenance
+
+# вид события -> (модель, поле даты, поле заголовка, поле простоя)
+EVENT_SOURCES = {
+    "maintenance": (Maintenance, "maintenance_date", "maintenance_type__name", None),
+    "claim": (Claim, "failure_date", "failure_node__name", "downtime"),
+}
+
+
+def encode_cursor(event):
+    raw = f"{event['date'].isoformat()}|{event['kind']}|{event['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(дата, вид, id) из строки курсора; ValueError, если курсор повреждён."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        event_date, kind, pk = raw.split("|")
+        cursor = (date.fromisoformat(event_date), kind, int(pk))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Некорректный курсор.")
+    if cursor[1] not in EVENT_SOURCES:
+        raise ValueError("Некорректный курсор.")
+    return cursor
+
+
+def _after_cursor(kind, date_field, cursor):
+    """Условие «строго после курсора» для ветки одного вида события."""
+    cursor_date, cursor_kind, cursor_id = cursor
+    before_date = Q(**{f"{date_field}__lt": cursor_date})
+    same_date = Q(**{date_field: cursor_date})
+
+    # порядок: дата ↓, вид ↓, id ↓
+    if kind < cursor_kind:
+        return before_date | same_date
+    if kind == cursor_kind:
+        return before_date | (same_date & Q(id__lt=cursor_id))
+    return before_date
+
+
+def machine_events(machine_id, limit, cursor=None):
+    """
+    До limit событий машины, начиная после cursor, от новых к старым.
+    Каждая ветка UNION ALL идёт по индексу (machine_id, дата, id):
+    claims_machine_date_idx и maintenance_machine_date_idx.
+    """
+    branches = []
+    for kind, (model, date_field, title_field, downtime_field) in EVENT_SOURCES.items():
+        queryset = model.objects.filter(machine_id=machine_id)
+        if cursor is not None:
+            queryset = queryset.filter(_after_cursor(kind, date_field, cursor))
+
+        downtime = F(downtime_field) if downtime_field else Value(None, IntegerField())
+        branches.append(
+            queryset.order_by()
+            .annotate(
+                kind=Value(kind),
+                event_date=F(date_field),
+                title=F(title_field),
+                event_downtime=downtime,
+            )
+            .values("id", "operating_time", "kind", "event_date", "title", "event_downtime")
+        )
+
+    union = branches[0].union(*branches[1:], all=True)
+    rows = union.order_by("-event_date", "-kind", "-id")[:limit]
+
+    return [
+        {
+            "kind": row["kind"],
+            "id": row["id"],
+            "date": row["event_date"],
+            "operating_time": row["operating_time"],
+            "title": row["title"],
+            "downtime": row["event_downtime"],
+        }
+        for row in rows
+    ]
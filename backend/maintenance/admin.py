@@ -1,10 +1,11 @@
+from core.admin import LargeTableAdminMixin
 from django.contrib import admin
 
-from .models import Maintenance
+from .models import Maintenance, MaintenanceRule
 
 
 @admin.register(Maintenance)
-class MaintenanceAdmin(admin.ModelAdmin):
+class MaintenanceAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = (
         "maintenance_date",
         "maintenance_type",
@@ -24,3 +25,23 @@ class MaintenanceAdmin(admin.ModelAdmin):
         "work_order_number",
     )
     date_hierarchy = "maintenance_date"
+    list_select_related = (
+        "maintenance_type",
+        "machine__machine_model",
+        "service_organization",
+        "service_company",
+    )
+    autocomplete_fields = (
+        "maintenance_type",
+        "machine",
+        "service_organization",
+        "service_company",
+    )
+    # сортировка только по колонкам с индексом
+    sortable_by = ("maintenance_date",)
+
+
+@admin.register(MaintenanceRule)
+class MaintenanceRuleAdmin(admin.ModelAdmin):
+    list_display = ("machine_model", "maintenance_type", "interval_hours", "interval_days")
+    list_filter = ("machine_model", "maintenance_type")
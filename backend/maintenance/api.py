@@ -1,17 +1,31 @@
-from django.db.models import Q
+from datetime import timedelta
+
+from core.batch import BatchRetrieveMixin
+from core.bulk import BulkCreateMixin
+from core.caching import CachedReadMixin
+from core.normalize import NORMALIZE_PARAMETER, NormalizedReferencesMixin
+from core.pagination import ExportListMixin
+from django.utils import timezone
 from drf_spectacular.utils import (
     extend_schema,
     extend_schema_view,
     OpenApiParameter,
     OpenApiTypes,
 )
+from machines.models import Machine
+from references.models import ReferenceItem
 from rest_framework import permissions, viewsets
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
 from users.models import UserProfile
 
-from .models import Maintenance
-from .serializers import MaintenanceSerializer
+from .filters import MaintenanceFilter
+from .models import Maintenance, MaintenanceForecast
+from .serializers import MaintenanceForecastSerializer, MaintenanceSerializer
+
+# самый дальний горизонт прогноза, дней
+FORECAST_MAX_DAYS = 3650
 
 
 @extend_schema_view(
@@ -28,6 +42,7 @@ from .serializers import MaintenanceSerializer
         ),
         tags=["Maintenance"],
         parameters=[
+            NORMALIZE_PARAMETER,
             OpenApiParameter(
                 name="maintenance_type",
                 type=OpenApiTypes.INT,
@@ -98,11 +113,98 @@ from .serializers import MaintenanceSerializer
         ),
         tags=["Maintenance"],
     ),
+    bulk=extend_schema(
+        summary="Пакетное создание записей ТО",
+        description=(
+                "Принимает массив записей ТО (не более 500) и создаёт допустимые одной вставкой.\n\n"
+                "Права те же, что и при создании одной записи. Ответ содержит результат "
+                "по каждому элементу в порядке запроса: created (с id), invalid или forbidden.\n"
+                "Код ответа: 201 — созданы все, 207 — часть, 400 — ни одной."
+        ),
+        tags=["Maintenance"],
+        request=MaintenanceSerializer(many=True),
+        responses={201: OpenApiTypes.OBJECT, 207: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
+    ),
+    forecast=extend_schema(
+        summary="Прогноз ближайших ТО",
+        description=(
+                "Машины, у которых ожидаемая дата следующего ТО (по регламенту модели и "
+                "фактической наработке) наступает в ближайшие due_within дней, "
+                "включая просроченные.\n\n"
+                "Прогноз пересчитывается пакетно командой forecast_maintenance. "
+                "Доступ — по роли пользователя и текущим владельцам машин."
+        ),
+        tags=["Maintenance"],
+        parameters=[
+            OpenApiParameter(
+                name="due_within",
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description=(
+                    "Горизонт в днях от сегодняшней даты (по умолчанию 14, "
+                    f"не больше {FORECAST_MAX_DAYS})."
+                ),
+            ),
+            OpenApiParameter(
+                name="maintenance_type",
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="Фильтр по виду ТО (ID справочника).",
+            ),
+            OpenApiParameter(
+                name="service_company",
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description=(
+                    "Фильтр по сервисной компании машины (ID пользователя) — "
+                    "менеджеру, чтобы собрать план работ одного сервиса."
+                ),
+            ),
+            OpenApiParameter(
+                name="export",
+                type=OpenApiTypes.BOOL,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="Если равно 1, возвращает весь прогноз без пагинации.",
+            ),
+        ],
+        responses=MaintenanceForecastSerializer(many=True),
+    ),
+    batch=extend_schema(
+        summary="Несколько записей ТО по ID",
+        description=(
+                "Возвращает до 100 записей одним запросом с учётом прав текущего "
+                "пользователя. Результаты идут в порядке запроса; для недоступных или "
+                "несуществующих записей возвращается {\"<параметр>\": значение, \"not_found\": true}."
+        ),
+        tags=["Maintenance"],
+        parameters=[
+            OpenApiParameter(
+                name="ids",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="ID записей через запятую.",
+            ),
+        ],
+    ),
 )
-class MaintenanceViewSet(viewsets.ModelViewSet):
+class MaintenanceViewSet(
+    CachedReadMixin,
+    NormalizedReferencesMixin,
+    ExportListMixin,
+    BatchRetrieveMixin,
+    BulkCreateMixin,
+    viewsets.ModelViewSet,
+):
     """
     /api/maintenance/       — список ТО (GET), создание записи ТО (POST)
     /api/maintenance/{id}/  — детали ТО (GET)
+    /api/maintenance/bulk/  — пакетное создание записей ТО (POST, массив записей)
+    /api/maintenance/batch/?ids=1,2 — несколько записей ТО за раз (GET)
 
     Доступ к данным:
     - менеджер: все записи
@@ -120,25 +222,23 @@ class MaintenanceViewSet(viewsets.ModelViewSet):
 
     http_method_names = ["get", "post", "head", "options"]
 
-    filterset_fields = {
-        "maintenance_type": ["exact"],
-        "machine__serial_number": ["exact", "icontains"],
-        "service_company": ["exact"],
-        "maintenance_date": ["exact", "gte", "lte"],
-    }
+    # видимость зависит от владельцев машин, в ответе — названия из справочников:
+    # кеш ответов и числа записей сбрасывается при записи в любую из этих таблиц
+    cache_models = (Maintenance, Machine, ReferenceItem)
+
+    filterset_class = MaintenanceFilter
 
     ordering = ["-maintenance_date", "-id"]
     ordering_fields = ["maintenance_date", "id"]
 
-    def get_queryset(self):
-        user = self.request.user
-        if not user.is_authenticated:
-            return Maintenance.objects.none()
-
-        profile = getattr(user, "profile", None)
-        role = getattr(profile, "role", None)
+    def get_cache_models(self):
+        # число строк прогноза зависит от пересчёта прогноза и владельцев машин
+        if self.action == "forecast":
+            return (MaintenanceForecast, Machine)
+        return super().get_cache_models()
 
-        qs = Maintenance.objects.select_related(
+    def get_queryset(self):
+        return Maintenance.objects.visible_to(self.request.user).select_related(
             "maintenance_type",
             "service_organization",
             "machine",
@@ -146,53 +246,78 @@ class MaintenanceViewSet(viewsets.ModelViewSet):
             "service_company",
         )
 
-        if role == UserProfile.Role.MANAGER:
-            return qs
-
-        if role == UserProfile.Role.CLIENT:
-            return qs.filter(machine__client=user)
-
-        if role == UserProfile.Role.SERVICE:
-            return qs.filter(
-                Q(service_company=user) | Q(machine__service_company=user)
-            )
-
-        return Maintenance.objects.none()
-
-    def perform_create(self, serializer):
+    def get_create_kwargs(self, validated_data):
+        """
+        Поля, которые сервер проставляет при создании записи ТО,
+        или PermissionDenied, если роль не позволяет её создать.
+        """
         user = self.request.user
         profile = getattr(user, "profile", None)
         role = getattr(profile, "role", None)
 
-        machine = serializer.validated_data.get("machine")
+        machine = validated_data.get("machine")
         if machine is None:
             raise PermissionDenied("Не указана машина для ТО.")
 
         if role == UserProfile.Role.MANAGER:
-            service_company = machine.service_company or None
-            serializer.save(service_company=service_company)
-            return
+            return {"service_company_id": machine.service_company_id}
 
         if role == UserProfile.Role.CLIENT:
             if machine.client_id != user.id:
                 raise PermissionDenied("Вы не можете добавить ТО к этой машине.")
-            service_company = machine.service_company or None
-            serializer.save(service_company=service_company)
-            return
+            return {"service_company_id": machine.service_company_id}
 
         if role == UserProfile.Role.SERVICE:
             if machine.service_company_id != user.id:
                 raise PermissionDenied("Вы не обслуживаете эту машину.")
-            serializer.save(service_company=user)
-            return
+            return {"service_company_id": user.id}
 
         raise PermissionDenied("Недостаточно прав для создания записи ТО.")
 
-    def list(self, request, *args, **kwargs):
-        export = request.query_params.get("export") == "1"
-        if not export:
-            return super().list(request, *args, **kwargs)
+    def perform_create(self, serializer):
+        serializer.save(**self.get_create_kwargs(serializer.validated_data))
+
+    # фильтры списка ТО к прогнозу не относятся, его параметры разбираются ниже
+    @action(detail=False, methods=["get"], filter_backends=[])
+    def forecast(self, request, *args, **kwargs):
+        try:
+            due_within = int(request.query_params.get("due_within", 14))
+        except ValueError:
+            raise ValidationError({"due_within": "Ожидается целое число дней."})
+        if not 0 <= due_within <= FORECAST_MAX_DAYS:
+            raise ValidationError(
+                {"due_within": f"Горизонт — от 0 до {FORECAST_MAX_DAYS} дней."}
+            )
+
+        queryset = MaintenanceForecast.objects.visible_to(request.user).filter(
+            next_date__lte=timezone.localdate() + timedelta(days=due_within),
+        )
+
+        maintenance_type = request.query_params.get("maintenance_type")
+        if maintenance_type:
+            try:
+                maintenance_type = int(maintenance_type)
+            except ValueError:
+                raise ValidationError({"maintenance_type": "Ожидается id вида ТО."})
+            queryset = queryset.filter(maintenance_type_id=maintenance_type)
+
+        service_company = request.query_params.get("service_company")
+        if service_company:
+            try:
+                service_company = int(service_company)
+            except ValueError:
+                raise ValidationError({"service_company": "Ожидается id пользователя."})
+            queryset = queryset.filter(machine__service_company_id=service_company)
+
+        queryset = queryset.select_related(
+            "machine",
+            "machine__machine_model",
+            "maintenance_type",
+        ).order_by("next_date", "machine", "id")
 
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = MaintenanceForecastSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = MaintenanceForecastSerializer(queryset, many=True)
         return Response(serializer.data)
@@ -0,0 +1,14 @@
+from django_filters import rest_framework as filters
+
+from .models import Maintenance
+
+
+class MaintenanceFilter(filters.FilterSet):
+    class Meta:
+        model = Maintenance
+        fields = {
+            "maintenance_type": ["exact"],
+            "machine__serial_number": ["exact", "icontains"],
+            "service_company": ["exact"],
+            "maintenance_date": ["exact", "gte", "lte"],
+        }
@@ -0,0 +1,196 @@
+"""
+Пакетный прогноз следующего ТО по всему парку.
+
+Все исходные данные выбираются несколькими агрегирующими запросами
+(регламенты, последние ТО по видам, показания наработки по машинам),
+после чего прогноз считается за один проход по машинам в памяти
+и записывается пачками через bulk_create — без запросов на каждую машину.
+"""
+from datetime import timedelta
+
+from claims.models import Claim
+from core.generations import bump_generation
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from machines.models import Machine
+
+from .models import Maintenance, MaintenanceForecast, MaintenanceRule
+
+BATCH_SIZE = 5000
+
+
+def _load_rules():
+    """{machine_model_id: [(maintenance_type_id, interval_hours, interval_days), ...]}"""
+    rules = {}
+    for model_id, type_id, hours, days in MaintenanceRule.objects.values_list(
+        "machine_model", "maintenance_type", "interval_hours", "interval_days"
+    ):
+        if hours or days:
+            rules.setdefault(model_id, []).append((type_id, hours, days))
+    return rules
+
+
+def _load_last_maintenance():
+    """{(machine_id, maintenance_type_id): (дата, наработка)} последнего ТО каждого вида."""
+    rows = (
+        Maintenance.objects.order_by()
+        .values("machine", "maintenance_type")
+        .annotate(last_date=Max("maintenance_date"), last_hours=Max("operating_time"))
+    )
+    return {
+        (row["machine"], row["maintenance_type"]): (row["last_date"], row["last_hours"])
+        for row in rows
+    }
+
+
+def _load_readings():
+    """
+    {machine_id: [первая дата, последняя дата, мин. наработка, макс. наработка]}
+    по всем показаниям наработки (ТО и рекламации).
+    """
+    readings = {}
+    for model, date_field in ((Maintenance, "maintenance_date"), (Claim, "failure_date")):
+        rows = (
+            model.objects.filter(operating_time__isnull=False)
+            .order_by()
+            .values("machine")
+            .annotate(
+                first_date=Min(date_field),
+                last_date=Max(date_field),
+                min_hours=Min("operating_time"),
+                max_hours=Max("operating_time"),
+            )
+        )
+        for row in rows:
+            current = readings.get(row["machine"])
+            if current is None:
+                readings[row["machine"]] = [
+                    row["first_date"],
+                    row["last_date"],
+                    row["min_hours"],
+                    row["max_hours"],
+                ]
+                continue
+            current[0] = min(current[0], row["first_date"])
+            current[1] = max(current[1], row["last_date"])
+            current[2] = min(current[2], row["min_hours"])
+            current[3] = max(current[3], row["max_hours"])
+    return readings
+
+
+def usage_per_day(reading, shipment_date):
+    """
+    Средняя наработка в сутки по крайним показаниям; если показание одно —
+    от даты отгрузки с завода (наработка на момент отгрузки считается нулевой).
+    """
+    if reading is None:
+        return None
+
+    first_date, last_date, min_hours, max_hours = reading
+    days = (last_date - first_date).days
+    if days > 0 and max_hours > min_hours:
+        return (max_hours - min_hours) / days
+
+    if shipment_date and last_date > shipment_date and max_hours > 0:
+        return max_hours / (last_date - shipment_date).days
+
+    return None
+
+
+def predict(interval_hours, interval_days, last, reading, usage, shipment_date):
+    """
+    Возвращает (дата, наработка) следующего ТО или None, если данных недостаточно.
+    Берётся более ранний из сроков: по времени и по наработке.
+    """
+    last_date, last_hours = last if last else (None, None)
+
+    base_date = last_date or shipment_date
+    if last_date is None:
+        # ТО этого вида ещё не было — отсчёт от новой машины
+        base_hours = 0
+    else:
+        base_hours = last_hours
+
+    candidates = []
+    if interval_days and base_date:
+        candidates.append(base_date + timedelta(days=interval_days))
+
+    next_hours = None
+    if interval_hours and base_hours is not None:
+        next_hours = base_hours + interval_hours
+        if usage and reading:
+            reading_date, reading_hours = reading[1], reading[3]
+            remaining_days = (next_hours - reading_hours) / usage
+            candidates.append(reading_date + timedelta(days=round(remaining_days)))
+
+    if not candidates:
+        return None
+
+    return min(candidates), next_hours
+
+
+def build_forecasts(computed_at=None):
+    """Генератор несохранённых MaintenanceForecast по всему парку."""
+    computed_at = computed_at or timezone.now()
+
+    rules = _load_rules()
+    if not rules:
+        return
+
+    last_maintenance = _load_last_maintenance()
+    readings = _load_readings()
+
+    machines = (
+        Machine.objects.filter(machine_model_id__in=rules.keys())
+        .order_by()
+        .values_list("id", "machine_model_id", "shipment_date")
+    )
+
+    for machine_id, model_id, shipment_date in machines.iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        reading = readings.get(machine_id)
+        usage = usage_per_day(reading, shipment_date)
+
+        for type_id, interval_hours, interval_days in rules[model_id]:
+            last = last_maintenance.get((machine_id, type_id))
+            prediction = predict(
+                interval_hours, interval_days, last, reading, usage, shipment_date
+            )
+            if prediction is None:
+                continue
+
+            next_date, next_hours = prediction
+            yield MaintenanceForecast(
+                machine_id=machine_id,
+                maintenance_type_id=type_id,
+                last_maintenance_date=last[0] if last else None,
+                last_operating_time=last[1] if last else None,
+                usage_per_day=usage,
+                next_date=next_date,
+                next_operating_time=next_hours,
+                computed_at=computed_at,
+            )
+
+
+def refresh_forecasts():
+    """Пересчитывает все прогнозы и заменяет ими старые. Возвращает число прогнозов."""
+    created = 0
+    with transaction.atomic():
+        MaintenanceForecast.objects.all().delete()
+
+        batch = []
+        for forecast in build_forecasts():
+            batch.append(forecast)
+            if len(batch) >= BATCH_SIZE:
+                MaintenanceForecast.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            MaintenanceForecast.objects.bulk_create(batch)
+            created += len(batch)
+        # закешированное число строк прогноза после пересчёта устаревает
+        transaction.on_commit(lambda: bump_generation(MaintenanceForecast))
+
+    return created
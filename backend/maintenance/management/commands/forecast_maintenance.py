@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from maintenance.forecast import refresh_forecasts
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогноз следующего ТО каждого вида по всему парку "
+        "(по регламентам моделей и фактической наработке)"
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        created = refresh_forecasts()
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Прогноз ТО пересчитан за {elapsed:.1f} с. Прогнозов: {created}"
+            )
+        )
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0002_machinestats'),
+        ('maintenance', '0001_initial'),
+        ('references', '0002_alter_referenceitem_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='maintenance',
+            index=models.Index(fields=['maintenance_date', 'machine'], include=('maintenance_type', 'service_company'), name='maintenance_date_covering_idx'),
+        ),
+    ]
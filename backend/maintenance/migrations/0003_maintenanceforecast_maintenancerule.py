@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0002_machinestats'),
+        ('maintenance', '0002_maintenance_maintenance_date_covering_idx'),
+        ('references', '0002_alter_referenceitem_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaintenanceForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_maintenance_date', models.DateField(blank=True, null=True, verbose_name='Дата последнего ТО этого вида')),
+                ('last_operating_time', models.PositiveIntegerField(blank=True, null=True, verbose_name='Наработка на последнем ТО, м/час')),
+                ('usage_per_day', models.FloatField(blank=True, null=True, verbose_name='Средняя наработка в сутки, м/час')),
+                ('next_date', models.DateField(verbose_name='Ожидаемая дата ТО')),
+                ('next_operating_time', models.PositiveIntegerField(blank=True, null=True, verbose_name='Ожидаемая наработка, м/час')),
+                ('computed_at', models.DateTimeField(verbose_name='Рассчитано')),
+                ('client', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Клиент')),
+                ('machine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='maintenance_forecasts', to='machines.machine', verbose_name='Машина')),
+                ('maintenance_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='references.referenceitem', verbose_name='Вид ТО')),
+                ('service_company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Сервисная компания')),
+            ],
+            options={
+                'verbose_name': 'Прогноз ТО',
+                'verbose_name_plural': 'Прогнозы ТО',
+                'ordering': ['next_date', 'machine'],
+                'indexes': [models.Index(fields=['next_date'], name='forecast_next_date_idx'), models.Index(fields=['service_company', 'next_date'], name='forecast_service_date_idx'), models.Index(fields=['client', 'next_date'], name='forecast_client_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('machine', 'maintenance_type'), name='maintenance_forecast_unique_machine_type')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MaintenanceRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('interval_hours', models.PositiveIntegerField(blank=True, null=True, verbose_name='Периодичность, м/час')),
+                ('interval_days', models.PositiveIntegerField(blank=True, null=True, verbose_name='Периодичность, дни')),
+                ('machine_model', models.ForeignKey(limit_choices_to={'category': 'machine_model'}, on_delete=django.db.models.deletion.CASCADE, related_name='maintenance_rules', to='references.referenceitem', verbose_name='Модель техники')),
+                ('maintenance_type', models.ForeignKey(limit_choices_to={'category': 'maintenance_type'}, on_delete=django.db.models.deletion.CASCADE, related_name='maintenance_rules_as_type', to='references.referenceitem', verbose_name='Вид ТО')),
+            ],
+            options={
+                'verbose_name': 'Регламент ТО',
+                'verbose_name_plural': 'Регламенты ТО',
+                'ordering': ['machine_model', 'maintenance_type'],
+                'constraints': [models.UniqueConstraint(fields=('machine_model', 'maintenance_type'), name='maintenance_rule_unique_model_type')],
+            },
+        ),
+    ]
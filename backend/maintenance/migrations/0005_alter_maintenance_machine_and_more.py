@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0003_alter_machine_client_alter_machine_service_company_and_more'),
+        ('maintenance', '0004_maintenance_maintenance_machine_date_idx'),
+        ('references', '0002_alter_referenceitem_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='maintenance',
+            name='machine',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='maintenances', to='machines.machine', verbose_name='Машина'),
+        ),
+        migrations.AlterField(
+            model_name='maintenance',
+            name='service_company',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='maintenances_as_service_company', to=settings.AUTH_USER_MODEL, verbose_name='Сервисная компания'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenance',
+            index=models.Index(fields=['service_company', 'maintenance_date', 'id'], name='maintenance_service_date_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:03
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0005_alter_maintenance_machine_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='maintenanceforecast',
+            name='forecast_service_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='maintenanceforecast',
+            name='forecast_client_date_idx',
+        ),
+        migrations.RemoveField(
+            model_name='maintenanceforecast',
+            name='client',
+        ),
+        migrations.RemoveField(
+            model_name='maintenanceforecast',
+            name='service_company',
+        ),
+    ]
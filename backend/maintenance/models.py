@@ -1,8 +1,36 @@
 from django.conf import settings
 from django.db import models
+from django.db.models import Exists, OuterRef, Q
 
-from machines.models import Machine
+from machines.models import InSubquery, Machine, MachineAccess
 from references.models import ReferenceItem
+from users.models import UserProfile
+
+
+class MaintenanceQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """
+        Записи ТО, доступные пользователю:
+        - менеджер: все
+        - клиент: только по своим машинам
+        - сервис: где он указан сервисной компанией или по машинам, которые он обслуживает
+        """
+        if not user.is_authenticated:
+            return self.none()
+
+        profile = getattr(user, "profile", None)
+        role = getattr(profile, "role", None)
+
+        if role == UserProfile.Role.MANAGER:
+            return self
+
+        if role == UserProfile.Role.CLIENT:
+            return self.filter(machine__in=MachineAccess.objects.machine_ids(user, role))
+
+        if role == UserProfile.Role.SERVICE:
+            return self.filter(MachineAccess.objects.serviced_by(user))
+
+        return self.none()
 
 
 class Maintenance(models.Model):
@@ -51,6 +79,7 @@ class Maintenance(models.Model):
         verbose_name="Машина",
         on_delete=models.CASCADE,
         related_name="maintenances",
+        db_index=False,  # покрыт maintenance_machine_date_idx
     )
 
     service_company = models.ForeignKey(
@@ -60,15 +89,181 @@ class Maintenance(models.Model):
         null=True,
         blank=True,
         related_name="maintenances_as_service_company",
+        db_index=False,  # покрыт maintenance_service_date_idx
     )
 
     created_at = models.DateTimeField("Создано", auto_now_add=True)
     updated_at = models.DateTimeField("Обновлено", auto_now=True)
 
+    objects = MaintenanceQuerySet.as_manager()
+
     class Meta:
         verbose_name = "ТО"
         verbose_name_plural = "ТО"
         ordering = ["-maintenance_date", "-id"]
+        indexes = [
+            # покрывающий индекс для временных рядов (analytics timeseries):
+            # бакетирование по дате без обращения к таблице
+            models.Index(
+                fields=["maintenance_date", "machine"],
+                include=["maintenance_type", "service_company"],
+                name="maintenance_date_covering_idx",
+            ),
+            # хронология машины (machines.timeline)
+            models.Index(
+                fields=["machine", "maintenance_date", "id"],
+                name="maintenance_machine_date_idx",
+            ),
+            # списки сервисной компании (visible_to)
+            models.Index(
+                fields=["service_company", "maintenance_date", "id"],
+                name="maintenance_service_date_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"ТО {self.maintenance_type} для {self.machine} от {self.maintenance_date}"
+
+
+class MaintenanceRule(models.Model):
+    """
+    Регламент ТО для модели техники: периодичность по наработке и/или по времени.
+    """
+
+    machine_model = models.ForeignKey(
+        ReferenceItem,
+        verbose_name="Модель техники",
+        on_delete=models.CASCADE,
+        limit_choices_to={"category": ReferenceItem.Category.MACHINE_MODEL},
+        related_name="maintenance_rules",
+    )
+    maintenance_type = models.ForeignKey(
+        ReferenceItem,
+        verbose_name="Вид ТО",
+        on_delete=models.CASCADE,
+        limit_choices_to={"category": ReferenceItem.Category.MAINTENANCE_TYPE},
+        related_name="maintenance_rules_as_type",
+    )
+
+    interval_hours = models.PositiveIntegerField(
+        "Периодичность, м/час",
+        null=True,
+        blank=True,
+    )
+    interval_days = models.PositiveIntegerField(
+        "Периодичность, дни",
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = "Регламент ТО"
+        verbose_name_plural = "Регламенты ТО"
+        ordering = ["machine_model", "maintenance_type"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["machine_model", "maintenance_type"],
+                name="maintenance_rule_unique_model_type",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.maintenance_type} для {self.machine_model}"
+
+
+class MaintenanceForecastQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """
+        Прогнозы, доступные пользователю (по текущим владельцам машин, как у ТО):
+        - менеджер: все
+        - клиент: только по своим машинам
+        - сервис: по машинам, которые он обслуживает, и по видам ТО,
+          которые он проводил на машине
+        """
+        if not user.is_authenticated:
+            return self.none()
+
+        profile = getattr(user, "profile", None)
+        role = getattr(profile, "role", None)
+
+        if role == UserProfile.Role.MANAGER:
+            return self
+
+        if role == UserProfile.Role.CLIENT:
+            return self.filter(machine__in=MachineAccess.objects.machine_ids(user, role))
+
+        if role == UserProfile.Role.SERVICE:
+            serviced = MachineAccess.objects.machine_ids(user, role)
+            performed = Maintenance.objects.filter(
+                machine=OuterRef("machine"),
+                maintenance_type=OuterRef("maintenance_type"),
+                service_company=user,
+            )
+            return self.filter(Q(InSubquery("machine", serviced)) | Exists(performed))
+
+        return self.none()
+
+
+class MaintenanceForecast(models.Model):
+    """
+    Прогноз следующего ТО каждого вида по машине.
+    Пересчитывается целиком командой forecast_maintenance (см. maintenance.forecast).
+    """
+
+    machine = models.ForeignKey(
+        Machine,
+        verbose_name="Машина",
+        on_delete=models.CASCADE,
+        related_name="maintenance_forecasts",
+    )
+    maintenance_type = models.ForeignKey(
+        ReferenceItem,
+        verbose_name="Вид ТО",
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+
+    last_maintenance_date = models.DateField(
+        "Дата последнего ТО этого вида",
+        null=True,
+        blank=True,
+    )
+    last_operating_time = models.PositiveIntegerField(
+        "Наработка на последнем ТО, м/час",
+        null=True,
+        blank=True,
+    )
+    usage_per_day = models.FloatField(
+        "Средняя наработка в сутки, м/час",
+        null=True,
+        blank=True,
+    )
+
+    next_date = models.DateField("Ожидаемая дата ТО")
+    next_operating_time = models.PositiveIntegerField(
+        "Ожидаемая наработка, м/час",
+        null=True,
+        blank=True,
+    )
+
+    computed_at = models.DateTimeField("Рассчитано")
+
+    objects = MaintenanceForecastQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Прогноз ТО"
+        verbose_name_plural = "Прогнозы ТО"
+        ordering = ["next_date", "machine"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["machine", "maintenance_type"],
+                name="maintenance_forecast_unique_machine_type",
+            ),
+        ]
+        indexes = [
+            # машины роли отбираются по уникальному индексу (machine, maintenance_type)
+            models.Index(fields=["next_date"], name="forecast_next_date_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.maintenance_type} для {self.machine_id} к {self.next_date}"
@@ -1,3 +1,4 @@
+from core.serializers import PreloadedPrimaryKeyRelatedField
 from machines.models import Machine
 from machines.serializers import MachineShortSerializer
 from references.models import ReferenceItem
@@ -5,7 +6,7 @@ from references.serializers import ReferenceItemSerializer
 from rest_framework import serializers
 from users.serializers import UserShortSerializer
 
-from .models import Maintenance
+from .models import Maintenance, MaintenanceForecast
 
 
 class MaintenanceSerializer(serializers.ModelSerializer):
@@ -15,14 +16,14 @@ class MaintenanceSerializer(serializers.ModelSerializer):
     service_company = UserShortSerializer(read_only=True)
 
 
-    maintenance_type_id = serializers.PrimaryKeyRelatedField(
+    maintenance_type_id = PreloadedPrimaryKeyRelatedField(
         queryset=ReferenceItem.objects.filter(category="maintenance_type"),
         source="maintenance_type",
         write_only=True,
         required=True,
     )
 
-    service_organization_id = serializers.PrimaryKeyRelatedField(
+    service_organization_id = PreloadedPrimaryKeyRelatedField(
         queryset=ReferenceItem.objects.filter(category="service_organization"),
         source="service_organization",
         write_only=True,
@@ -30,7 +31,7 @@ class MaintenanceSerializer(serializers.ModelSerializer):
         allow_null=True,
     )
 
-    machine_id = serializers.PrimaryKeyRelatedField(
+    machine_id = PreloadedPrimaryKeyRelatedField(
         queryset=Machine.objects.all(),
         source="machine",
         write_only=True,
@@ -63,3 +64,22 @@ class MaintenanceSerializer(serializers.ModelSerializer):
         if value is not None and value < 0:
             raise serializers.ValidationError('Наработка не может быть отрицательной.')
         return value
+
+
+class MaintenanceForecastSerializer(serializers.ModelSerializer):
+    machine = MachineShortSerializer(read_only=True)
+    maintenance_type = ReferenceItemSerializer(read_only=True)
+
+    class Meta:
+        model = MaintenanceForecast
+        fields = (
+            "id",
+            "machine",
+            "maintenance_type",
+            "last_maintenance_date",
+            "last_operating_time",
+            "usage_per_day",
+            "next_date",
+            "next_operating_time",
+            "computed_at",
+        )
@@ -1,10 +1,12 @@
 from datetime import date
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
 from django.urls import reverse
 from machines.models import Machine
-from maintenance.models import Maintenance
+from maintenance.forecast import predict, refresh_forecasts, usage_per_day
+from maintenance.models import Maintenance, MaintenanceRule
 from references.models import ReferenceItem
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -15,6 +17,7 @@ User = get_user_model()
 
 class MaintenanceAPITests(TestCase):
     def setUp(self):
+        cache.clear()
         self.api_client = APIClient()
 
         self.manager = User.objects.create_user(
@@ -200,3 +203,170 @@ class MaintenanceAPITests(TestCase):
 
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]["machine"]["serial_number"], "MACH-001")
+
+    def test_forecast_next_maintenance_by_rules(self):
+        MaintenanceRule.objects.create(
+            machine_model=self.machine_model,
+            maintenance_type=self.maintenance_type_1,
+            interval_hours=250,
+            interval_days=90,
+        )
+        # machine2: ТО-1 не проводилось, даты отгрузки и темпа наработки нет — прогноза нет
+        self.assertEqual(refresh_forecasts(), 2)
+
+        url = reverse("maintenance-forecast")
+        self.api_client.force_authenticate(user=self.manager)
+        response = self.api_client.get(url, {"due_within": 14})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        next_dates = {
+            item["machine"]["serial_number"]: item["next_date"] for item in response.data
+        }
+        self.assertEqual(
+            next_dates,
+            {"MACH-001": "2024-04-09", "MACH-003": "2024-05-30"},
+        )
+
+    def test_forecast_is_paginated_and_filtered_by_service_company(self):
+        MaintenanceRule.objects.create(
+            machine_model=self.machine_model,
+            maintenance_type=self.maintenance_type_1,
+            interval_hours=250,
+            interval_days=90,
+        )
+        refresh_forecasts()
+
+        url = reverse("maintenance-forecast")
+        self.api_client.force_authenticate(user=self.manager)
+        response = self.api_client.get(url, {"due_within": 3650, "page_size": 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+        self.assertIsNotNone(response.data["next"])
+        self.assertEqual(
+            [item["machine"]["serial_number"] for item in response.data["results"]],
+            ["MACH-001"],
+        )
+
+        response = self.api_client.get(
+            url, {"due_within": 3650, "service_company": self.service_user.pk}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {item["machine"]["serial_number"] for item in response.data}, {"MACH-001"}
+        )
+
+    def test_forecast_is_scoped_by_role(self):
+        MaintenanceRule.objects.create(
+            machine_model=self.machine_model,
+            maintenance_type=self.maintenance_type_1,
+            interval_days=90,
+        )
+        refresh_forecasts()
+
+        url = reverse("maintenance-forecast")
+        self.api_client.force_authenticate(user=self.service_user)
+        response = self.api_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        serials = {item["machine"]["serial_number"] for item in response.data}
+        self.assertEqual(serials, {"MACH-001"})
+
+    def test_forecast_follows_machine_transfer_without_refresh(self):
+        MaintenanceRule.objects.create(
+            machine_model=self.machine_model,
+            maintenance_type=self.maintenance_type_1,
+            interval_days=90,
+        )
+        refresh_forecasts()
+
+        new_client = User.objects.create_user(username="new_client", password="pass123")
+        new_client.profile.role = UserProfile.Role.CLIENT
+        new_client.profile.save()
+        other_service = User.objects.create_user(username="other_service", password="pass123")
+        other_service.profile.role = UserProfile.Role.SERVICE
+        other_service.profile.save()
+
+        self.machine1.client = new_client
+        self.machine1.save()
+        self.machine3.service_company = other_service
+        self.machine3.save()
+
+        url = reverse("maintenance-forecast")
+
+        def serials(user):
+            self.api_client.force_authenticate(user=user)
+            response = self.api_client.get(url, {"due_within": 3650})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return {item["machine"]["serial_number"] for item in response.data}
+
+        self.assertEqual(serials(self.client_user), set())
+        self.assertEqual(serials(new_client), {"MACH-001"})
+        self.assertEqual(serials(other_service), {"MACH-003"})
+
+        # сервис, проводивший ТО-1 на машине, видит его прогноз и без обслуживания машины
+        self.machine1.service_company = other_service
+        self.machine1.save()
+        self.assertEqual(serials(self.service_user), {"MACH-001"})
+
+    def test_forecast_rejects_invalid_parameters(self):
+        url = reverse("maintenance-forecast")
+        self.api_client.force_authenticate(user=self.manager)
+        for params in (
+            {"maintenance_type": "abc"},
+            {"service_company": "abc"},
+            {"due_within": "999999999"},
+            {"due_within": "-1"},
+            {"due_within": "soon"},
+        ):
+            response = self.api_client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_client_bulk_creates_maintenance_for_own_machine(self):
+        url = reverse("maintenance-bulk")
+        self.api_client.force_authenticate(user=self.client_user)
+        payload = [
+            {
+                "maintenance_type_id": self.maintenance_type_2.id,
+                "maintenance_date": "2024-06-01",
+                "operating_time": 500,
+                "machine_id": machine.id,
+            }
+            for machine in (self.machine1, self.machine2)
+        ]
+        response = self.api_client.post(url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data["created"], 1)
+
+        created = Maintenance.objects.get(pk=response.data["results"][0]["id"])
+        self.assertEqual(created.machine, self.machine1)
+        self.assertEqual(created.service_company, self.service_user)
+        self.assertEqual(response.data["results"][1]["status"], "forbidden")
+
+    def test_bulk_create_requires_list(self):
+        url = reverse("maintenance-bulk")
+        self.api_client.force_authenticate(user=self.manager)
+        response = self.api_client.post(url, {"machine_id": self.machine1.id}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MaintenanceForecastEngineTests(SimpleTestCase):
+    def test_usage_rate_moves_forecast_earlier(self):
+        reading = (date(2023, 12, 2), date(2024, 1, 1), 40, 100)
+        usage = usage_per_day(reading, shipment_date=None)
+        self.assertEqual(usage, 2.0)
+
+        next_date, next_hours = predict(
+            interval_hours=250,
+            interval_days=365,
+            last=(date(2024, 1, 1), 100),
+            reading=reading,
+            usage=usage,
+            shipment_date=None,
+        )
+        # 250 м/час при 2 м/час в сутки — через 125 дней, раньше годового срока
+        self.assertEqual(next_hours, 350)
+        self.assertEqual(next_date, date(2024, 5, 5))
+
+    def test_usage_rate_from_shipment_date(self):
+        reading = (date(2024, 1, 11), date(2024, 1, 11), 100, 100)
+        self.assertEqual(usage_per_day(reading, shipment_date=date(2024, 1, 1)), 10.0)
@@ -1,14 +1,25 @@
+import hashlib
+
+from core.caching import CachedReadMixin
+from django.db.models import Count, Max
 from django.db.models.deletion import ProtectedError
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags, quote_etag
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiTypes
 from rest_framework import status
 from rest_framework import viewsets, permissions
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
 from users.models import UserProfile
 
 from .models import ReferenceItem
 from .serializers import ReferenceItemSerializer
 
+# справочники меняются редко: ответ можно брать из кеша браузера 10 минут,
+# а сутки после этого — показывать сразу и перепроверять в фоне
+CATALOG_CACHE_CONTROL = "private, max-age=600, stale-while-revalidate=86400"
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -29,6 +40,28 @@ from .serializers import ReferenceItemSerializer
             ),
         ],
     ),
+    catalog=extend_schema(
+        summary="Все справочники одним ответом",
+        description=(
+                "Элементы всех справочников, сгруппированные по категориям.\n\n"
+                "Ответ несёт ETag (зависит от числа элементов и последнего изменения): "
+                "при If-None-Match с тем же значением возвращается 304 без тела.\n\n"
+                "С параметром since в categories попадают только элементы, изменённые "
+                "после этого момента, а в ids — id всех существующих элементов, "
+                "чтобы клиент удалил пропавшие."
+        ),
+        tags=["References"],
+        parameters=[
+            OpenApiParameter(
+                name="since",
+                type=OpenApiTypes.DATETIME,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="updated_at из предыдущего ответа каталога.",
+            ),
+        ],
+        responses=OpenApiTypes.OBJECT,
+    ),
     retrieve=extend_schema(
         summary="Детали элемента справочника",
         description="Возвращает один элемент справочника по его ID.",
@@ -53,10 +86,11 @@ from .serializers import ReferenceItemSerializer
         tags=["References"],
     ),
 )
-class ReferenceItemViewSet(viewsets.ModelViewSet):
+class ReferenceItemViewSet(CachedReadMixin, viewsets.ModelViewSet):
     """
     /api/references/        — список элементов справочников, создание (POST)
     /api/references/{id}/   — детали, обновление, удаление
+    /api/references/catalog/ — все справочники по категориям (с ETag)
 
     Доступ к данным:
     - все авторизованные пользователи могут читать (GET)
@@ -83,6 +117,46 @@ class ReferenceItemViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return ReferenceItem.objects.all()
 
+    @action(detail=False, methods=["get"])
+    def catalog(self, request, *args, **kwargs):
+        since = request.query_params.get("since")
+        if since:
+            try:
+                since = parse_datetime(since)
+            except ValueError:
+                # формат верный, но даты нет: 2024-02-30T00:00:00
+                since = None
+            if since is None:
+                raise ValidationError({"since": "Ожидается дата и время в формате ISO 8601."})
+
+        queryset = self.get_queryset()
+        state = queryset.aggregate(count=Count("id"), updated_at=Max("updated_at"))
+        updated_at = state["updated_at"].isoformat() if state["updated_at"] else None
+        version = hashlib.sha1(f"{state['count']}:{updated_at}".encode()).hexdigest()[:20]
+        etag = quote_etag(version)
+
+        # сравнение слабое: сжатый ответ уходит с W/-версией того же ETag
+        client_etags = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag in (value.removeprefix("W/") for value in client_etags):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            items = queryset.order_by("category", "name")
+            if since:
+                items = items.filter(updated_at__gt=since)
+
+            categories = {category: [] for category in ReferenceItem.Category.values}
+            for item in ReferenceItemSerializer(items, many=True).data:
+                categories[item["category"]].append(item)
+
+            data = {"version": version, "updated_at": updated_at, "categories": categories}
+            if since:
+                data["ids"] = list(queryset.order_by("id").values_list("id", flat=True))
+            response = Response(data)
+
+        response["ETag"] = etag
+        response["Cache-Control"] = CATALOG_CACHE_CONTROL
+        return response
+
     def _ensure_manager(self):
         user = self.request.user
         profile = getattr(user, "profile", None)
@@ -7,3 +7,12 @@ class ReferenceItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = ReferenceItem
         fields = ("id", "category", "name", "description")
+
+    def to_representation(self, instance):
+        # режим ?normalize=1 (core.normalize): элемент уходит в общую
+        # таблицу references ответа, в записи остаётся только id
+        references = self.context.get("references")
+        if references is not None:
+            references[instance.pk] = instance
+            return instance.pk
+        return super().to_representation(instance)
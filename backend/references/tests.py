@@ -1,3 +1,82 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import ReferenceItem
+
+User = get_user_model()
+
+
+class ReferenceCatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.engine = ReferenceItem.objects.create(
+            category=ReferenceItem.Category.ENGINE_MODEL, name="Д-245"
+        )
+        self.node = ReferenceItem.objects.create(
+            category=ReferenceItem.Category.FAILURE_NODE, name="Двигатель"
+        )
+        self.user = User.objects.create_user(username="user", password="pass123")
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(user=self.user)
+
+    def get_catalog(self, **params):
+        headers = {}
+        if "etag" in params:
+            headers["HTTP_IF_NONE_MATCH"] = params.pop("etag")
+        return self.api_client.get("/api/references/catalog/", params, **headers)
+
+    def test_catalog_groups_items_by_category(self):
+        response = self.get_catalog()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ETag", response)
+        self.assertIn("max-age", response["Cache-Control"])
+        categories = response.data["categories"]
+        self.assertEqual(set(categories), set(ReferenceItem.Category.values))
+        self.assertEqual([item["name"] for item in categories["engine_model"]], ["Д-245"])
+        self.assertEqual(categories["machine_model"], [])
+
+    def test_matching_etag_returns_not_modified(self):
+        etag = self.get_catalog()["ETag"]
+
+        response = self.get_catalog(etag=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_etag_changes_on_update_and_delete(self):
+        etag = self.get_catalog()["ETag"]
+
+        self.engine.name = "Д-245.12С"
+        self.engine.save()
+        updated = self.get_catalog(etag=etag)
+        self.assertEqual(updated.status_code, 200)
+
+        self.node.delete()
+        deleted = self.get_catalog(etag=updated["ETag"])
+        self.assertEqual(deleted.status_code, 200)
+
+    def test_since_returns_changed_items_and_all_ids(self):
+        since = self.get_catalog().data["updated_at"]
+        ReferenceItem.objects.filter(pk=self.engine.pk).update(
+            updated_at=timezone.now() + timedelta(seconds=1)
+        )
+
+        response = self.get_catalog(since=since)
+
+        self.assertEqual(response.status_code, 200)
+        changed = [item["id"] for items in response.data["categories"].values() for item in items]
+        self.assertEqual(changed, [self.engine.pk])
+        self.assertEqual(response.data["ids"], [self.engine.pk, self.node.pk])
+
+    def test_invalid_since_is_rejected(self):
+        for since in ("вчера", "2024-02-30T00:00:00", "2024-01-01T25:00:00"):
+            response = self.get_catalog(since=since)
 
-# Create your tests here.
+            self.assertEqual(response.status_code, 400, since)
+            self.assertIn("since", response.data)
@@ -6,3 +6,4 @@ export * from './maintenance'
 export * from './claims'
 export * from './references'
 export * from './users'
+export * from './events'
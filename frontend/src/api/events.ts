@@ -0,0 +1,55 @@
+import {API_BASE_URL} from './http'
+
+export type ChangeModel = 'machine' | 'claim' | 'maintenance'
+
+// Событие ленты изменений (/api/events/)
+export interface ChangeEvent {
+    model: ChangeModel
+    id: number
+    action: 'created' | 'updated' | 'deleted' | 'saved'
+}
+
+// события приходят пачками (импорт, массовая запись) — список
+// перечитывается один раз на пачку
+const RELOAD_DELAY_MS = 300
+
+/**
+ * Подписаться на изменения записей моделей models.
+ * EventSource сам переподключается после обрыва; заголовки он передавать
+ * не умеет, поэтому токен уходит параметром ?token=.
+ * Событие resync (часть событий потеряна) тоже вызывает onChange.
+ * Возвращает функцию отписки.
+ */
+export function subscribeToChanges(
+    accessToken: string,
+    models: ChangeModel[],
+    onChange: () => void,
+): () => void {
+    const source = new EventSource(
+        `${API_BASE_URL}/api/events/?token=${encodeURIComponent(accessToken)}`,
+    )
+
+    let timer: ReturnType<typeof setTimeout> | undefined
+    const scheduleReload = () => {
+        if (timer !== undefined) {
+            return
+        }
+        timer = setTimeout(() => {
+            timer = undefined
+            onChange()
+        }, RELOAD_DELAY_MS)
+    }
+
+    source.addEventListener('change', (message) => {
+        const event = JSON.parse((message as MessageEvent).data) as ChangeEvent
+        if (models.includes(event.model)) {
+            scheduleReload()
+        }
+    })
+    source.addEventListener('resync', scheduleReload)
+
+    return () => {
+        clearTimeout(timer)
+        source.close()
+    }
+}
@@ -29,6 +29,15 @@ export async function fetchPublicMachineBySerial(
         throw new Error('Данных о машине с таким заводским номером нет в системе')
     }
 
+    if (response.status === 429) {
+        const retryAfter = Number(response.headers.get('Retry-After'))
+        throw new Error(
+            retryAfter > 0
+                ? `Слишком много запросов, повторите через ${retryAfter} с`
+                : 'Слишком много запросов, повторите позже',
+        )
+    }
+
     if (!response.ok) {
         let message = `Ошибка сервера (${response.status})`
         try {
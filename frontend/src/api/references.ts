@@ -42,6 +42,56 @@ export async function fetchReferenceItems(
     return response.json()
 }
 
+// Все справочники по категориям (/api/references/catalog/)
+export interface ReferenceCatalog {
+    version: string
+    updated_at: string | null
+    categories: Record<string, ReferenceItem[]>
+}
+
+/**
+ * Получить все справочники одним запросом.
+ * cache: 'no-cache' — браузер перепроверяет сохранённый ответ по ETag
+ * и при неизменных справочниках получает 304 без тела.
+ */
+export async function fetchReferenceCatalog(
+    accessToken: string,
+): Promise<ReferenceCatalog> {
+    const response = await fetch(`${API_BASE_URL}/api/references/catalog/`, {
+        method: 'GET',
+        headers: authHeaders(accessToken, false),
+        cache: 'no-cache',
+    })
+
+    if (!response.ok) {
+        const text = await response.text()
+        throw new Error(
+            `Не удалось загрузить справочники: ${response.status} ${text}`,
+        )
+    }
+
+    return response.json()
+}
+
+let catalogRequest: Promise<ReferenceCatalog> | null = null
+
+/**
+ * Элементы одной категории из каталога. Одновременные вызовы
+ * (несколько фильтров на странице) делят один запрос.
+ */
+export async function fetchCatalogItems(
+    accessToken: string,
+    category: string,
+): Promise<ReferenceItem[]> {
+    if (!catalogRequest) {
+        catalogRequest = fetchReferenceCatalog(accessToken).finally(() => {
+            catalogRequest = null
+        })
+    }
+    const catalog = await catalogRequest
+    return catalog.categories[category] ?? []
+}
+
 export interface ReferenceItemPayload {
     category: string
     name: string
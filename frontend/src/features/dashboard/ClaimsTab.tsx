@@ -10,9 +10,10 @@ import type {
 import {
   type ClaimFilters,
   createClaim,
+  fetchCatalogItems,
   fetchMyClaims,
   fetchMyMachines,
-  fetchReferenceItems,
+  subscribeToChanges,
 } from '../../api/client'
 import Alert from '../../components/Alert'
 
@@ -55,13 +56,23 @@ const ClaimsTab: React.FC<ClaimsTabProps> = ({ accessToken, userRole }) => {
   const [exporting, setExporting] = useState(false)
   const [exportError, setExportError] = useState('')
 
+  // перечитать список, когда записи меняются на сервере
+  const [revision, setRevision] = useState(0)
+  useEffect(
+    () =>
+      subscribeToChanges(accessToken, ['claim'], () =>
+        setRevision((value) => value + 1),
+      ),
+    [accessToken],
+  )
+
   // справочники + список машин
   useEffect(() => {
     const loadRefsAndMachines = async () => {
       try {
         const [nodes, methods, machines] = await Promise.all([
-          fetchReferenceItems(accessToken, 'failure_node'),
-          fetchReferenceItems(accessToken, 'repair_method'),
+          fetchCatalogItems(accessToken, 'failure_node'),
+          fetchCatalogItems(accessToken, 'repair_method'),
           fetchMyMachines(accessToken, {}),
         ])
         setFailureNodes(nodes)
@@ -98,7 +109,7 @@ const ClaimsTab: React.FC<ClaimsTabProps> = ({ accessToken, userRole }) => {
     }
 
     load()
-  }, [accessToken, filters])
+  }, [accessToken, filters, revision])
 
   const handleFailureNodeChange = (e: React.ChangeEvent<HTMLSelectElement>) => {
     const value = e.target.value
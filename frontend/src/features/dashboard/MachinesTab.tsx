@@ -1,8 +1,9 @@
 import {
   API_BASE_URL,
   buildQuery,
+  fetchCatalogItems,
   fetchMyMachines,
-  fetchReferenceItems,
+  subscribeToChanges,
   type MachineFilters,
 } from '../../api/client'
 import React, { useEffect, useState } from 'react'
@@ -34,6 +35,16 @@ const MachinesTab: React.FC<MachinesTabProps> = ({ accessToken }) => {
   const [exporting, setExporting] = useState(false)
   const [exportError, setExportError] = useState('')
 
+  // перечитать список, когда записи меняются на сервере
+  const [revision, setRevision] = useState(0)
+  useEffect(
+    () =>
+      subscribeToChanges(accessToken, ['machine'], () =>
+        setRevision((value) => value + 1),
+      ),
+    [accessToken],
+  )
+
   useEffect(() => {
     const loadRefs = async () => {
       try {
@@ -44,11 +55,11 @@ const MachinesTab: React.FC<MachinesTabProps> = ({ accessToken }) => {
           driveAxleModelsData,
           steerAxleModelsData,
         ] = await Promise.all([
-          fetchReferenceItems(accessToken, 'machine_model'),
-          fetchReferenceItems(accessToken, 'engine_model'),
-          fetchReferenceItems(accessToken, 'transmission_model'),
-          fetchReferenceItems(accessToken, 'drive_axle_model'),
-          fetchReferenceItems(accessToken, 'steer_axle_model'),
+          fetchCatalogItems(accessToken, 'machine_model'),
+          fetchCatalogItems(accessToken, 'engine_model'),
+          fetchCatalogItems(accessToken, 'transmission_model'),
+          fetchCatalogItems(accessToken, 'drive_axle_model'),
+          fetchCatalogItems(accessToken, 'steer_axle_model'),
         ])
 
         setMachineModels(machineModelsData)
@@ -134,7 +145,7 @@ const MachinesTab: React.FC<MachinesTabProps> = ({ accessToken }) => {
     }
 
     load()
-  }, [accessToken, filters])
+  }, [accessToken, filters, revision])
 
   const handleFilterChange =
     (field: keyof MachineFilters) =>
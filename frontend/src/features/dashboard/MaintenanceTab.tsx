@@ -8,9 +8,10 @@ import type {
 } from '../../types/api'
 import {
   createMaintenance,
+  fetchCatalogItems,
   fetchMyMachines,
   fetchMyMaintenance,
-  fetchReferenceItems,
+  subscribeToChanges,
   type MaintenanceFilters,
 } from '../../api/client'
 import Alert from '../../components/Alert'
@@ -53,13 +54,23 @@ const MaintenanceTab: React.FC<MaintenanceTabProps> = ({ accessToken }) => {
   const [exporting, setExporting] = useState(false)
   const [exportError, setExportError] = useState('')
 
+  // перечитать список, когда записи меняются на сервере
+  const [revision, setRevision] = useState(0)
+  useEffect(
+    () =>
+      subscribeToChanges(accessToken, ['maintenance'], () =>
+        setRevision((value) => value + 1),
+      ),
+    [accessToken],
+  )
+
   // справочники + список машин
   useEffect(() => {
     const loadRefsAndMachines = async () => {
       try {
         const [types, orgs, machines] = await Promise.all([
-          fetchReferenceItems(accessToken, 'maintenance_type'),
-          fetchReferenceItems(accessToken, 'service_organization'),
+          fetchCatalogItems(accessToken, 'maintenance_type'),
+          fetchCatalogItems(accessToken, 'service_organization'),
           fetchMyMachines(accessToken, {}),
         ])
 
@@ -97,7 +108,7 @@ const MaintenanceTab: React.FC<MaintenanceTabProps> = ({ accessToken }) => {
     }
 
     load()
-  }, [accessToken, filters])
+  }, [accessToken, filters, revision])
 
   const handleTypeChange = (e: React.ChangeEvent<HTMLSelectElement>) => {
     const value = e.target.value